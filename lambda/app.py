@@ -4,7 +4,20 @@ https://docs.aws.amazon.com/apigateway/latest/developerguide/http-api-develop-in
 """
 
 import logging
+import os
+import app_handler
 from app_handler.provider.app import AppProvider
+from app_handler.provider.prime import prime
+from app_handler.utils import coldstart
+from app_handler.utils.capture import capture
+from app_handler.utils.logs import log_event
+
+coldstart.record('imports', app_handler.IMPORT_START)
+
+# Prime configs, clients and connections during the init phase
+PRIME_ENABLE = os.environ.get('PRIME_ENABLE', 'False').lower() == 'true'
+if PRIME_ENABLE:
+    prime()
 
 def handler(event, context):
     """
@@ -17,7 +30,16 @@ def handler(event, context):
     https://docs.aws.amazon.com/lambda/latest/dg/python-context.html
     """
 
-    logging.debug(event)
-    logging.debug(context)
+    if coldstart.start_invocation():
+        logging.info('Cold start, init phases %s', coldstart.INIT_TIMINGS)
+
+    # Scheduled keep-warm events skip request parsing and runners, only refreshing priming
+    if coldstart.is_keep_warm(event):
+        if PRIME_ENABLE:
+            prime(record=False)
+        return coldstart.keep_warm_response()
+
+    log_event(event, context)
     app_provider =  AppProvider(event)
+    capture(event, app_provider.response)
     return app_provider.response
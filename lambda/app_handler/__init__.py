@@ -1,11 +1,23 @@
 """
-App handler startup. Sets log level for subsequent modules
+App handler startup. Sets log level and format for subsequent modules
 """
 
+# Start of the imports init phase, before any other module is loaded
+from time import perf_counter_ns
+IMPORT_START = perf_counter_ns()
+
+# pylint: disable=wrong-import-position
 import logging
 import os
 
-# Configure log level from environment
+from app_handler.utils import logs
+
+# Configure logging from environment
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
-logging.getLogger().setLevel(LOG_LEVEL)
+logs.configure(
+    LOG_LEVEL,
+    os.environ.get('LOG_FORMAT', 'json'),
+    os.environ.get('LOG_REDACT_FIELDS', logs.DEFAULT_REDACT_FIELDS),
+    float(os.environ.get('LOG_EVENT_SAMPLE_RATE', '1')),
+)
 logging.info('Using log level %s', LOG_LEVEL)
@@ -5,28 +5,72 @@ import logging
 
 from app_handler.provider.response import ResponseProvider
 from app_handler.runner.app import AppRunner
+from app_handler.runner.blocklist import BlocklistRunner
+from app_handler.runner.dedup import DedupRunner
 from app_handler.runner.discord import DiscordRunner
 from app_handler.runner.dynamodb import DynamodbRunner
 from app_handler.runner.email import EmailRunner
+from app_handler.runner.fields import FieldsRunner
 from app_handler.runner.hcaptcha import HcaptchaRunner
+from app_handler.runner.ipfilter import IpFilterRunner
+from app_handler.runner.prefilter import PrefilterRunner
+from app_handler.runner.ratelimit import RateLimitRunner
 from app_handler.runner.slack import SlackRunner
+from app_handler.runner.upload import UploadRunner
+from app_handler.utils.metrics import Metrics
+from app_handler.utils.profiler import profile
+from app_handler.utils.tracing import Trace, span
 
 class AppProvider:
     """
     Main App handler
     """
-    def __init__(self, event) -> None:
+    def __init__(self, event, process:bool = True) -> None:
         """
-        Configure application using supplied environment variables
+        Configure application using supplied environment variables.
+        Without process, only runners are created, e.g. for priming or to
+        handle several events with the same runners.
         """
         # Prepare providers
         self.response_provider = None
         # Prepare runners
         self.app_runner = AppRunner()
         self.hcaptcha_runner = HcaptchaRunner()
-        self.runners = {}
-        # Process event
-        self.process(event)
+        # Runners that can end processing before anything is sent, in the order they run.
+        # An error response is a rejection, a duplicate's stored outcome or an upload URL.
+        self.checks = {
+            'ipfilter': IpFilterRunner(),
+            'ratelimit': RateLimitRunner(),
+            'upload': UploadRunner(),
+            'prefilter': PrefilterRunner(),
+            'dedup': DedupRunner(),
+            'validate': FieldsRunner(),
+            'blocklist': BlocklistRunner(),
+        }
+        self.runners = {
+            'discord': DiscordRunner(),
+            'dynamodb': DynamodbRunner(),
+            'email': EmailRunner(),
+            'slack': SlackRunner(),
+        }
+        # Stage timings, emitted once per invocation
+        self.metrics = Metrics()
+        self.response = None
+        if process:
+            self.handle(event)
+
+
+    def handle(self, event) -> dict:
+        """
+        Process an event, profiled and traced if requested, and return the response.
+        Runners clear their per-request state, so one provider can handle many events.
+        """
+        self.metrics = Metrics()
+        with self.metrics.timer('total'), profile(event), Trace('handler') as trace:
+            self.process(event)
+            trace.annotate(status=self.response.get('statusCode'))
+        self.metrics.emit(self.response)
+        return self.response
 
 
     def process(self, event) -> None:
@@ -36,60 +80,129 @@ class AppProvider:
         # Prepare request and response providers
         self.response_provider = ResponseProvider(event)
 
-        self.runners['discord'] = DiscordRunner()
-        self.runners['dynamodb'] = DynamodbRunner()
-        self.runners['email'] = EmailRunner()
-        self.runners['slack'] = SlackRunner()
-
         # Attempt to initialise configs
         try:
-            self.app_runner.configure()
-            self.hcaptcha_runner.configure()
-            self.runners['discord'].configure()
-            self.runners['dynamodb'].configure()
-            self.runners['email'].configure()
-            self.runners['slack'].configure()
+            with self.metrics.timer('config'):
+                self.configure()
         except ValueError as exception:
             # 500 error if any configs fail
-            logging.critical('Error configuring services')
-            logging.critical(exception)
+            logging.critical('Error configuring services: %s', exception)
             self.response = self.response_provider.message('Error configuring services', 500)
             return
 
-        # Process remaining logic
-        self.response = self.get_response(event)
+        # Process remaining logic, forgetting the previous request's duplicate check
+        self.checks['dedup'].reset()
+        try:
+            self.response = self.get_response(event)
+        finally:
+            # Uploaded files must not fill /tmp of a reused container, and validation
+            # abandoned by an error must not outlive the invocation
+            self.app_runner.close()
+            self.hcaptcha_runner.cancel()
+        # Remember the outcome for duplicate submissions
+        self.checks['dedup'].record(self.response)
+
+
+    def configure(self) -> None:
+        """
+        Configure all runners, raising ValueError on invalid configs
+        """
+        self.app_runner.configure()
+        self.hcaptcha_runner.configure()
+        for runner in self.checks.values():
+            runner.configure()
+        for runner in self.runners.values():
+            runner.configure()
 
 
     def get_response(self, event):
         """
-        Assuming all initialisations are complete, calculate the response
+        Assuming all initialisations are complete, calculate the response.
+        Cheap local checks run first, then hCaptcha verification is started and overlaps
+        runner preparation. Side effects only happen once verification has succeeded.
         """
 
-        # Core application runner that processes request
+        # Core application runner that parses request
         logging.debug('Executing app runner')
-        self.app_runner.run(event)
+        with self.metrics.timer('parse'):
+            self.app_runner.parse(event, self.response_provider)
         if self.app_runner.error_response is not None:
-            logging.critical('Error executing app runner')
-            logging.critical(self.app_runner.error_response)
+            logging.critical(
+                'Error executing app runner, status %s',
+                self.app_runner.error_response.get('statusCode'),
+            )
             return self.app_runner.error_response
 
         request_provider = self.app_runner.request_provider
 
-        # hCapture runner that should prevent further runners if validation fails
-        logging.debug('Executing hCaptcha runner')
-        self.hcaptcha_runner.run(request_provider, self.response_provider)
+        # Run checks in order, the first error response ends processing
+        for check_name, check in self.checks.items():
+            logging.debug('Executing %s runner', check_name)
+            with self.metrics.timer(check_name):
+                check.run(request_provider, self.response_provider)
+            if check.error_response is not None:
+                return check.error_response
+
+        # Start hCaptcha validation in the background, further runners are gated on its result
+        logging.debug('Starting hCaptcha runner')
+        with self.metrics.timer('hcaptcha'):
+            self.hcaptcha_runner.start(request_provider, self.response_provider)
         if self.hcaptcha_runner.error_response is not None:
-            logging.critical('Error executing hCaptcha runner')
-            logging.critical(self.hcaptcha_runner.error_response)
+            logging.critical(
+                'Error executing hCaptcha runner, status %s',
+                self.hcaptcha_runner.error_response.get('statusCode'),
+            )
             return self.hcaptcha_runner.error_response
 
+        return self.send(request_provider)
+
+
+    def send(self, request_provider):
+        """
+        Prepare runners while hCaptcha validation is in flight, then run them once it
+        has succeeded
+        """
+
+        # Extract fields and render templates while validation is in flight
+        prepare_error = None
+        for runner_name, runner in self.runners.items():
+            logging.debug('Preparing %s runner', runner_name)
+            with self.metrics.timer('prepare'):
+                runner.prepare(request_provider, self.response_provider)
+            if runner.error_response is not None:
+                logging.critical(
+                    'Error preparing %s runner, status %s',
+                    runner_name,
+                    runner.error_response.get('statusCode'),
+                )
+                prepare_error = runner.error_response
+                break
+
+        # Wait for hCaptcha, prepared work is discarded if validation fails
+        logging.debug('Waiting for hCaptcha runner')
+        with self.metrics.timer('hcaptcha'):
+            self.hcaptcha_runner.wait(self.response_provider)
+        if self.hcaptcha_runner.error_response is not None:
+            logging.critical(
+                'Error executing hCaptcha runner, status %s',
+                self.hcaptcha_runner.error_response.get('statusCode'),
+            )
+            return self.hcaptcha_runner.error_response
+
+        if prepare_error is not None:
+            return prepare_error
+
         # Iterate through all remaining runners and handle any failures
         for runner_name, runner in self.runners.items():
             logging.debug('Executing %s runner', runner_name)
-            runner.run(request_provider, self.response_provider)
+            with self.metrics.timer(runner_name), span(runner_name):
+                runner.send(self.response_provider)
             if runner.error_response is not None:
-                logging.critical('Error executing %s runner', runner_name)
-                logging.critical(runner.error_response)
+                logging.critical(
+                    'Error executing %s runner, status %s',
+                    runner_name,
+                    runner.error_response.get('statusCode'),
+                )
                 return runner.error_response
 
 
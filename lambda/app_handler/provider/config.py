@@ -2,8 +2,17 @@
 Configuration provider to fetch values using env vars and external provider
 """
 
+import os
+import threading
+import time
+
 from value_fetcher import ValueFetcher
 
+# Values fetched from SSM Parameter Store or Secrets Manager with their expiry times,
+# kept across warm invocations when CONFIG_CACHE_SECONDS is set
+REMOTE_VALUES = {}
+REMOTE_VALUES_LOCK = threading.Lock()
+
 class ConfigProvider:
     """
     Configuration provider class
@@ -11,9 +20,59 @@ class ConfigProvider:
     def __init__(self) -> None:
         self.env_defaults = {
             "REQUIRED_FIELDS": '',
+            "BODY_MAX_BYTES": '2097152',
+            "BODY_MAX_DECODED_BYTES": '1572864',
+            "BODY_MAX_FIELDS": '1000',
+            "BODY_MAX_DEPTH": '32',
+            "MULTIPART_MAX_FIELD_BYTES": '65536',
+            "MULTIPART_MAX_FILE_BYTES": '1048576',
+            "MULTIPART_SPOOL_BYTES": '262144',
             "HCAPTCHA_ENABLE": 'False',
             "HCAPTCHA_RESPONSE_FIELD": 'captcha-response',
             "HCAPTCHA_VERIFY_URL": 'https://hcaptcha.com/siteverify',
+            "HCAPTCHA_HEDGE_ENABLE": 'False',
+            "HCAPTCHA_HEDGE_PERCENTILE": '95',
+            "HCAPTCHA_HEDGE_DELAY_MS": '500',
+            "IPFILTER_ENABLE": 'False',
+            "IPFILTER_INDEX_PATH": '',
+            "IPFILTER_DEFAULT_ACTION": 'allow',
+            "RATELIMIT_ENABLE": 'False',
+            "RATELIMIT_RATE": '0.1',
+            "RATELIMIT_BURST": '5',
+            "RATELIMIT_MAX_ENTRIES": '10000',
+            "RATELIMIT_TABLE": '',
+            "RATELIMIT_REMOTE_THRESHOLD": '3',
+            "RATELIMIT_WINDOW_SECONDS": '60',
+            "RATELIMIT_GLOBAL_LIMIT": '10',
+            "DEDUP_ENABLE": 'False',
+            "DEDUP_TTL_SECONDS": '86400',
+            "DEDUP_CLAIM_SECONDS": '900',
+            "DEDUP_MAX_ENTRIES": '1000',
+            "DEDUP_TABLE": '',
+            "PREFILTER_ENABLE": 'False',
+            "PREFILTER_HONEYPOT_FIELD": '',
+            "PREFILTER_TIMESTAMP_FIELD": '',
+            "PREFILTER_MIN_FILL_SECONDS": '3',
+            "PREFILTER_MAX_AGE_SECONDS": '86400',
+            "PREFILTER_MAX_FIELD_LENGTH": '',
+            "PREFILTER_MAX_URLS": '',
+            "PREFILTER_BLOCKED_KEYWORDS": '',
+            "UPLOAD_ENABLE": 'False',
+            "UPLOAD_BUCKET": '',
+            "UPLOAD_PREFIX": 'uploads/',
+            "UPLOAD_PATH": '/uploads',
+            "UPLOAD_FIELD": 'attachments',
+            "UPLOAD_CONTENT_TYPES": 'image/png,image/jpeg,application/pdf',
+            "UPLOAD_MAX_BYTES": '10485760',
+            "UPLOAD_MAX_FILES": '5',
+            "UPLOAD_EXPIRES_SECONDS": '300',
+            "UPLOAD_LINK_EXPIRES_SECONDS": '3600',
+            "UPLOAD_TICKET_FIELD": 'ticket',
+            "UPLOAD_TICKET_SECRET": '',
+            "UPLOAD_TICKET_SECONDS": '1800',
+            "BLOCKLIST_ENABLE": 'False',
+            "BLOCKLIST_PATH": '',
+            "BLOCKLIST_S3_URI": '',
             "DYNAMODB_ENABLE": 'False',
             "EMAIL_ENABLE": 'False',
             "DISCORD_ENABLE": 'False',
@@ -21,6 +80,7 @@ class ConfigProvider:
         }
 
         self.value_fetcher = ValueFetcher(self.env_defaults)
+        self.cache_seconds = float(os.environ.get('CONFIG_CACHE_SECONDS', '0'))
 
 
     def configure(self) -> None:
@@ -33,6 +93,29 @@ class ConfigProvider:
         """
         Given a key name MY_VAL, check for a source env var e.g. MY_VAL_SOURCE.
         Raises exception if source does not match list of known services.
+        Values from remote sources are cached for CONFIG_CACHE_SECONDS.
         """
 
-        return self.value_fetcher.get(key)
+        key = key.upper()
+        source = os.environ.get(f'{key}_SOURCE', 'env').lower()
+        if source == 'env' or self.cache_seconds <= 0:
+            return self.value_fetcher.get(key)
+
+        cache_key = (
+            key,
+            source,
+            os.environ.get(f'{key}_PARAMETER_STORE_NAME'),
+            os.environ.get(f'{key}_SECRETS_MANAGER_NAME'),
+        )
+        now = time.monotonic()
+        with REMOTE_VALUES_LOCK:
+            expires, value = REMOTE_VALUES.get(cache_key, (0, None))
+        if expires > now:
+            return value
+
+        value = self.value_fetcher.get(key)
+        if value is not None:
+            with REMOTE_VALUES_LOCK:
+                REMOTE_VALUES[cache_key] = (now + self.cache_seconds, value)
+
+        return value
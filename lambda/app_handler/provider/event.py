@@ -0,0 +1,272 @@
+"""
+Classify Lambda events by source from a couple of discriminating keys.
+Each source has an adapter that reads the request from its event shape and builds
+the response it expects, so request and response building share one classification.
+    - Invocation as a Python function or Lambda function
+    - API Gateway REST and HTTP APIs with payload format 1.0
+    - API Gateway HTTP APIs with payload format 2.0
+    - Lambda function URLs
+    - Application Load Balancer targets, with or without multi-value headers
+    - SNS topics and SQS queues, handling the first record
+"""
+
+from http import HTTPStatus
+
+from app_handler.utils import codec
+from app_handler.utils.headers import Headers
+
+
+class DirectSource:
+    """
+    Direct invocation, where the event is the submission or wraps it in a body like
+    an API request. Unknown event shapes are handled the same way.
+    """
+    name = 'direct'
+
+    def get_message(self, event):
+        """
+        Dictionary holding the body, its encoding and headers, or None if the
+        event content is used as is
+        """
+        if isinstance(event, dict) and 'body' in event:
+            return event
+
+        return None
+
+
+    def get_content(self, event):
+        """
+        Content of an event without a body
+        """
+        return event
+
+
+    def get_headers(self, message:dict) -> Headers:
+        """
+        Case-insensitive view of the headers of a message
+        """
+        return Headers(message.get('headers'), message.get('multiValueHeaders'))
+
+
+    def get_path(self, event):
+        """
+        Request path, if any
+        """
+        if not isinstance(event, dict):
+            return None
+
+        path = event.get('path') or event.get('rawPath')
+        return path if isinstance(path, str) else None
+
+
+    def get_remote_ip(self, event):
+        """
+        Source IP address of the request, if any
+        """
+        if not isinstance(event, dict):
+            return None
+
+        context = event.get('requestContext')
+        if not isinstance(context, dict):
+            return None
+
+        for key in ('http', 'identity'):
+            if isinstance(context.get(key), dict) and 'sourceIp' in context[key]:
+                return context[key]['sourceIp']
+
+        return None
+
+
+    def build(self, body:dict, status_code:int, **kwargs) -> dict:
+        """
+        Response to return, the status code is added to the body
+        """
+        # pylint: disable=unused-argument
+        body['statusCode'] = status_code
+        return body
+
+
+class ApiV1Source(DirectSource):
+    """
+    API Gateway REST API, or HTTP API with payload format 1.0
+    """
+    name = 'api_v1'
+
+    def get_path(self, event):
+        return event.get('path')
+
+
+    def get_remote_ip(self, event):
+        try:
+            return event['requestContext']['identity']['sourceIp']
+        except (KeyError, TypeError):
+            return None
+
+
+    def build(self, body:dict, status_code:int, **kwargs) -> dict:
+        return {
+            "isBase64Encoded": kwargs.get('is_base64_encoded', False),
+            "statusCode": status_code,
+            "headers":  kwargs.get('headers', {'content-type':'application/json'}),
+            "multiValueHeaders": kwargs.get('multi_value_headers', {}),
+            "body": codec.dumps(body).decode(),
+        }
+
+
+class ApiV2Source(ApiV1Source):
+    """
+    API Gateway HTTP API with payload format 2.0
+    """
+    name = 'api_v2'
+
+    def get_path(self, event):
+        return event.get('rawPath')
+
+
+    def get_remote_ip(self, event):
+        try:
+            return event['requestContext']['http']['sourceIp']
+        except (KeyError, TypeError):
+            return None
+
+
+class FunctionUrlSource(ApiV2Source):
+    """
+    Lambda function URL, with the payload format 2.0 of HTTP APIs
+    """
+    name = 'function_url'
+
+    def build(self, body:dict, status_code:int, **kwargs) -> dict:
+        # Function URLs have no multi-value headers
+        output = super().build(body, status_code, **kwargs)
+        del output['multiValueHeaders']
+        return output
+
+
+class AlbSource(ApiV1Source):
+    """
+    Application Load Balancer target
+    """
+    name = 'alb'
+
+    def get_remote_ip(self, event):
+        # The load balancer appends the address it received the request from
+        forwarded = self.get_headers(event).get_all('x-forwarded-for')
+        if not forwarded or not isinstance(forwarded[-1], str):
+            return None
+
+        return forwarded[-1].rpartition(',')[2].strip() or None
+
+
+    def build(self, body:dict, status_code:int, **kwargs) -> dict:
+        output = super().build(body, status_code, **kwargs)
+        del output['multiValueHeaders']
+        output['statusDescription'] = get_status_description(status_code)
+        return output
+
+
+class AlbMultiValueSource(AlbSource):
+    """
+    Application Load Balancer target with multi-value headers enabled, requests and
+    responses only have multi-value headers
+    """
+    name = 'alb_multi_value'
+
+    def build(self, body:dict, status_code:int, **kwargs) -> dict:
+        output = ApiV1Source.build(self, body, status_code, **kwargs)
+        multi_value_headers = {key: [value] for key, value in output.pop('headers').items()}
+        for key, values in output['multiValueHeaders'].items():
+            multi_value_headers.setdefault(key, []).extend(values)
+        output['multiValueHeaders'] = multi_value_headers
+        output['statusDescription'] = get_status_description(status_code)
+        return output
+
+
+class SnsSource(DirectSource):
+    """
+    SNS topic notification, the message and subject of the first record are the content
+    """
+    name = 'sns'
+
+    def get_message(self, event):
+        return None
+
+
+    def get_content(self, event):
+        return event['Records'][0]['Sns']
+
+
+class SqsSource(DirectSource):
+    """
+    SQS queue message, the body of the first record is the content.
+    Bodies are JSON unless a `Content-Type` message attribute says otherwise.
+    """
+    name = 'sqs'
+
+    def get_message(self, event):
+        return event['Records'][0]
+
+
+    def get_headers(self, message:dict) -> Headers:
+        try:
+            content_type = message['messageAttributes']['Content-Type']['stringValue']
+        except (KeyError, TypeError):
+            content_type = 'application/json'
+
+        return Headers({'Content-Type': content_type})
+
+
+# One stateless adapter per source
+DIRECT = DirectSource()
+API_V1 = ApiV1Source()
+API_V2 = ApiV2Source()
+FUNCTION_URL = FunctionUrlSource()
+ALB = AlbSource()
+ALB_MULTI_VALUE = AlbMultiValueSource()
+SNS = SnsSource()
+SQS = SqsSource()
+
+
+def get_status_description(status_code:int) -> str:
+    """
+    Status line description required by load balancers, e.g. `200 OK`
+    """
+    try:
+        return f'{status_code} {HTTPStatus(status_code).phrase}'
+    except ValueError:
+        return str(status_code)
+
+
+def get_event_source(event) -> DirectSource:
+    """
+    Classify an event from its version, request context or first record,
+    without inspecting its body or headers
+    """
+    source = DIRECT
+    if not isinstance(event, dict):
+        return source
+
+    context = event.get('requestContext')
+    version = event.get('version')
+    version = version if isinstance(version, str) else ''
+    records = event.get('Records')
+    record = records[0] if isinstance(records, list) and records else None
+
+    if version.startswith('2.'):
+        # Function URL domains are <url-id>.lambda-url.<region>.on.aws
+        is_function_url = isinstance(context, dict) and \
+            '.lambda-url.' in str(context.get('domainName'))
+        source = FUNCTION_URL if is_function_url else API_V2
+    elif version.startswith('1.'):
+        source = API_V1
+    elif isinstance(context, dict) and 'elb' in context:
+        source = ALB_MULTI_VALUE if 'multiValueHeaders' in event else ALB
+    elif isinstance(context, dict) and 'httpMethod' in event:
+        # REST APIs may omit the version
+        source = API_V1
+    elif isinstance(record, dict) and 'Sns' in record:
+        source = SNS
+    elif isinstance(record, dict) and record.get('eventSource') == 'aws:sqs':
+        source = SQS
+
+    return source
@@ -0,0 +1,63 @@
+"""
+Init-time priming, so the first request after a cold start runs at warm-path latency
+"""
+
+import contextlib
+import logging
+from urllib.parse import urlsplit
+
+from app_handler.provider.app import AppProvider
+from app_handler.service.aws import AwsService
+from app_handler.service.http import preconnect
+from app_handler.service.http_pool import resolve
+from app_handler.utils import coldstart
+
+
+def get_urls(app_provider:AppProvider) -> list:
+    """
+    URLs of the enabled HTTP services
+    """
+    urls = []
+    if app_provider.hcaptcha_runner.enable:
+        urls.append(app_provider.hcaptcha_runner.verify_url)
+    for name in ('discord', 'slack'):
+        if app_provider.runners[name].enable:
+            urls.append(app_provider.runners[name].webhook_url)
+
+    return urls
+
+
+def prime(record:bool = True) -> None:
+    """
+    Resolve configs (cached with CONFIG_CACHE_SECONDS), create AWS clients, resolve DNS
+    and open pooled keep-alive connections for the enabled HTTP services.
+    Failures are logged and left for the first request to report.
+    """
+    phase = coldstart.phase if record else lambda name: contextlib.nullcontext()
+
+    try:
+        with phase('config'):
+            app_provider = AppProvider(None, process=False)
+            app_provider.configure()
+    except ValueError as exception:
+        logging.warning('Unable to prime configs: %s', exception)
+        return
+
+    with phase('clients'):
+        AwsService()
+
+    urls = get_urls(app_provider)
+    with phase('dns'):
+        for url in urls:
+            parts = urlsplit(url)
+            try:
+                resolve(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+            except OSError as exception:
+                logging.warning('Unable to resolve %s: %s', parts.hostname, exception)
+
+    with phase('connect'):
+        for url in urls:
+            try:
+                preconnect(url)
+            except (OSError, ValueError) as exception:
+                logging.warning('Unable to connect to %s: %s', urlsplit(url).hostname, exception)
@@ -3,152 +3,266 @@ Parse incoming request to lambda
 """
 
 import base64
-import json
-from json import JSONDecodeError
-import urllib
 import logging
 
+from app_handler.provider.event import DirectSource, get_event_source
+from app_handler.utils import codec
+from app_handler.utils.form import decode_form
+from app_handler.utils.headers import Headers
+from app_handler.utils.limits import BodyLimits
+from app_handler.utils.multipart import MultipartParser, PartTooLarge, body_chunks, get_param
+
+class RequestBody:
+    """
+    Size limits of a request body and the state of parsing it
+    """
+    def __init__(self, limits:BodyLimits = None):
+        self.limits = limits or BodyLimits()
+        # Streaming parser of a multipart form, holding its fields and uploaded files
+        self.parser = None
+        self.too_large = False
+
+    @property
+    def files(self):
+        """
+        Uploaded files of a parsed multipart form, by field name
+        """
+        if self.parser is None:
+            return {}
+
+        return self.parser.files
+
+    def close(self):
+        """
+        Close uploaded files, deleting any moved to disk
+        """
+        if self.parser is not None:
+            self.parser.close()
+
+
 class RequestProvider:
     """
     Parse incoming request to lambda
     """
-    def __init__(self, payload):
+    def __init__(self, payload, limits:BodyLimits = None, source:DirectSource = None):
         self.payload = payload
+        self.body = RequestBody(limits)
+        # Adapter for the event source, classified unless given
+        self.source = source or get_event_source(payload)
+        # Case-insensitive view of the original headers
+        self.headers = Headers()
         self.content = payload
         self.has_error = None
-        self.matched = False
+        # Keys and links of attachments uploaded to S3, set when uploads are enabled
+        self.attachments = None
         self.parse(payload)
 
+    @property
+    def too_large(self):
+        """
+        Whether the body was rejected for exceeding its size limits
+        """
+        return self.body.too_large
+
+    @property
+    def files(self):
+        """
+        Uploaded files of multipart forms, by field name
+        """
+        return self.body.files
+
     def parse(self, payload):
         """
-        Parse incoming payload and retrieve content.
-        Handles the following cases:
-            - Invocation as a Python function
-            - Invocation of Lambda function
-            - Invocation behind an AWS HTTP v2 API Gateway
-            - Invocation by an SNS topic
+        Parse incoming payload and retrieve content, reading the body, its encoding
+        and headers where the event source keeps them
         """
 
-        # Check if lambda was invoked as an SNS message
-        if self.is_sns_message(payload):
+        message = self.source.get_message(payload)
+        if message is None or 'body' not in message:
+            logging.debug('Body not in %s payload, returning content', self.source.name)
+            self.content = self.source.get_content(payload)
             return
 
-        if 'body' not in payload:
-            logging.debug('Body not in payload, returning payload')
-            return
+        self.headers = self.source.get_headers(message)
+        self.content = message['body']
+        base64_encoded = message.get('isBase64Encoded') is True
 
-        self.content = payload['body']
+        # Reject oversized bodies before spending any time or memory decoding them
+        if isinstance(self.content, (str, bytes)) and \
+                self.body.limits.too_large(self.content, base64_encoded):
+            logging.warning('Request body of %s bytes exceeds size limits', len(self.content))
+            self.body.too_large = True
+            self.has_error = True
+            return
 
-        if 'isBase64Encoded' in payload and payload['isBase64Encoded'] is True:
+        # Multipart forms are decoded as they are parsed
+        if base64_encoded and not self.is_multipart():
             logging.debug('Body is base64 encoded, decoding')
-            self.content = str(base64.b64decode(payload['body']), "utf-8")
+            try:
+                # Decoded to bytes, which the JSON and form parsers accept without a str copy
+                self.content = base64.b64decode(self.content)
+            except ValueError as exception:
+                logging.critical('Error decoding base64 body: %s', exception)
+                self.has_error = True
+                return
 
-        if 'headers' not in payload:
+        # Without headers, the body is returned as text
+        if not self.headers:
             logging.debug('No headers present, using body')
+            self.decode_text()
             return
 
-        headers = payload['headers']
-        # Ensure headers object is a non-empty dictionary
-        if not isinstance(headers, dict) or not headers:
-            logging.debug('Unexpected headers object format')
-            return
-
-        # Lowercase all headers
-        headers_lower = {}
-        for key, value in headers.items():
-            if isinstance(key, str) and isinstance(value, str):
-                headers_lower[key.lower()] = value.lower()
-
-        if 'content-type' not in headers_lower:
+        content_type = self.headers.get('content-type')
+        if not isinstance(content_type, str):
             logging.debug('Content-Type header not present, returning body')
+            self.decode_text()
             return
 
-        content_type = headers_lower['content-type']
-
+        # Only the media type is matched case-insensitively, the header keeps its case
         content_type = content_type.lower()
         logging.debug('Content-Type detected: %s', content_type)
 
-        self.is_form_url_encoded(content_type=content_type)
+        matched = self.is_form_url_encoded(content_type=content_type) or \
+            self.is_application_json(content_type=content_type) or \
+            self.is_multipart_form_data(content_type=content_type, base64_encoded=base64_encoded)
 
-        self.is_application_json(content_type=content_type)
-
-        if not self.matched:
+        if not matched:
             logging.critical('Error determining how to load content type.')
             self.has_error = True
 
-    def get_remote_ip(self):
+    def decode_text(self):
         """
-        Extract remote IP address from request, if provided
+        Decode a base64 decoded body returned without parsing as UTF-8 text
         """
-        remote_ip = None
-
-        try:
-            # V2 gateway request
-            remote_ip = self.payload['requestContext']['http']['sourceIp']
-        except KeyError:
-            pass
-
-        try:
-            # V1 gateway request
-            remote_ip = self.payload['requestContext']['identity']['sourceIp']
-        except KeyError:
-            pass
+        if isinstance(self.content, bytes):
+            try:
+                self.content = self.content.decode('utf-8')
+            except UnicodeDecodeError as exception:
+                logging.critical('Error decoding body as UTF-8: %s', exception)
+                self.has_error = True
 
-        logging.debug('Fetched remote IP from payload: %s', remote_ip)
+    def close(self):
+        """
+        Close uploaded files, deleting any moved to disk
+        """
+        self.body.close()
 
-        return remote_ip
+    def get_header(self, name:str):
+        """
+        Fetch a request header value by case-insensitive name, if provided,
+        with its original case
+        """
+        return self.headers.get(name)
 
+    def get_path(self):
+        """
+        Extract the request path, if provided
+        """
+        return self.source.get_path(self.payload)
 
-    def is_sns_message(self, payload):
+    def get_remote_ip(self):
         """
-        Determine if payload is an SNS message
+        Extract remote IP address from request, if provided
         """
-        # Handle first SNS message
-        if 'Records' in payload and isinstance(payload['Records'], list):
-            record = payload['Records'][0]
-            if 'Sns' in record and 'Message' in record['Sns'] and 'Subject' in record['Sns']:
-                logging.debug('SNS payload extracted')
-                self.content = record['Sns']
-                return True
+        remote_ip = self.source.get_remote_ip(self.payload)
+        logging.debug('Fetched remote IP from payload: %s', remote_ip)
 
-        return False
+        return remote_ip
 
 
     def is_application_json(self, content_type: str):
         """
-        Determine of payload is JSON
+        Determine of payload is JSON, returning whether it was loaded
         """
         if content_type.startswith('application/json'):
             logging.debug('Loading JSON string')
             try:
-                self.content = json.loads(self.content, strict=False)
-                logging.debug(self.content)
-                self.matched = True
+                if isinstance(self.content, bytes):
+                    # json would decode bytes to text and keep both, so release the
+                    # bytes before parsing
+                    self.content = self.content.decode('utf-8')
+                self.content = codec.loads(self.content, strict=False)
+                self.body.limits.check_json(self.content)
+                logging.debug('Parsed request content %s', self.content)
+                return True
             except (
-                JSONDecodeError,
-                TypeError
+                RecursionError,
+                TypeError,
+                ValueError
             ) as exception:
-                logging.critical('Error loading string as JSON')
-                logging.critical(exception)
+                logging.critical('Error loading string as JSON: %s', exception)
                 self.has_error = True
 
+        return False
+
 
     def is_form_url_encoded(self, content_type: str):
         """
-        Determine if payload is form URL encoded
+        Determine if payload is form URL encoded, returning whether it was decoded
         """
         if content_type.startswith('application/x-www-form-urlencoded'):
             logging.debug('Decoding URL encoded form')
             try:
-                html_decoded = urllib.parse.unquote(self.content)
-                # Assume each value should only appear once, drop repeat keys
-                self.content = dict(urllib.parse.parse_qsl(html_decoded))
-                logging.debug(self.content)
-                self.matched = True
+                # Repeated keys, e.g. checkbox groups, are kept as lists of values
+                self.content = decode_form(self.content, self.body.limits.max_fields)
+                logging.debug('Parsed request content %s', self.content)
+                return True
             except(
                 AttributeError,
                 ValueError
             ) as exception:
-                logging.critical('Error decoding URL encoded form')
-                logging.critical(exception)
+                logging.critical('Error decoding URL encoded form: %s', exception)
                 self.has_error = True
+
+        return False
+
+
+    def is_multipart(self):
+        """
+        Determine from the original headers if payload is a multipart form
+        """
+        content_type = self.get_header('content-type')
+        return isinstance(content_type, str) and \
+            content_type.lower().startswith('multipart/form-data')
+
+
+    def is_multipart_form_data(self, content_type: str, base64_encoded: bool):
+        """
+        Determine if payload is a multipart form, parsing it as a stream.
+        Text parts become fields and file parts uploaded files.
+        Returns whether the form was parsed.
+        """
+        if content_type.startswith('multipart/form-data'):
+            logging.debug('Parsing multipart form')
+            try:
+                # The boundary is case sensitive, so read from the original header
+                boundary = get_param(self.get_header('content-type'), 'content-type', 'boundary')
+                if not boundary:
+                    raise ValueError('Multipart form without a boundary')
+                parser = MultipartParser(boundary, self.body.limits)
+                self.body.parser = parser
+                parser.parse(body_chunks(self.content, base64_encoded))
+                self.content = parser.fields
+                logging.debug('Parsed request content %s and files %s', self.content, self.files)
+                return True
+            except PartTooLarge as exception:
+                logging.warning('Multipart form part too large: %s', exception)
+                self.discard()
+                self.body.too_large = True
+                self.has_error = True
+            except(
+                TypeError,
+                ValueError
+            ) as exception:
+                logging.critical('Error parsing multipart form: %s', exception)
+                self.discard()
+                self.has_error = True
+
+        return False
+
+    def discard(self):
+        """
+        Close the files of a multipart form that failed to parse, keeping none of them
+        """
+        self.body.close()
+        self.body.parser = None
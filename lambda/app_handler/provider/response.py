@@ -3,34 +3,21 @@ Response provider
 """
 
 import logging
-import json
+
+from app_handler.provider.event import DirectSource, get_event_source
 
 class ResponseProvider:
     """
     Response provider class
     """
 
-    def __init__(self, event) -> None:
+    def __init__(self, event, source:DirectSource = None) -> None:
         """
-        Initialise response based on request format
+        Initialise response based on the event source, classified unless given
         """
 
-        self.is_v1 = False
-        self.is_v2 = False
-
-        # Use the request object to determine API type (if any)
-        if isinstance(event, dict) and 'version' in event:
-            version = event['version']
-            logging.debug("API version: %s", version)
-
-            if version.startswith('1.'):
-                self.is_v1 = True
-            elif version.startswith('2.'):
-                self.is_v2 = True
-            else:
-                logging.warning("Unknown API version %s", version)
-        else:
-            logging.warning("Unknown API version %s")
+        self.source = source or get_event_source(event)
+        logging.debug("Event source: %s", self.source.name)
 
     def message(self, message, status_code=200):
         """
@@ -44,22 +31,7 @@ class ResponseProvider:
 
     def build(self, body, status_code=200, **kwargs):
         """
-        Prepare output for API integration
+        Prepare output for the event source, e.g. an API integration
         https://docs.aws.amazon.com/apigateway/latest/developerguide/http-api-develop-integrations-lambda.html
         """
-
-        # If request came from a non-API integration, append status code to body
-        if not self.is_v1 and not self.is_v2:
-            body['statusCode'] = status_code
-            return body
-
-        # Prepare a v1 or v2 API integration response
-        output = {
-            "isBase64Encoded": kwargs.get('is_base64_encoded', False),
-            "statusCode": status_code,
-            "headers":  kwargs.get('headers', {'content-type':'application/json'}),
-            "multiValueHeaders": kwargs.get('multi_value_headers', {}),
-            "body": json.dumps(body),
-        }
-
-        return output
+        return self.source.build(body, status_code, **kwargs)
@@ -4,7 +4,9 @@ from json import JSONDecodeError
 from app_handler.provider.config import ConfigProvider
 from app_handler.provider.request import RequestProvider
 from app_handler.provider.response import ResponseProvider
+from app_handler.runner.fields import check_fields
 from app_handler.utils.functions import string_to_dict
+from app_handler.utils.limits import BodyLimits
 
 class AppRunner:
     """
@@ -16,7 +18,10 @@ class AppRunner:
 
         # Set default values
         self.required_fields = {}
+        self.limits = BodyLimits()
         self.request_provider = {}
+        self.response_provider = None
+        self.request_body = None
         self.error_response = None
 
 
@@ -28,6 +33,15 @@ class AppRunner:
 
         # Extract required field names into config object
         self.required_fields = string_to_dict(configs.get('REQUIRED_FIELDS'))
+        self.limits = BodyLimits(
+            max_bytes=int(configs.get('BODY_MAX_BYTES')),
+            max_decoded_bytes=int(configs.get('BODY_MAX_DECODED_BYTES')),
+            max_fields=int(configs.get('BODY_MAX_FIELDS')),
+            max_depth=int(configs.get('BODY_MAX_DEPTH')),
+            max_field_bytes=int(configs.get('MULTIPART_MAX_FIELD_BYTES')),
+            max_file_bytes=int(configs.get('MULTIPART_MAX_FILE_BYTES')),
+            spool_bytes=int(configs.get('MULTIPART_SPOOL_BYTES')),
+        )
 
 
     def run(self, event):
@@ -35,26 +49,55 @@ class AppRunner:
         Run app and capture any errors
         """
 
-        response_provider = ResponseProvider(event)
-        self.request_provider = RequestProvider(event)
+        self.parse(event)
+        if self.error_response is None:
+            self.validate()
+
+
+    def parse(self, event, response_provider:ResponseProvider = None):
+        """
+        Parse incoming event into request and response providers, sharing the
+        event source of a given response provider
+        """
+
+        self.error_response = None
+        self.request_body = None
+        self.response_provider = response_provider or ResponseProvider(event)
+        # Uploaded files of the previous request are no longer needed
+        self.close()
+        self.request_provider = RequestProvider(
+            event,
+            self.limits,
+            self.response_provider.source,
+        )
+        if self.request_provider.too_large:
+            # 413 error if the body exceeds size limits
+            self.error_response = self.response_provider.message('Request body too large', 413)
+            return
+
         if self.request_provider.has_error:
             # 400 error if provided bad JSON
-            self.error_response = response_provider.message('Error parsing request', 400)
+            self.error_response = self.response_provider.message('Error parsing request', 400)
             return
 
         self.request_body = self.request_provider.content
 
-        for field in self.required_fields:
-            if field not in self.request_body:
-                # 400 error if request did not contain a required field
-                message = f'Missing required field `{field}`'
-                logging.warning(message)
-                self.error_response = response_provider.message(message, 400)
-                return
-
-            if len(self.request_body[field]) == 0:
-                # 400 error if required field exists but is empty
-                message = f'Required field empty `{field}`'
-                logging.warning(message)
-                self.error_response = response_provider.message(message, 400)
-                return
+
+    def close(self):
+        """
+        Close uploaded files of the parsed request, deleting any moved to disk
+        """
+        if isinstance(self.request_provider, RequestProvider):
+            self.request_provider.close()
+
+
+    def validate(self):
+        """
+        Ensure required fields are present and non-empty in the parsed request
+        """
+
+        message = check_fields(self.required_fields, self.request_body)
+        if message is not None:
+            # 400 error if request did not contain a required field or left it empty
+            logging.warning(message)
+            self.error_response = self.response_provider.message(message, 400)
@@ -0,0 +1,101 @@
+import logging
+import pathlib
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.service.aws import AwsService
+from app_handler.utils.aho_corasick import AhoCorasick
+from app_handler.utils.functions import string_to_dict
+
+# Blocklist packaged with the application
+DEFAULT_PATH = pathlib.Path(__file__).parent.parent / 'data' / 'blocklist.txt'
+
+# Compiled matchers by source, built once per container
+MATCHERS = {}
+
+
+def parse_patterns(text:str) -> list:
+    """
+    Extract one pattern per line, ignoring blank lines and # comments
+    """
+    patterns = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            patterns.append(stripped)
+
+    return patterns
+
+
+def load_matcher(path:str, s3_uri:str):
+    """
+    Load and compile the blocklist from an S3 object if configured, otherwise a local file.
+    Compiled matchers are cached for subsequent invocations.
+    """
+    source = s3_uri or path
+    if source in MATCHERS:
+        return MATCHERS[source]
+
+    if s3_uri:
+        bucket, _, key = s3_uri.removeprefix('s3://').partition('/')
+        text = AwsService().get_s3_object(bucket, key)
+        if text is None:
+            raise ValueError(f'Unable to load blocklist {s3_uri}')
+    else:
+        try:
+            text = pathlib.Path(path).read_text('UTF-8')
+        except OSError as exception:
+            raise ValueError(f'Unable to load blocklist {path}') from exception
+
+    matcher = AhoCorasick(parse_patterns(text))
+    logging.info('Compiled blocklist of %s patterns from %s', matcher.size, source)
+    MATCHERS[source] = matcher
+    return matcher
+
+
+class BlocklistRunner:
+    """
+    Rejects submissions whose required fields contain a blocked phrase or domain
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.enable = None
+        self.matcher = None
+        self.fields = {}
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising blocklist config")
+        self.enable = configs.get('BLOCKLIST_ENABLE').lower() == 'true'
+        logging.debug("Blocklist enable: %s", self.enable)
+
+        if self.enable:
+            path = configs.get('BLOCKLIST_PATH') or str(DEFAULT_PATH)
+            self.matcher = load_matcher(path, configs.get('BLOCKLIST_S3_URI'))
+            # Extract required field names into config object
+            self.fields = string_to_dict(configs.get('REQUIRED_FIELDS'))
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Match all required fields against the blocklist in a single pass
+        """
+
+        self.error_response = None
+        if self.enable:
+            # Separator cannot appear in patterns, so matches never span fields
+            text = '\0'.join(str(request_provider.content[field]) for field in self.fields)
+            pattern = self.matcher.search(text)
+            if pattern is not None:
+                logging.info('Blocklist pattern matched submission: %s', pattern)
+                self.error_response = response_provider.message('Submission rejected', 400)
+
+            return pattern
+
+        return None
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.service.aws import AwsService
+from app_handler.utils.functions import string_to_dict
+
+# Recent successful outcomes by submission key, kept across warm invocations
+RECENT = OrderedDict()
+RECENT_LOCK = threading.Lock()
+
+
+def get_recent(key:str, now:float):
+    """
+    Return a recent unexpired outcome for the key, if any
+    """
+    with RECENT_LOCK:
+        entry = RECENT.get(key)
+        if entry is None:
+            return None
+        expires, response = entry
+        if expires < now:
+            del RECENT[key]
+            return None
+        RECENT.move_to_end(key)
+        return response
+
+
+def put_recent(key:str, response:dict, expires:float, max_entries:int) -> None:
+    """
+    Remember an outcome, evicting the least recently used
+    """
+    with RECENT_LOCK:
+        RECENT[key] = (expires, response)
+        RECENT.move_to_end(key)
+        while len(RECENT) > max_entries:
+            RECENT.popitem(last=False)
+
+
+class DedupRunner:
+    """
+    Suppresses duplicate submissions such as double-clicks and client retries.
+    Submissions are keyed on the Idempotency-Key header if provided, otherwise a hash of
+    the normalised required fields, and checked against recent outcomes in memory and then
+    a DynamoDB conditional put.
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.duplicate_response = None
+        self.enable = None
+        self.ttl_seconds = None
+        self.claim_seconds = None
+        self.max_entries = None
+        self.table = None
+        self.fields = {}
+        self.key = None
+        self.claimed = False
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising dedup config")
+        self.enable = configs.get('DEDUP_ENABLE').lower() == 'true'
+        logging.debug("Dedup enable: %s", self.enable)
+
+        if self.enable:
+            self.ttl_seconds = int(configs.get('DEDUP_TTL_SECONDS'))
+            self.claim_seconds = int(configs.get('DEDUP_CLAIM_SECONDS'))
+            self.max_entries = int(configs.get('DEDUP_MAX_ENTRIES'))
+            # Empty table keeps deduplication local to the container
+            self.table = configs.get('DEDUP_TABLE')
+            # Extract required field names into config object
+            self.fields = string_to_dict(configs.get('REQUIRED_FIELDS'))
+
+
+    def get_key(self, request_provider:RequestProvider) -> str:
+        """
+        Submission key from the idempotency header or the normalised required fields
+        """
+        idempotency_key = request_provider.get_header('Idempotency-Key')
+        if idempotency_key:
+            return f'dedup#key#{idempotency_key}'
+
+        content = request_provider.content
+        if isinstance(content, dict):
+            # Without required fields, the whole submission identifies it
+            names = sorted(self.fields) if self.fields else sorted(content)
+            normalised = [
+                [field, ' '.join(str(content.get(field, '')).split())]
+                for field in names
+            ]
+        else:
+            normalised = ' '.join(str(content).split())
+
+        digest = hashlib.sha256(json.dumps(normalised).encode()).hexdigest()
+        return f'dedup#hash#{digest}'
+
+
+    def reset(self) -> None:
+        """
+        Clear the previous request's key and claim, record() relies on them
+        """
+        self.error_response = None
+        self.duplicate_response = None
+        self.key = None
+        self.claimed = False
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Check for a previous outcome of the same submission, claiming it if there is none.
+        A duplicate's outcome is also the error response, ending processing.
+        """
+
+        self.reset()
+
+        if self.enable:
+            self.duplicate_response = self.find_duplicate(request_provider, response_provider)
+            self.error_response = self.duplicate_response
+
+        return self.duplicate_response
+
+
+    def find_duplicate(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Outcome of a previous identical submission, or None after claiming this one
+        """
+        now = time.time()
+        self.key = self.get_key(request_provider)
+
+        response = get_recent(self.key, now)
+        if response is not None:
+            logging.info('Duplicate submission %s found in memory', self.key)
+            return response
+
+        if self.table:
+            # Claims only outlive the invocation by a little, so the claim of one that
+            # timed out or crashed before recording its outcome is soon taken over
+            item = {'id': self.key, 'expires': int(now) + self.claim_seconds}
+            claimed = AwsService().put_dynamodb_record(self.table, item, if_absent=True)
+            if claimed is False:
+                return self.get_stored_response(response_provider)
+            # Errors fail open, processing the submission as new
+            self.claimed = bool(claimed)
+
+        return None
+
+
+    def get_stored_response(self, response_provider:ResponseProvider):
+        """
+        Return the outcome stored by the first submission, or a conflict if still in progress
+        """
+        item = AwsService().get_dynamodb_record(self.table, self.key)
+        if item is not None and 'response' in item:
+            logging.info('Duplicate submission %s found in DynamoDB', self.key)
+            response = json.loads(item['response'])
+            put_recent(self.key, response, int(item['expires']), self.max_entries)
+            return response
+
+        logging.info('Duplicate submission %s still in progress', self.key)
+        return response_provider.message('Duplicate submission in progress', 409)
+
+
+    def record(self, response:dict) -> None:
+        """
+        Store a successful outcome for later duplicates, or release the claim so retries
+        of failed submissions are processed again
+        """
+
+        if not self.enable or self.key is None or self.duplicate_response is not None:
+            return
+
+        successful = 200 <= response.get('statusCode', 500) < 300
+        expires = int(time.time()) + self.ttl_seconds
+
+        if successful:
+            put_recent(self.key, response, expires, self.max_entries)
+
+        if self.claimed:
+            aws = AwsService()
+            # Storing the outcome extends the claim to the full TTL
+            if successful:
+                item = {'id': self.key, 'expires': expires, 'response': json.dumps(response)}
+                aws.put_dynamodb_record(self.table, item)
+            else:
+                aws.delete_dynamodb_record(self.table, self.key)
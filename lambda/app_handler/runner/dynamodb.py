@@ -13,6 +13,9 @@ class DynamodbRunner:
         self.table = None
         self.enable = None
         self.fields = {}
+        # Per-request state, cleared by prepare()
+        self.values = {}
+        self.prepared = False
 
     def configure(self):
         """
@@ -35,6 +38,23 @@ class DynamodbRunner:
         Run app
         """
 
+        self.prepare(request_provider, response_provider)
+        if self.error_response is None:
+            return self.send(response_provider)
+
+        return None
+
+
+    def prepare(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Extract fields to store without making any network calls
+        """
+
+        # Forget any previous request so a reused runner never stores stale fields
+        self.error_response = None
+        self.values = {}
+        self.prepared = False
+
         if self.enable:
 
             # Extract fields from request body for template
@@ -47,12 +67,27 @@ class DynamodbRunner:
                     logging.critical(exception)
                     self.error_response = response_provider.message('Notification service error', 500)
                     return
-            self.fields = fields
+
+            # Keys of attachments uploaded to S3
+            if request_provider.attachments is not None:
+                fields['attachments'] = [
+                    attachment['key'] for attachment in request_provider.attachments
+                ]
+            self.values = fields
+            self.prepared = True
+
+
+    def send(self, response_provider:ResponseProvider):
+        """
+        Store the fields extracted by prepare()
+        """
+
+        if self.prepared:
 
             aws = AwsService()
             result = aws.put_dynamodb_item(
                 self.table,
-                self.fields
+                self.values
             )
             if not result:
                 # 500 error if service result was not successful
@@ -17,6 +17,9 @@ class EmailRunner:
         self.subject_template = None
         self.text_template = None
         self.fields = None
+        # Per-request state, cleared by prepare()
+        self.values = {}
+        self.body = None
 
     def configure(self):
         """
@@ -43,6 +46,24 @@ class EmailRunner:
         Run app
         """
 
+        self.prepare(request_provider, response_provider)
+        if self.error_response is None:
+            return self.send(response_provider)
+
+        return None
+
+
+    def prepare(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Extract fields and build email subject and body without making any network calls
+        """
+
+        # Forget any previous request so a reused runner never sends a stale email
+        self.error_response = None
+        self.values = {}
+        self.subject = None
+        self.body = None
+
         if self.enable:
 
             # Extract required fields from request body for template
@@ -55,30 +76,44 @@ class EmailRunner:
                     logging.critical(exception)
                     self.error_response = response_provider.message('Notification service error', 500)
                     return
-            self.fields = fields
+
+            # Presigned links to attachments uploaded to S3, one per line
+            if request_provider.attachments is not None:
+                fields['attachments'] = '\n'.join(
+                    attachment['link'] for attachment in request_provider.attachments
+                )
+
+            self.values = fields
 
             # Build string body from text template
             # Build subject from template
             text_template = Template(self.text_template)
             subject_template = Template(self.subject_template)
             try:
-                body = text_template.substitute(self.fields)
-                subject = subject_template.substitute(self.fields)
+                self.body = text_template.substitute(self.values)
+                self.subject = subject_template.substitute(self.values)
             except (
                 ValueError,
                 KeyError
             ) as exception:
-                logging.critical('Email template parsing error')
-                logging.critical(exception)
+                logging.critical('Email template parsing error: %s', exception)
                 self.error_response = response_provider.message('Notification service error', 500)
                 return
 
+
+    def send(self, response_provider:ResponseProvider):
+        """
+        Send the email prepared by prepare()
+        """
+
+        if self.body is not None:
+
             aws = AwsService()
             result = aws.send_email(
                 self.recipients,
                 self.sender,
-                subject,
-                body
+                self.subject,
+                self.body
             )
 
             if not result:
@@ -0,0 +1,54 @@
+import logging
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.utils.functions import string_to_dict
+
+
+def check_fields(fields:dict, content):
+    """
+    Message for the first required field missing or empty in the content, None if all are set
+    """
+    for field in fields:
+        if field not in content:
+            return f'Missing required field `{field}`'
+
+        if len(content[field]) == 0:
+            return f'Required field empty `{field}`'
+
+    return None
+
+
+class FieldsRunner:
+    """
+    Rejects submissions missing any required field, or with one left empty
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.fields = {}
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        # Extract required field names into config object
+        self.fields = string_to_dict(configs.get('REQUIRED_FIELDS'))
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Ensure required fields are present and non-empty in the parsed request
+        """
+
+        self.error_response = None
+        message = check_fields(self.fields, request_provider.content)
+        if message is not None:
+            # 400 error if request did not contain a required field or left it empty
+            logging.warning(message)
+            self.error_response = response_provider.message(message, 400)
+
+        return message
@@ -1,10 +1,11 @@
 
 import logging
-from urllib.error import HTTPError
+from concurrent.futures import wait
 
 from app_handler.service.hcaptcha import HcaptchaService
 from app_handler.provider.config import ConfigProvider
 from app_handler.provider.response import ResponseProvider
+from app_handler.utils.executor import submit
 
 class HcaptchaRunner:
     def __init__(self) -> None:
@@ -16,6 +17,11 @@ class HcaptchaRunner:
         self.secret = None
         self.verify_url = None
         self.response_field = None
+        self.hedge_enable = None
+        self.hedge_percentile = None
+        self.hedge_delay = None
+        self.hcaptcha_service = None
+        self.future = None
 
     def configure(self):
         """
@@ -33,13 +39,32 @@ class HcaptchaRunner:
             self.secret = configs.get('HCAPTCHA_SECRET')
             self.verify_url = configs.get('HCAPTCHA_VERIFY_URL')
             self.response_field = configs.get('HCAPTCHA_RESPONSE_FIELD')
+            self.hedge_enable = configs.get('HCAPTCHA_HEDGE_ENABLE').lower() == 'true'
+            logging.debug("hCaptcha hedging enable: %s", self.hedge_enable)
+            if self.hedge_enable:
+                self.hedge_percentile = float(configs.get('HCAPTCHA_HEDGE_PERCENTILE'))
+                self.hedge_delay = int(configs.get('HCAPTCHA_HEDGE_DELAY_MS')) / 1000
 
 
     def run(self, request_provider, response_provider: ResponseProvider):
         """
-        Run builder
+        Run builder, blocking until validation completes
         """
 
+        self.start(request_provider, response_provider)
+        return self.wait(response_provider)
+
+
+    def start(self, request_provider, response_provider: ResponseProvider):
+        """
+        Start validation in the background so other work can overlap the siteverify call
+        """
+
+        # Clear the previous request's outcome
+        self.error_response = None
+        self.hcaptcha_service = None
+        self.future = None
+
         if self.enable:
             logging.debug('Fetching user response using field name: %s', self.response_field)
             # 400 error if request did not contain a captcha user response
@@ -53,27 +78,58 @@ class HcaptchaRunner:
                 self.error_response = response_provider.message('Missing captcha user response field', 400)
                 return
 
-            hcaptcha_service = HcaptchaService(
+            self.hcaptcha_service = HcaptchaService(
                 self.secret,
                 self.sitekey,
-                self.verify_url
+                self.verify_url,
+                self.hedge_percentile,
+                self.hedge_delay,
             )
 
             user_ip = request_provider.get_remote_ip()
 
-            # Perform validation
-            response = hcaptcha_service.validate(user_response, user_ip)
-            # 500 error if service has failed
-            if not response or 'status' not in response or response['status'] > 399:
-                # 500 error if service runtime error
-                logging.critical('hCaptcha HTTP error')
-                self.error_response = response_provider.message('hCaptcha service error', 500)
-                return
+            # Perform validation in the background
+            self.future = submit(self.hcaptcha_service.validate, user_response, user_ip)
+
+
+    def wait(self, response_provider: ResponseProvider):
+        """
+        Wait for a previously started validation and process the result
+        """
+
+        if self.future is None:
+            return None
+
+        response = self.future.result()
+        self.future = None
+
+        # 500 error if service has failed
+        if not response or response.get('status') is None or response['status'] > 399:
+            # 500 error if service runtime error
+            logging.critical('hCaptcha HTTP error')
+            self.error_response = response_provider.message('hCaptcha service error', 500)
+            return
+
+        if not self.hcaptcha_service.success:
+            # 401 unauthorised if captcha validation fails
+            message = 'captcha validation failed'
+            logging.info(message)
+            self.error_response = response_provider.message(message, 401)
+
+        return response
+
+
+    def cancel(self):
+        """
+        Abort a validation that was started but never waited on, e.g. for a request
+        rejected by a later check, and wait for it to stop so it never runs into the
+        next invocation
+        """
 
-            if not hcaptcha_service.success:
-                # 401 unauthorised if captcha validation fails
-                message = 'captcha validation failed'
-                logging.info(message)
-                self.error_response = response_provider.message(message, 401)
+        if self.future is None:
+            return
 
-            return response
+        if not self.future.cancel():
+            self.hcaptcha_service.cancel()
+            wait([self.future])
+        self.future = None
@@ -0,0 +1,82 @@
+import logging
+import pathlib
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.utils.ip_index import IpIndex
+
+# Index built at package time from ip_lists/
+DEFAULT_PATH = pathlib.Path(__file__).parent.parent / 'data' / 'ip_index.bin'
+
+# Memory-mapped indexes by path, opened once per container
+INDEXES = {}
+
+
+def load_index(path:str) -> IpIndex:
+    """
+    Open the index file, reusing it on subsequent invocations
+    """
+    if path not in INDEXES:
+        try:
+            INDEXES[path] = IpIndex(path)
+        except OSError as exception:
+            raise ValueError(f'Unable to load IP index {path}') from exception
+
+    return INDEXES[path]
+
+
+class IpFilterRunner:
+    """
+    Rejects requests from source IPs matching the CIDR deny list
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.enable = None
+        self.index = None
+        self.default_action = None
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising IP filter config")
+        self.enable = configs.get('IPFILTER_ENABLE').lower() == 'true'
+        logging.debug("IP filter enable: %s", self.enable)
+
+        if self.enable:
+            self.index = load_index(configs.get('IPFILTER_INDEX_PATH') or str(DEFAULT_PATH))
+            self.default_action = configs.get('IPFILTER_DEFAULT_ACTION').lower()
+            if self.default_action not in ('allow', 'deny'):
+                raise ValueError(f'Unknown IP filter default action {self.default_action}')
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Look up the remote IP, using the default action when no list matches
+        """
+
+        self.error_response = None
+        if self.enable:
+            remote_ip = request_provider.get_remote_ip()
+            if remote_ip is None:
+                # Direct invocations have no source IP to filter on
+                return None
+
+            try:
+                action = self.index.lookup(remote_ip) or self.default_action
+            except ValueError:
+                logging.warning('Unable to parse remote IP', extra={'sourceIp': remote_ip})
+                action = self.default_action
+
+            if action == 'deny':
+                # Source IPs are personal data, passed as a field redacted by default
+                logging.info('IP filter denied request', extra={'sourceIp': remote_ip})
+                self.error_response = response_provider.message('Forbidden', 403)
+
+            return action
+
+        return None
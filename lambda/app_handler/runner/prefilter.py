@@ -0,0 +1,149 @@
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.utils.functions import string_to_list
+from app_handler.utils.signing import verify
+
+# Rejections per rule (and passes), kept across warm invocations
+COUNTERS = Counter()
+
+# Matches the start of each link in a field value
+URL_PATTERN = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+
+@lru_cache(maxsize=8)
+def compile_keywords(keywords:tuple):
+    """
+    Compile blocked keywords into a single case-insensitive pattern, cached across invocations
+    """
+    if not keywords:
+        return None
+
+    # Longest first so overlapping keywords match greedily
+    ordered = sorted(keywords, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(keyword) for keyword in ordered), re.IGNORECASE)
+
+
+def get_strings(values):
+    """
+    String values, including those nested in lists such as JSON arrays or repeated form
+    keys, and in objects
+    """
+    for value in values:
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, list):
+            yield from get_strings(value)
+        elif isinstance(value, dict):
+            yield from get_strings(value.values())
+
+
+class PrefilterRunner:
+    """
+    Cheap local spam checks that reject submissions before any network call
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.enable = None
+        self.honeypot_field = None
+        self.timestamp_field = None
+        self.timestamp_secret = None
+        self.min_fill_seconds = None
+        self.max_age_seconds = None
+        self.max_field_length = None
+        self.max_urls = None
+        self.keywords = None
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising prefilter config")
+        self.enable = configs.get('PREFILTER_ENABLE').lower() == 'true'
+        logging.debug("Prefilter enable: %s", self.enable)
+
+        # If enabled, retrieve additional configs, empty values disable a rule
+        if self.enable:
+            self.honeypot_field = configs.get('PREFILTER_HONEYPOT_FIELD')
+            self.timestamp_field = configs.get('PREFILTER_TIMESTAMP_FIELD')
+            if self.timestamp_field:
+                self.timestamp_secret = configs.get('PREFILTER_TIMESTAMP_SECRET')
+                self.min_fill_seconds = float(configs.get('PREFILTER_MIN_FILL_SECONDS'))
+                # Zero disables the maximum age
+                self.max_age_seconds = float(configs.get('PREFILTER_MAX_AGE_SECONDS')) or None
+
+            max_field_length = configs.get('PREFILTER_MAX_FIELD_LENGTH')
+            self.max_field_length = int(max_field_length) if max_field_length else None
+            max_urls = configs.get('PREFILTER_MAX_URLS')
+            self.max_urls = int(max_urls) if max_urls else None
+            self.keywords = compile_keywords(tuple(string_to_list(configs.get('PREFILTER_BLOCKED_KEYWORDS'))))
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Run prefilter rules, rejecting the submission on the first failing rule
+        """
+
+        self.error_response = None
+        if self.enable and isinstance(request_provider.content, dict):
+            rule = self.check(request_provider.content)
+            if rule is not None:
+                COUNTERS[rule] += 1
+                logging.info('Prefilter rule %s rejected submission, counters: %s', rule, dict(COUNTERS))
+                self.error_response = response_provider.message('Submission rejected', 400)
+                return rule
+
+            COUNTERS['passed'] += 1
+
+        return None
+
+
+    def check(self, content:dict):
+        """
+        Return the name of the first failing rule, None if all pass
+        """
+
+        # Honeypot field is hidden from users, bots tend to fill in every field
+        if self.honeypot_field and content.get(self.honeypot_field):
+            return 'honeypot'
+
+        # Signed render timestamp must be valid, older than the minimum fill time and,
+        # so captured tokens cannot be replayed indefinitely, not older than the maximum age
+        if self.timestamp_field:
+            timestamp = verify(self.timestamp_secret, content.get(self.timestamp_field))
+            try:
+                elapsed = time.time() - float(timestamp)
+            except (TypeError, ValueError):
+                return 'timestamp'
+            if elapsed < self.min_fill_seconds:
+                return 'fill_time'
+            if self.max_age_seconds is not None and elapsed > self.max_age_seconds:
+                return 'expired'
+
+        values = list(get_strings(content.values()))
+
+        if self.max_field_length is not None:
+            for value in values:
+                if len(value) > self.max_field_length:
+                    return 'field_length'
+
+        if self.max_urls is not None:
+            urls = sum(len(URL_PATTERN.findall(value)) for value in values)
+            if urls > self.max_urls:
+                return 'url_count'
+
+        if self.keywords is not None:
+            for value in values:
+                if self.keywords.search(value):
+                    return 'keyword'
+
+        return None
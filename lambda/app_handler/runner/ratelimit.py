@@ -0,0 +1,105 @@
+import logging
+import time
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.service.aws import AwsService
+from app_handler.utils.token_bucket import TokenBuckets
+
+# Local token buckets by settings, kept across warm invocations
+BUCKETS = {}
+
+
+def get_buckets(rate:float, burst:float, max_entries:int) -> TokenBuckets:
+    """
+    Return the container's token buckets for the given settings
+    """
+    key = (rate, burst, max_entries)
+    if key not in BUCKETS:
+        BUCKETS.clear()
+        BUCKETS[key] = TokenBuckets(rate, burst, max_entries)
+
+    return BUCKETS[key]
+
+
+class RateLimitRunner:
+    """
+    Limits requests per source IP.
+    A local token bucket rejects clear abuse for free, and a DynamoDB counter shared across
+    containers is only consulted once the local bucket is running low.
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.enable = None
+        self.buckets = None
+        self.remote_threshold = None
+        self.table = None
+        self.window_seconds = None
+        self.global_limit = None
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising rate limit config")
+        self.enable = configs.get('RATELIMIT_ENABLE').lower() == 'true'
+        logging.debug("Rate limit enable: %s", self.enable)
+
+        if self.enable:
+            self.buckets = get_buckets(
+                float(configs.get('RATELIMIT_RATE')),
+                float(configs.get('RATELIMIT_BURST')),
+                int(configs.get('RATELIMIT_MAX_ENTRIES')),
+            )
+            # Empty table disables the shared limiter
+            self.table = configs.get('RATELIMIT_TABLE')
+            if self.table:
+                self.remote_threshold = float(configs.get('RATELIMIT_REMOTE_THRESHOLD'))
+                self.window_seconds = int(configs.get('RATELIMIT_WINDOW_SECONDS'))
+                self.global_limit = int(configs.get('RATELIMIT_GLOBAL_LIMIT'))
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Check local then, if uncertain, shared limits for the remote IP
+        """
+
+        self.error_response = None
+        if self.enable:
+            remote_ip = request_provider.get_remote_ip()
+            if remote_ip is None:
+                # Direct invocations have no source IP to limit on
+                return None
+
+            remaining = self.buckets.take(remote_ip)
+            if remaining < 0:
+                # Source IPs are personal data, passed as a field redacted by default
+                logging.info('Local rate limit exceeded', extra={'sourceIp': remote_ip})
+                self.error_response = response_provider.message('Too many requests', 429)
+                return 'local'
+
+            if self.table and remaining < self.remote_threshold and self.exceeds_global_limit(remote_ip):
+                logging.info('Global rate limit exceeded', extra={'sourceIp': remote_ip})
+                self.error_response = response_provider.message('Too many requests', 429)
+                return 'global'
+
+        return None
+
+
+    def exceeds_global_limit(self, remote_ip:str) -> bool:
+        """
+        Count the request in the shared fixed window counter, failing open on errors
+        """
+        now = int(time.time())
+        window = now - now % self.window_seconds
+        count = AwsService().increment_dynamodb_counter(
+            self.table,
+            f'ratelimit#{remote_ip}#{window}',
+            window + self.window_seconds,
+        )
+
+        return count is not None and count > self.global_limit
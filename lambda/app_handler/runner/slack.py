@@ -17,6 +17,9 @@ class SlackRunner:
         self.webhook_url = None
         self.message_template = None
         self.fields = {}
+        # Per-request state, cleared by prepare()
+        self.values = {}
+        self.client = None
 
     def configure(self):
         """
@@ -38,8 +41,7 @@ class SlackRunner:
                 json.loads(self.json_template, strict=False)
             except json.JSONDecodeError as exception:
                 message = 'Error decoding Slack JSON template'
-                logging.critical(message)
-                logging.critical(exception)
+                logging.critical('%s: %s', message, exception)
                 raise ValueError(message) from exception
 
             # Extract required field names into config object
@@ -51,6 +53,23 @@ class SlackRunner:
         Run builder
         """
 
+        self.prepare(request_provider, response_provider)
+        if self.error_response is None:
+            return self.send(response_provider)
+
+        return None
+
+
+    def prepare(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Extract fields and build the templated message without making any network calls
+        """
+
+        # Forget any previous request so a reused runner never sends stale content
+        self.error_response = None
+        self.values = {}
+        self.client = None
+
         if self.enable:
 
             # Extract required fields from request body for template
@@ -64,7 +83,13 @@ class SlackRunner:
                     self.error_response = response_provider.message('Notification service error', 500)
                     return
 
-            self.fields = fields
+            # Presigned links to attachments uploaded to S3, one per line
+            if request_provider.attachments is not None:
+                fields['attachments'] = '\n'.join(
+                    attachment['link'] for attachment in request_provider.attachments
+                )
+
+            self.values = fields
 
             # Attempt to build string body from template
             string_template = Template(self.json_template)
@@ -74,26 +99,32 @@ class SlackRunner:
                 KeyError,
                 ValueError
             ) as exception:
-                logging.critical('Slack template parsing error')
-                logging.critical(exception)
+                logging.critical('Slack template parsing error: %s', exception)
                 self.error_response = response_provider.message('Notification service error', 500)
                 return
 
             # Set up Slack client
             try:
-                slack_client = SlackService(
+                self.client = SlackService(
                     self.webhook_url,
                     body
                 )
             except ValueError as exception:
                 # 500 error if service initiation error
-                logging.critical('Slack service initiation error')
-                logging.critical(exception)
+                logging.critical('Slack service initiation error: %s', exception)
                 self.error_response = response_provider.message('Notification service error', 500)
                 return
 
+
+    def send(self, response_provider:ResponseProvider):
+        """
+        Send the message prepared by prepare()
+        """
+
+        if self.client is not None:
+
             # Attempt to send templated message
-            response = slack_client.send()
+            response = self.client.send()
             if not response or 'status' not in response or response['status'] > 400:
                 # 500 error if service runtime error
                 logging.critical('Slack HTTP error')
@@ -0,0 +1,282 @@
+"""
+Attachment uploads to S3 that never pass through Lambda.
+A request to the upload path is answered with a presigned S3 POST for one object, scoped to
+a content type and size. Submissions then reference the uploaded object keys, which are
+turned into presigned download links for notifications.
+Upload URLs are only issued to requests carrying a signed ticket for a form session, issued
+by the page serving the form or, with hCaptcha enabled, by this runner once verified. Each
+ticket covers at most as many uploads as a submission may reference.
+"""
+
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app_handler.provider.config import ConfigProvider
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner.hcaptcha import HcaptchaRunner
+from app_handler.service.aws import AwsService
+from app_handler.utils.functions import string_to_list
+from app_handler.utils.signing import sign, verify
+
+# Uploads issued by ticket nonce without a shared table, kept across warm invocations
+TICKET_USES = OrderedDict()
+TICKET_USES_LOCK = threading.Lock()
+
+# Most ticket nonces counted per container
+MAX_TICKETS = 1000
+
+
+def count_ticket_use(nonce:str) -> int:
+    """
+    Count an upload against a ticket in the container, returning its uploads so far
+    """
+    with TICKET_USES_LOCK:
+        count = TICKET_USES.get(nonce, 0) + 1
+        TICKET_USES[nonce] = count
+        TICKET_USES.move_to_end(nonce)
+        while len(TICKET_USES) > MAX_TICKETS:
+            TICKET_USES.popitem(last=False)
+        return count
+
+
+class UploadRunner:
+    """
+    Issue presigned upload URLs and resolve attachment keys referenced by submissions
+    """
+    def __init__(self) -> None:
+
+        # Set default values
+        self.error_response = None
+        self.enable = None
+        self.bucket = None
+        self.prefix = None
+        self.path = None
+        self.field = None
+        self.content_types = []
+        self.max_bytes = None
+        self.max_files = None
+        self.expires_seconds = None
+        self.link_expires_seconds = None
+        self.key_pattern = None
+        self.ticket_field = None
+        self.ticket_secret = None
+        self.ticket_seconds = None
+        self.table = None
+        # Verifies upload requests opening a form session without a ticket
+        self.hcaptcha_runner = HcaptchaRunner()
+
+
+    def configure(self):
+        """
+        Configure runner
+        """
+        configs = ConfigProvider()
+        logging.debug("Initialising upload config")
+        self.enable = configs.get('UPLOAD_ENABLE').lower() == 'true'
+        logging.debug("Upload enable: %s", self.enable)
+
+        if self.enable:
+            self.bucket = configs.get('UPLOAD_BUCKET')
+            self.prefix = configs.get('UPLOAD_PREFIX')
+            self.path = configs.get('UPLOAD_PATH')
+            self.field = configs.get('UPLOAD_FIELD')
+            self.content_types = [
+                content_type.lower()
+                for content_type in string_to_list(configs.get('UPLOAD_CONTENT_TYPES'))
+            ]
+            self.max_bytes = int(configs.get('UPLOAD_MAX_BYTES'))
+            self.max_files = int(configs.get('UPLOAD_MAX_FILES'))
+            self.expires_seconds = int(configs.get('UPLOAD_EXPIRES_SECONDS'))
+            self.link_expires_seconds = int(configs.get('UPLOAD_LINK_EXPIRES_SECONDS'))
+            # Only keys this runner could have issued may be referenced
+            self.key_pattern = re.compile(re.escape(self.prefix) + r'[0-9a-f]{32}')
+            self.ticket_field = configs.get('UPLOAD_TICKET_FIELD')
+            self.ticket_secret = configs.get('UPLOAD_TICKET_SECRET') or None
+            if self.ticket_secret is None:
+                raise ValueError('Uploads require UPLOAD_TICKET_SECRET')
+            self.ticket_seconds = int(configs.get('UPLOAD_TICKET_SECONDS'))
+            # Ticket uses are shared through the dedup table, empty counts them per container
+            self.table = configs.get('DEDUP_TABLE')
+            self.hcaptcha_runner.configure()
+
+
+    def is_upload_request(self, request_provider:RequestProvider) -> bool:
+        """
+        Whether the request asks for an upload URL rather than submitting the form
+        """
+        if not self.enable:
+            return False
+
+        path = request_provider.get_path()
+        return path is not None and path.rstrip('/').endswith(self.path.rstrip('/'))
+
+
+    def run(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Answer upload requests with an upload URL, ending processing even when issued,
+        otherwise resolve the attachments the submission references
+        """
+
+        self.error_response = None
+        if not self.is_upload_request(request_provider):
+            self.attach(request_provider, response_provider)
+            return None
+
+        content = request_provider.content
+        ticket = content.get(self.ticket_field) if isinstance(content, dict) else None
+        if ticket is None and self.hcaptcha_runner.enable:
+            # A verified user opens a form session covering all of its uploads
+            self.hcaptcha_runner.run(request_provider, response_provider)
+            if self.hcaptcha_runner.error_response is not None:
+                self.error_response = self.hcaptcha_runner.error_response
+                return self.error_response
+            ticket = self.issue_ticket()
+
+        self.error_response = self.presign(request_provider, response_provider, ticket)
+        return self.error_response
+
+
+    def issue_ticket(self, now:float = None) -> str:
+        """
+        Signed ticket for a new form session, a random nonce and the Unix time it was issued
+        """
+        if now is None:
+            now = time.time()
+
+        return sign(self.ticket_secret, f'{uuid.uuid4().hex}.{int(now)}')
+
+
+    def read_ticket(self, ticket, now:float = None):
+        """
+        Nonce and expiry time of a signed ticket within its lifetime, otherwise None
+        """
+        value = verify(self.ticket_secret, ticket)
+        if value is None:
+            return None
+
+        nonce, _, issued = value.rpartition('.')
+        if not nonce or not issued.isdigit():
+            return None
+
+        if now is None:
+            now = time.time()
+
+        if abs(now - int(issued)) > self.ticket_seconds:
+            return None
+
+        return nonce, int(issued) + self.ticket_seconds
+
+
+    def check_ticket(self, ticket, response_provider:ResponseProvider):
+        """
+        Count an upload against its ticket, returning an error response if the ticket is
+        invalid or has covered as many uploads as a submission may reference
+        """
+        session = self.read_ticket(ticket)
+        if session is None:
+            logging.warning('Upload requested without a valid ticket')
+            return response_provider.message('Invalid upload ticket', 401)
+
+        nonce, expires = session
+        if self.table:
+            count = AwsService().increment_dynamodb_counter(
+                self.table,
+                f'upload#ticket#{nonce}',
+                expires,
+            )
+        else:
+            count = count_ticket_use(nonce)
+
+        if count is None:
+            return response_provider.message('Upload service error', 500)
+
+        if count > self.max_files:
+            logging.warning('Upload ticket %s used for more than %s uploads', nonce, self.max_files)
+            return response_provider.message('Too many uploads', 429)
+
+        return None
+
+
+    def presign(self, request_provider:RequestProvider, response_provider:ResponseProvider,
+                ticket:str):
+        """
+        Answer with a presigned POST for one object of the requested content type and size,
+        counted against the form session's ticket, which is returned for further uploads
+        """
+
+        self.error_response = self.check_ticket(ticket, response_provider)
+        if self.error_response is not None:
+            return self.error_response
+
+        content = request_provider.content
+        content_type = content.get('contentType') if isinstance(content, dict) else None
+        if not isinstance(content_type, str) or content_type.lower() not in self.content_types:
+            logging.warning('Upload content type not allowed: %s', content_type)
+            self.error_response = response_provider.message('Content type not allowed', 400)
+            return self.error_response
+
+        try:
+            size = int(content.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+        if not 0 < size <= self.max_bytes:
+            logging.warning('Upload size not allowed: %s', content.get('size'))
+            self.error_response = response_provider.message('File too large', 413)
+            return self.error_response
+
+        key = f'{self.prefix}{uuid.uuid4().hex}'
+        upload = AwsService().create_presigned_post(
+            self.bucket,
+            key,
+            content_type,
+            size,
+            self.expires_seconds,
+        )
+        if upload is None:
+            self.error_response = response_provider.message('Upload service error', 500)
+            return self.error_response
+
+        logging.info('Issued upload URL for %s', key)
+        return response_provider.build({
+            'url': upload['url'],
+            'fields': upload['fields'],
+            'key': key,
+            'expiresIn': self.expires_seconds,
+            'ticket': ticket,
+        })
+
+
+    def attach(self, request_provider:RequestProvider, response_provider:ResponseProvider):
+        """
+        Resolve the attachment keys a submission references into presigned download links
+        """
+
+        self.error_response = None
+        if not self.enable:
+            return
+
+        content = request_provider.content
+        keys = content.get(self.field, []) if isinstance(content, dict) else []
+        if isinstance(keys, str):
+            keys = string_to_list(keys)
+        if not isinstance(keys, list) or len(keys) > self.max_files or \
+                not all(isinstance(key, str) and self.key_pattern.fullmatch(key) for key in keys):
+            logging.warning('Invalid attachments referenced: %s', keys)
+            self.error_response = response_provider.message('Invalid attachments', 400)
+            return
+
+        aws = AwsService()
+        attachments = []
+        for key in keys:
+            link = aws.create_presigned_url(self.bucket, key, self.link_expires_seconds)
+            if link is None:
+                self.error_response = response_provider.message('Upload service error', 500)
+                return
+            attachments.append({'key': key, 'link': link})
+
+        request_provider.attachments = attachments
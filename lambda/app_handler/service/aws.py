@@ -2,28 +2,50 @@
 Interact with the following AWS services:
   - Simple Email Service to send emails
   - SSM Parameter store to fetch encrypted parameters
+  - S3 to fetch configuration objects, store captured events and presign attachment uploads
 """
 import logging
 import os
+import threading
 from time import time
 import uuid
 import boto3
 import botocore
+from app_handler.utils.tracing import traced
+
+# Clients and resources by service and endpoint, created once per container
+CLIENTS = {}
+CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(service:str, endpoint_url:str = None, resource:bool = False):
+    """
+    Return a cached boto3 client, or resource, creating it on first use
+    """
+    key = (service, endpoint_url, resource)
+    with CLIENTS_LOCK:
+        if key not in CLIENTS:
+            factory = boto3.resource if resource else boto3.client
+            CLIENTS[key] = factory(service, endpoint_url=endpoint_url)
+
+        return CLIENTS[key]
+
 
 class AwsService:
     """
     Fetch parameters and send emails.
     """
     def __init__(self) -> None:
-        # Prepare AWS clients
-        self.ses = boto3.client('ses')
-        self.ssm = boto3.client('ssm')
-        self.secretsmanager = boto3.client('secretsmanager')
+        # Prepare AWS clients, reused across warm invocations
+        self.ses = get_client('ses')
+        self.ssm = get_client('ssm')
+        self.secretsmanager = get_client('secretsmanager')
         # Prepare AWS Service Resources
         self.dynamodb_endpoint_url = os.environ.get('DYNAMODB_ENDPOINT_URL', None)
-        self.dynamodb = boto3.resource('dynamodb', endpoint_url=self.dynamodb_endpoint_url)
+        self.dynamodb = get_client('dynamodb', self.dynamodb_endpoint_url, resource=True)
         logging.debug('Using dynamodb endpoint url: %s', self.dynamodb_endpoint_url)
 
+    @traced('ssm.get_parameter')
     def get_parameter_value(self, name) -> str:
         """
         Fetch encrypted parameters from Systems Manager (SSM) Parameter Store
@@ -55,6 +77,7 @@ class AwsService:
         return value
 
 
+    @traced('secretsmanager.get_secret_value')
     def get_secret_value(self, name) -> str:
         """
         Fetch encrypted secret from Secrets Manager
@@ -87,6 +110,111 @@ class AwsService:
         return value
 
 
+    @traced('s3.get_object')
+    def get_s3_object(self, bucket:str, key:str) -> str:
+        """
+        Fetch an S3 object as a string
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3.html
+        """
+
+        client = get_client('s3')
+        value = None
+        logging.debug('Fetching AWS S3 object s3://%s/%s', bucket, key)
+
+        try:
+            response = client.get_object(Bucket=bucket, Key=key)
+            value = response['Body'].read().decode('utf-8')
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+            client.exceptions.NoSuchKey,
+        ) as exception:
+            logging.warning('Unable to retrieve AWS S3 object s3://%s/%s', bucket, key)
+            logging.warning(exception)
+
+        return value
+
+
+    @traced('s3.put_object')
+    def put_s3_object(self, bucket:str, key:str, body:bytes) -> bool:
+        """
+        Store bytes as an S3 object, returning whether it was stored
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3.html
+        """
+
+        client = get_client('s3')
+        logging.debug('Storing AWS S3 object s3://%s/%s', bucket, key)
+
+        try:
+            client.put_object(Bucket=bucket, Key=key, Body=body)
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+        ) as exception:
+            logging.warning('Unable to store AWS S3 object s3://%s/%s: %s', bucket, key, exception)
+            return False
+
+        return True
+
+
+    def create_presigned_post(self, bucket:str, key:str, content_type:str, max_bytes:int,
+                              expires:int):
+        """
+        Presign a browser POST upload of a single object with a fixed key and content type,
+        limited to max_bytes. Signed locally, without a network call.
+        https://docs.aws.amazon.com/AmazonS3/latest/API/sigv4-HTTPPOSTConstructPolicy.html
+        """
+
+        client = get_client('s3')
+        # Presigning a POST without credentials fails deep in botocore, so check up front
+        session = boto3.DEFAULT_SESSION or boto3.session.Session()
+        if session.get_credentials() is None:
+            logging.warning(
+                'Unable to presign AWS S3 upload s3://%s/%s: no credentials', bucket, key
+            )
+            return None
+
+        try:
+            return client.generate_presigned_post(
+                Bucket=bucket,
+                Key=key,
+                Fields={'Content-Type': content_type},
+                Conditions=[
+                    {'Content-Type': content_type},
+                    ['content-length-range', 1, max_bytes],
+                ],
+                ExpiresIn=expires,
+            )
+        except botocore.exceptions.ClientError as exception:
+            logging.warning(
+                'Unable to presign AWS S3 upload s3://%s/%s: %s', bucket, key, exception
+            )
+
+        return None
+
+
+    def create_presigned_url(self, bucket:str, key:str, expires:int):
+        """
+        Presign a download link for an object. Signed locally, without a network call.
+        """
+
+        client = get_client('s3')
+        try:
+            return client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': key},
+                ExpiresIn=expires,
+            )
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+        ) as exception:
+            logging.warning('Unable to presign AWS S3 link s3://%s/%s: %s', bucket, key, exception)
+
+        return None
+
+
+    @traced('ses.send_email')
     def send_email(self, recipients: str, sender: str, subject: str, text: str):
         """
         Send plain text email using AWS Simple Email Service (SES)
@@ -124,12 +252,12 @@ class AwsService:
             self.ses.exceptions.ConfigurationSetSendingPausedException,
             self.ses.exceptions.AccountSendingPausedException
         ) as exception:
-            logging.warning('Unable to send AWS SES Email')
-            logging.warning(exception)
+            logging.warning('Unable to send AWS SES Email: %s', exception)
 
         return response
 
 
+    @traced('dynamodb.put_item')
     def put_dynamodb_item(self, table:str, fields:dict):
         """
         Put a dictionary item into a DynamoDB table.
@@ -137,7 +265,7 @@ class AwsService:
         use the client
         """
 
-        client = boto3.client('dynamodb', endpoint_url=self.dynamodb_endpoint_url)
+        client = get_client('dynamodb', self.dynamodb_endpoint_url)
 
         logging.debug('Writing to table %s', table)
 
@@ -173,7 +301,113 @@ class AwsService:
             client.exceptions.RequestLimitExceeded,
             client.exceptions.InternalServerError,
         ) as exception:
-            logging.warning('Unable to put AWS DynamoDB item')
-            logging.warning(exception)
+            logging.warning('Unable to put AWS DynamoDB item: %s', exception)
 
         return response
+
+
+    @traced('dynamodb.update_item')
+    def increment_dynamodb_counter(self, table:str, key:str, expires:int):
+        """
+        Atomically increment a counter item, creating it with an expiry time if missing.
+        Returns the new count.
+        """
+
+        client = get_client('dynamodb', self.dynamodb_endpoint_url)
+
+        logging.debug('Incrementing counter %s in table %s', key, table)
+
+        count = None
+
+        try:
+            response = self.dynamodb.Table(table).update_item(
+                Key={'id': key},
+                UpdateExpression='ADD #count :one SET #expires = if_not_exists(#expires, :expires)',
+                ExpressionAttributeNames={'#count': 'count', '#expires': 'expires'},
+                ExpressionAttributeValues={':one': 1, ':expires': expires},
+                ReturnValues='UPDATED_NEW',
+            )
+            count = int(response['Attributes']['count'])
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+            client.exceptions.ProvisionedThroughputExceededException,
+            client.exceptions.ResourceNotFoundException,
+            client.exceptions.RequestLimitExceeded,
+            client.exceptions.InternalServerError,
+        ) as exception:
+            logging.warning('Unable to increment AWS DynamoDB counter: %s', exception)
+
+        return count
+
+
+    @traced('dynamodb.put_item')
+    def put_dynamodb_record(self, table:str, item:dict, if_absent:bool = False):
+        """
+        Put an item as-is, optionally only if no item with the same id exists, or the
+        existing item has expired but not yet been removed by DynamoDB's TTL deletion.
+        Returns True if written, False if the item already existed and None on errors.
+        """
+
+        client = get_client('dynamodb', self.dynamodb_endpoint_url)
+
+        logging.debug('Writing record to table %s', table)
+
+        kwargs = {}
+        if if_absent:
+            kwargs['ConditionExpression'] = 'attribute_not_exists(id) OR #expires < :now'
+            kwargs['ExpressionAttributeNames'] = {'#expires': 'expires'}
+            kwargs['ExpressionAttributeValues'] = {':now': int(time())}
+
+        try:
+            self.dynamodb.Table(table).put_item(Item=item, **kwargs)
+            return True
+        except client.exceptions.ConditionalCheckFailedException:
+            logging.debug('Record already exists in table %s', table)
+            return False
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+        ) as exception:
+            logging.warning('Unable to put AWS DynamoDB record: %s', exception)
+
+        return None
+
+
+    @traced('dynamodb.get_item')
+    def get_dynamodb_record(self, table:str, key:str):
+        """
+        Fetch an item by id, None if missing or on errors
+        """
+
+        logging.debug('Reading record from table %s', table)
+
+        try:
+            response = self.dynamodb.Table(table).get_item(Key={'id': key}, ConsistentRead=True)
+            return response.get('Item')
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+        ) as exception:
+            logging.warning('Unable to get AWS DynamoDB record: %s', exception)
+
+        return None
+
+
+    @traced('dynamodb.delete_item')
+    def delete_dynamodb_record(self, table:str, key:str):
+        """
+        Delete an item by id
+        """
+
+        logging.debug('Deleting record from table %s', table)
+
+        try:
+            return self.dynamodb.Table(table).delete_item(Key={'id': key})
+        except (
+            botocore.exceptions.ClientError,
+            botocore.exceptions.NoCredentialsError,
+        ) as exception:
+            logging.warning('Unable to delete AWS DynamoDB record: %s', exception)
+
+        return None
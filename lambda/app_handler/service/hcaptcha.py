@@ -3,22 +3,73 @@ Class to validate user challenges against hCAPTCHA web service.
 For API usage see https://docs.hcaptcha.com
 """
 
+from concurrent.futures import as_completed, wait
 import logging
-from app_handler.service.http import HttpService
+import threading
+import time
+from urllib.parse import urlsplit
+from app_handler.service.http import HttpService, get_latency_name, get_timeout
+from app_handler.utils.executor import HEDGE_EXECUTOR, submit_to
+from app_handler.utils.histogram import HISTOGRAMS
+from app_handler.utils.tracing import span
 
-class HcaptchaService:
+# Number of samples required before the learned hedging delay replaces the initial delay
+HEDGE_MIN_SAMPLES = 20
+
+# Hedged requests are capped at a fraction of validations, saved up to a small burst, so a
+# slow host is never sent much more than its usual load
+HEDGE_FRACTION = 0.1
+HEDGE_BURST = 10
+# Hedged requests the container may still send, kept across warm invocations
+HEDGE_BUDGET = {'tokens': 1.0}
+HEDGE_BUDGET_LOCK = threading.Lock()
+
+
+def earn_hedge() -> None:
+    """
+    Add the share of a hedged request each validation earns
+    """
+    with HEDGE_BUDGET_LOCK:
+        HEDGE_BUDGET['tokens'] = min(HEDGE_BUDGET['tokens'] + HEDGE_FRACTION, HEDGE_BURST)
+
+
+def spend_hedge() -> bool:
     """
-    Makes HTTP calls to hCAPTCHA service
+    Take a hedged request from the budget, returning whether one was left
     """
+    with HEDGE_BUDGET_LOCK:
+        if HEDGE_BUDGET['tokens'] < 1:
+            return False
+        HEDGE_BUDGET['tokens'] -= 1
+        return True
 
-    def __init__(self, secret, sitekey, url='https://hcaptcha.com/siteverify') -> None:
+
+class HcaptchaService:  # pylint: disable=too-many-instance-attributes
+    """
+    Makes HTTP calls to hCAPTCHA service.
+    Holds its settings, the requests it sent and the outcome of the last validation.
+    """
+
+    def __init__(
+        self,
+        secret,
+        sitekey,
+        url='https://hcaptcha.com/siteverify',
+        hedge_percentile=None,
+        hedge_delay=0.5,
+    ) -> None:
         # Set up inputs
         self.secret = secret
         self.sitekey = sitekey
         self.url = url
+        # Hedging is disabled unless a latency percentile is provided
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
         self.response = None
         self.success = None
         self.error_codes = []
+        # HTTP services of every request sent, so validation can be cancelled
+        self.http_services = []
 
         if self.secret is None or self.sitekey is None:
             message = 'Missing hCaptcha secret or sitekey'
@@ -41,14 +92,103 @@ class HcaptchaService:
             'sitekey': self.sitekey,
         }
 
-        logging.debug('Checking if hCaptcha request is valid')
-        logging.debug(data)
+        logging.debug('Checking if hCaptcha request is valid %s', data)
+
+        # Hedged requests appear as a second HTTP span
+        with span('hcaptcha', hedging=self.hedge_percentile is not None) as current:
+            if self.hedge_percentile is None:
+                self.response = self.post(data)
+            else:
+                self.response = self.post_hedged(data)
+
+            self.process_response()
+            current.annotate(success=self.success)
 
-        http_service = HttpService()
-        self.response = http_service.post_urlencoded(self.url, data)
-        self.process_response()
         return self.response
 
+
+    def post(self, data, http_service=None):
+        """
+        Send a single siteverify request, its latency is recorded by the HTTP service
+        """
+
+        if http_service is None:
+            http_service = HttpService()
+        self.http_services.append(http_service)
+
+        return http_service.post_urlencoded(self.url, data)
+
+
+    def cancel(self):
+        """
+        Abort every request in flight from another thread
+        """
+        for http_service in self.http_services:
+            http_service.cancel()
+
+
+    def get_hedge_delay(self):
+        """
+        Delay before sending a hedged request, learned from the siteverify host's
+        recent latency histogram once enough samples are known
+        """
+
+        histogram = HISTOGRAMS.recent(get_latency_name(urlsplit(self.url).netloc))
+        if histogram.total < HEDGE_MIN_SAMPLES:
+            return self.hedge_delay
+
+        return histogram.percentile(self.hedge_percentile)
+
+
+    def post_hedged(self, data):
+        """
+        Send a siteverify request and, if it has not answered within the hedging delay,
+        a second one on a separate connection while the hedging budget allows. The first
+        successful answer wins and the other request is cancelled, failed or invalid answers
+        are only used once no attempt is left to succeed or the request timeout has passed.
+        """
+
+        earn_hedge()
+        hedge_delay = self.get_hedge_delay()
+        # Attempts are bounded by their socket timeout, the deadline also bounds retries
+        deadline = time.monotonic() + hedge_delay + get_timeout(urlsplit(self.url).netloc)
+
+        attempts = {}
+        http_service = HttpService()
+        attempts[submit_to(HEDGE_EXECUTOR, self.post, data, http_service)] = http_service
+
+        done, _ = wait(attempts, timeout=hedge_delay)
+        if not done and not spend_hedge():
+            logging.debug('hCaptcha request exceeded hedging delay, hedging budget spent')
+        elif not done:
+            logging.debug('hCaptcha request exceeded hedging delay, sending hedged request')
+            http_service = HttpService()
+            attempts[submit_to(HEDGE_EXECUTOR, self.post, data, http_service)] = http_service
+
+        response = None
+        try:
+            for future in as_completed(attempts, timeout=max(deadline - time.monotonic(), 0)):
+                result = future.result()
+                if is_successful_response(result):
+                    response = result
+                    break
+                # Keep the first valid answer in case no attempt succeeds
+                if response is None or not is_valid_response(response):
+                    response = result
+        except TimeoutError:
+            logging.warning('hCaptcha requests exceeded the request timeout')
+
+        # Cancel any request still in flight
+        for future, http_service in attempts.items():
+            if not future.done():
+                future.cancel()
+                http_service.cancel()
+
+        if response is None:
+            response = {'status': None, 'headers': None, 'body': None, 'json': None}
+
+        return response
+
     def process_response(self) -> None:
         """
         Process validation response result, check for error codes
@@ -57,7 +197,7 @@ class HcaptchaService:
 
         status = self.response['status']
         # Ensure a 200 or 300 status code is returned, otherwise throw exception
-        if status < 400:
+        if status is not None and status < 400:
             json_result = self.response['json']
 
             self.success = json_result['success']
@@ -65,7 +205,27 @@ class HcaptchaService:
             self.error_codes = []
 
             if not self.success:
-                logging.warning('hCaptcha verification failed with errors')
-                if 'error-codes' in json_result:
-                    logging.warning(json_result['error-codes'])
-                    self.error_codes = json_result['error-codes']
+                self.error_codes = json_result.get('error-codes', [])
+                logging.warning('hCaptcha verification failed with errors %s', self.error_codes)
+
+
+def is_valid_response(response) -> bool:
+    """
+    Determine if a siteverify response carries a usable answer
+    """
+    return (
+        response['status'] is not None
+        and response['status'] < 400
+        and response['json'] is not None
+    )
+
+
+def is_successful_response(response) -> bool:
+    """
+    Determine if a siteverify response is a valid answer passing validation
+    """
+    return (
+        is_valid_response(response)
+        and isinstance(response['json'], dict)
+        and response['json'].get('success') is True
+    )
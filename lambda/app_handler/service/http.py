@@ -2,13 +2,56 @@
 Class to send data over HTTP
 """
 
-import json
 import logging
-from urllib import request
-from urllib.error import HTTPError, URLError
+import socket
+import threading
+import time
+from http.client import HTTPException, RemoteDisconnected
 from urllib.parse import urlencode
 from urllib.request import Request
 
+from app_handler.service.http_pool import POOL
+from app_handler.utils import codec
+from app_handler.utils.histogram import HISTOGRAMS
+from app_handler.utils.tracing import span
+
+# Timeout in seconds for hosts without enough latency samples, and the adaptive maximum
+DEFAULT_TIMEOUT = 10
+# Adaptive timeouts are a multiple of the host's recent p99 latency, never below the minimum
+TIMEOUT_MULTIPLIER = 4
+TIMEOUT_MIN = 1
+TIMEOUT_MIN_SAMPLES = 20
+
+# Guards ending an attempt, which a cancelling thread may do while it completes
+IN_FLIGHT_LOCK = threading.Lock()
+
+
+def get_latency_name(host:str) -> str:
+    """
+    Histogram name for a downstream host
+    """
+    return f'http.{host}'
+
+
+def preconnect(url:str) -> bool:
+    """
+    Open a pooled keep-alive connection to the URL's host ahead of the first request
+    """
+    req = Request(url)
+    return POOL.preconnect(req.type, req.host, get_timeout(req.host))
+
+
+def get_timeout(host:str) -> float:
+    """
+    Socket timeout for a host, learned from its recent latencies
+    """
+    histogram = HISTOGRAMS.recent(get_latency_name(host))
+    if histogram.total < TIMEOUT_MIN_SAMPLES:
+        return DEFAULT_TIMEOUT
+
+    timeout = histogram.percentile(99) * TIMEOUT_MULTIPLIER
+    return min(max(timeout, TIMEOUT_MIN), DEFAULT_TIMEOUT)
+
 
 class HttpService():
     """
@@ -20,39 +63,42 @@ class HttpService():
         self.user_agent = 'python/3'
         self.response = None
         self.request_body = None
+        self.connection = None
+        self.cancelled = False
+        # Host and start time of the request being sent, until it completes or is cancelled
+        self.in_flight = None
 
     def post_json(self, url, data:dict, encoding:str = 'utf-8'):
         """
-        Post JSON data
+        Post JSON data, bytes are sent as already encoded JSON
         """
 
-        json_data = data
-
         # Attempt to serialise data
         try:
-            if isinstance(data, str):
-                json_data = json.dumps(json.loads(data))
+            if isinstance(data, bytes):
+                encoded = data
+            elif isinstance(data, str):
+                encoded = codec.dumps(codec.loads(data))
             else:
-                json_data = json.dumps(data)
+                encoded = codec.dumps(data)
         except (
             AttributeError,
-            json.JSONDecodeError,
-            TypeError
+            TypeError,
+            ValueError
         ) as exception:
             message = 'Cannot JSON serialise data'
-            logging.warning(message)
-            logging.warning(exception)
+            logging.warning('%s: %s', message, exception)
             raise ValueError(message) from exception
 
-        # Attempt to encode data
-        encoded = json_data.encode(encoding)
+        # The codec writes UTF-8, re-encode for any other encoding
+        if encoding != 'utf-8':
+            encoded = encoded.decode().encode(encoding)
 
         try:
             req = Request(url)
         except ValueError as exception:
             message = 'Unable to parse HTTP request URL'
-            logging.critical(message)
-            logging.critical(exception)
+            logging.critical('%s: %s', message, exception)
             raise ValueError(message) from exception
 
         req.add_header('Content-Type', 'application/json')
@@ -90,35 +136,27 @@ class HttpService():
         logging.debug('Sending HTTP request')
 
         try:
-            with request.urlopen(req, data) as res:
-                # Extract expected values
-                body = res.read().decode()
-                status = res.status
-                headers = res.getheaders()
-
-                # Attempt to load body as JSON
-                try:
-                    json_body = json.loads(body)
-                except json.JSONDecodeError:
-                    pass
+            status, headers, raw_body = self._send(req, data)
+            body = raw_body.decode()
 
-        except HTTPError as exception:
-            logging.warning('HTTP Error encountered')
-            logging.warning(exception)
-
-            # Extract expected values
-            body = exception.read().decode()
-            status = exception.status
-            headers = exception.headers.items()
+            if status >= 400:
+                # Host only, webhook URLs carry their secret in the path
+                logging.warning('HTTP error %s returned by %s', status, req.host)
 
+            # Attempt to load body as JSON, parsing the received bytes directly
             try:
-                json_body = json.loads(body)
-            except json.JSONDecodeError:
+                json_body = codec.loads(raw_body)
+            except codec.DecodeError:
                 pass
 
-        except URLError as exception:
-            logging.warning('Unable to make HTTP Post request')
-            logging.warning(exception)
+        except (
+            OSError,
+            HTTPException,
+        ) as exception:
+            if self.cancelled:
+                logging.debug('HTTP request cancelled')
+            else:
+                logging.warning('Unable to make HTTP Post request: %s', exception)
 
         logging.debug('HTTP Status code %s', status)
 
@@ -130,3 +168,125 @@ class HttpService():
         }
 
         return self.response
+
+
+    def _send(self, req, data):
+        """
+        Send request over a pooled keep-alive connection.
+        A reused connection that was closed by the server is retried once on a new connection.
+        Completed requests are recorded in the host's latency histogram, cancelled ones
+        when they are cancelled.
+        """
+        self.in_flight = (req.host, time.perf_counter())
+
+        try:
+            return self._send_pooled(req, data)
+        finally:
+            # Failed requests are not recorded
+            self.end_attempt()
+
+
+    def _send_pooled(self, req, data):
+        """
+        Send request over a connection acquired from the pool, retrying once if needed
+        """
+        scheme = req.type
+        host = req.host
+        timeout = get_timeout(host)
+
+        with span('http', host=host) as current:
+            retries = 0
+            while True:
+                if self.cancelled:
+                    raise ConnectionAbortedError('Request cancelled before it was sent')
+                connection, reused = POOL.acquire(scheme, host, timeout)
+                current.annotate(reused=reused, retries=retries)
+                self.connection = connection
+                try:
+                    res, raw_body = self._exchange(connection, req, data)
+                except (
+                    BrokenPipeError,
+                    ConnectionResetError,
+                    RemoteDisconnected,
+                ):
+                    connection.close()
+                    if reused and not self.cancelled:
+                        logging.debug(
+                            'Pooled connection to %s closed by server, reconnecting', host
+                        )
+                        retries += 1
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+
+                if res.will_close:
+                    connection.close()
+                else:
+                    POOL.release(scheme, host, connection)
+
+                self.connection = None
+                current.annotate(status=res.status)
+                self.record_attempt()
+                return res.status, res.getheaders(), raw_body
+
+
+    @staticmethod
+    def _exchange(connection, req, data):
+        """
+        Connect if needed, then send the request and read the response in separate spans,
+        first_byte being the server's think time
+        """
+        if connection.sock is None:
+            with span('connect'):
+                connection.connect()
+        with span('send'):
+            connection.request('POST', req.selector, body=data, headers=dict(req.header_items()))
+        with span('first_byte'):
+            res = connection.getresponse()
+        with span('read'):
+            raw_body = res.read()
+
+        return res, raw_body
+
+
+    def end_attempt(self):
+        """
+        Stop timing the request in flight, returning its host and elapsed seconds,
+        or None if it already ended
+        """
+        with IN_FLIGHT_LOCK:
+            in_flight, self.in_flight = self.in_flight, None
+
+        if in_flight is None:
+            return None
+
+        host, start = in_flight
+        return host, time.perf_counter() - start
+
+
+    def record_attempt(self):
+        """
+        Record the elapsed time of the request in flight in its host's latency histogram
+        """
+        attempt = self.end_attempt()
+        if attempt is not None:
+            host, elapsed = attempt
+            HISTOGRAMS.record(get_latency_name(host), elapsed)
+
+
+    def cancel(self):
+        """
+        Abort an in-flight request from another thread by shutting down its connection.
+        Its elapsed time is recorded as a censored sample, the latency it would have had
+        being at least as long, so slow answers still raise the host's percentiles.
+        """
+        self.cancelled = True
+        self.record_attempt()
+        connection = self.connection
+        if connection is not None and connection.sock is not None:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
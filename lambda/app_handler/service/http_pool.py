@@ -0,0 +1,165 @@
+"""
+Keep-alive HTTP connection pool.
+Connections are kept at module level so TLS sessions are reused across warm invocations.
+"""
+
+import http.client
+import logging
+import socket
+import threading
+import time
+
+from app_handler.utils.tracing import span
+
+# Resolved addresses by host and port with their expiry times
+RESOLVED = {}
+RESOLVED_LOCK = threading.Lock()
+# Seconds resolved addresses are reused for
+DNS_TTL = 60
+
+
+def resolve(host:str, port:int):
+    """
+    Resolve a host, reusing recent results
+    """
+    now = time.monotonic()
+    with RESOLVED_LOCK:
+        expires, resolved = RESOLVED.get((host, port), (0, None))
+    if expires > now:
+        return resolved
+
+    with span('dns', host=host):
+        resolved = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+    with RESOLVED_LOCK:
+        RESOLVED[(host, port)] = (now + DNS_TTL, resolved)
+
+    return resolved
+
+
+def create_connection(address, *args, **kwargs):
+    """
+    Resolve and connect in separate spans, trying each resolved address in turn.
+    Cached addresses are forgotten if none of them connect.
+    """
+    host, port = address
+    resolved = resolve(host, port)
+
+    error = None
+    with span('tcp'):
+        for *_, sockaddr in resolved:
+            try:
+                return socket.create_connection(sockaddr[:2], *args, **kwargs)
+            except OSError as exception:
+                error = exception
+
+    with RESOLVED_LOCK:
+        RESOLVED.pop((host, port), None)
+    raise error
+
+
+class HTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP connection with traced DNS and TCP connect
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._create_connection = create_connection
+
+
+class HTTPSConnection(http.client.HTTPSConnection):
+    """
+    HTTPS connection with traced DNS, TCP connect and TLS handshake
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._create_connection = create_connection
+
+    def connect(self) -> None:
+        http.client.HTTPConnection.connect(self)
+        with span('tls'):
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host)
+
+
+class ConnectionPool:
+    """
+    Pool of idle keep-alive connections per scheme and host
+    """
+
+    def __init__(self, max_idle:int = 4) -> None:
+        self.max_idle = max_idle
+        self.idle = {}
+        self.lock = threading.Lock()
+
+
+    def acquire(self, scheme:str, host:str, timeout:float = None):
+        """
+        Return an idle connection for the scheme and host, or a new unconnected one.
+        Also returns whether the connection is being reused.
+        """
+        key = (scheme, host)
+        with self.lock:
+            connections = self.idle.get(key)
+            connection = connections.pop() if connections else None
+
+        if connection is not None:
+            logging.debug('Reusing pooled connection to %s', host)
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            return connection, True
+
+        if scheme == 'https':
+            return HTTPSConnection(host, timeout=timeout), False
+
+        return HTTPConnection(host, timeout=timeout), False
+
+
+    def release(self, scheme:str, host:str, connection) -> None:
+        """
+        Return a connection to the pool once its response has been fully read
+        """
+        key = (scheme, host)
+        with self.lock:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) < self.max_idle:
+                connections.append(connection)
+                return
+
+        connection.close()
+
+
+    def preconnect(self, scheme:str, host:str, timeout:float = None) -> bool:
+        """
+        Open a connection ahead of use and add it to the idle pool.
+        Returns False if an idle connection was already available.
+        """
+        connection, reused = self.acquire(scheme, host, timeout)
+        if not reused:
+            try:
+                connection.connect()
+            except OSError:
+                connection.close()
+                raise
+
+        self.release(scheme, host, connection)
+        return not reused
+
+
+    def clear(self) -> None:
+        """
+        Close and forget all idle connections
+        """
+        with self.lock:
+            idle = self.idle
+            self.idle = {}
+
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+# Shared pool used by all HTTP services
+POOL = ConnectionPool()
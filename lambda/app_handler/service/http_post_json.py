@@ -2,9 +2,9 @@
 Class to send a HTTP POST JSON body to a URL
 """
 
-import json
 import logging
 from app_handler.service.http import HttpService
+from app_handler.utils import codec
 
 class HttpPostJsonService:
     """
@@ -38,15 +38,15 @@ class HttpPostJsonService:
 
     def parse_body(self, body):
         """
-        Parse string JSON to JSON dictionary and back to validate
+        Parse string JSON to JSON dictionary and back to validate,
+        keeping the encoded bytes to send
         """
         # Attempt to validate template
         try:
-            self.body = json.dumps(json.loads(body,strict=False))
-        except json.JSONDecodeError as exception:
+            self.body = codec.dumps(codec.loads(body, strict=False))
+        except codec.DecodeError as exception:
             message = 'Error parsing HTTP POST JSON template'
-            logging.critical(message)
-            logging.critical(exception)
+            logging.critical('%s: %s', message, exception)
             raise ValueError(message) from exception
 
 
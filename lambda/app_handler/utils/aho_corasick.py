@@ -0,0 +1,86 @@
+"""
+Aho-Corasick automaton to match many literal patterns in a single pass over the text
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Case-insensitive multi-pattern matcher.
+    Built once, then each search is linear in the length of the text
+    regardless of the number of patterns.
+    """
+
+    def __init__(self, patterns) -> None:
+        # Node 0 is the root, each node maps a character to a child node
+        self.goto = [{}]
+        self.fail = [0]
+        # Pattern matched when reaching a node, including via its failure links
+        self.match = [None]
+        self.size = 0
+
+        for pattern in patterns:
+            self.add(pattern)
+
+        self.build()
+
+
+    def add(self, pattern:str) -> None:
+        """
+        Add a pattern to the trie
+        """
+        pattern = pattern.casefold()
+        if not pattern:
+            return
+
+        node = 0
+        for char in pattern:
+            child = self.goto[node].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][char] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.match.append(None)
+            node = child
+
+        if self.match[node] is None:
+            self.size += 1
+        self.match[node] = pattern
+
+
+    def build(self) -> None:
+        """
+        Compute failure links breadth first
+        """
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                # Inherit the match of the longest proper suffix that is a pattern
+                if self.match[child] is None:
+                    self.match[child] = self.match[self.fail[child]]
+
+
+    def search(self, text:str):
+        """
+        Return the first pattern found in text, None if there are no matches
+        """
+        goto = self.goto
+        fail = self.fail
+        match = self.match
+        node = 0
+        for char in text.casefold():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if match[node] is not None:
+                return match[node]
+
+        return None
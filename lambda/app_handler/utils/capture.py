@@ -0,0 +1,167 @@
+"""
+Opt-in capture of sanitised event shapes for realistic benchmarking.
+A sampled fraction of events is scrubbed of personal data, keeping each event's structure,
+content type, field names and sizes, and written in batches to a gzip compressed NDJSON
+corpus in /tmp or S3. Corpora are replayed offline with tests/load/replay.py.
+"""
+
+import base64
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+
+from app_handler.service.aws import AwsService
+from app_handler.utils.headers import Headers
+
+# Placeholder source IP from the documentation range, RFC 5737
+SOURCE_IP = '192.0.2.1'
+
+# Keys whose string values describe the shape of an event rather than its content
+KEEP_KEYS = frozenset({
+    'content-encoding',
+    'content-type',
+    'httpmethod',
+    'method',
+    'protocol',
+    'routekey',
+    'stage',
+    'version',
+})
+
+# Captured records not yet written, kept for the lifetime of the container.
+# Records still buffered when the container is recycled are lost, at most
+# CAPTURE_BATCH_SIZE - 1 of them.
+BUFFER = []
+BUFFER_LOCK = threading.Lock()
+
+# Names this container's corpus files
+CONTAINER_ID = uuid.uuid4().hex
+
+
+def scrub(value, key:str = None):
+    """
+    Copy of a value with strings replaced by placeholders of the same length and
+    numbers zeroed, keeping keys and structure
+    """
+    if isinstance(value, dict):
+        return {name: scrub(item, str(name).lower()) for name, item in value.items()}
+    if isinstance(value, list):
+        return [scrub(item, key) for item in value]
+    if isinstance(value, str):
+        return scrub_string(value, key)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return type(value)(0)
+
+    return value
+
+
+def scrub_string(value:str, key:str = None) -> str:
+    """
+    Placeholder for a string, unless its key describes the shape of the event
+    """
+    if key == 'sourceip':
+        return SOURCE_IP
+    if key in KEEP_KEYS:
+        return value
+
+    return 'x' * len(value)
+
+
+def scrub_body(event:dict):
+    """
+    Scrubbed body, re-encoded as the original content type so it still parses
+    """
+    body = event.get('body')
+    if not isinstance(body, str):
+        return scrub(body)
+
+    base64_encoded = event.get('isBase64Encoded') is True
+    headers = Headers(event.get('headers'), event.get('multiValueHeaders'))
+    content_type = str(headers.get('content-type') or '').lower()
+    try:
+        raw = base64.b64decode(body).decode() if base64_encoded else body
+        if content_type.startswith('application/json'):
+            scrubbed = json.dumps(scrub(json.loads(raw, strict=False)))
+        elif content_type.startswith('application/x-www-form-urlencoded'):
+            fields = urllib.parse.parse_qsl(raw, keep_blank_values=True)
+            scrubbed = urllib.parse.urlencode([(name, 'x' * len(item)) for name, item in fields])
+        else:
+            scrubbed = 'x' * len(raw)
+    except ValueError:
+        # Undecodable bodies keep only their size
+        return 'x' * len(body)
+
+    if base64_encoded:
+        return base64.b64encode(scrubbed.encode()).decode()
+
+    return scrubbed
+
+
+def sanitise(event) -> dict:
+    """
+    Event with every value that could hold personal data scrubbed
+    """
+    if not isinstance(event, dict):
+        return scrub(event)
+
+    sanitised = scrub({key: value for key, value in event.items() if key != 'body'})
+    if 'body' in event:
+        sanitised['body'] = scrub_body(event)
+
+    return sanitised
+
+
+def capture(event, response:dict) -> None:
+    """
+    Add a sample of events, with their response status, to the corpus if CAPTURE_ENABLE is set.
+    Records are written every CAPTURE_BATCH_SIZE captures, to CAPTURE_DIR or, with
+    CAPTURE_SINK set to s3, as objects under CAPTURE_S3_URI.
+    """
+    if os.environ.get('CAPTURE_ENABLE', 'False').lower() != 'true':
+        return
+
+    if random.random() >= float(os.environ.get('CAPTURE_SAMPLE_RATE', '0.01')):
+        return
+
+    record = {
+        'time': round(time.time(), 3),
+        'status': response.get('statusCode') if isinstance(response, dict) else None,
+        'event': sanitise(event),
+    }
+    line = json.dumps(record, separators=(',', ':'))
+    with BUFFER_LOCK:
+        BUFFER.append(line)
+        if len(BUFFER) < int(os.environ.get('CAPTURE_BATCH_SIZE', '10')):
+            return
+        lines = BUFFER[:]
+        BUFFER.clear()
+
+    write(lines)
+
+
+def write(lines:list) -> None:
+    """
+    Write records as one gzip member, a new S3 object or appended to this container's file
+    """
+    data = gzip.compress(('\n'.join(lines) + '\n').encode())
+
+    if os.environ.get('CAPTURE_SINK', 'tmp').lower() == 's3':
+        uri = os.environ.get('CAPTURE_S3_URI', '').removeprefix('s3://')
+        bucket, _, prefix = uri.partition('/')
+        key = f'{prefix.strip("/")}/{CONTAINER_ID}-{time.time_ns()}.ndjson.gz'.lstrip('/')
+        AwsService().put_s3_object(bucket, key, data)
+        return
+
+    # Concatenated gzip members read back as a single stream
+    path = os.path.join(os.environ.get('CAPTURE_DIR', '/tmp'), f'capture-{CONTAINER_ID}.ndjson.gz')
+    try:
+        with open(path, 'ab') as file:
+            file.write(data)
+    except OSError as exception:
+        logging.warning('Unable to write captured events to %s: %s', path, exception)
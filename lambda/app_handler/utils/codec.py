@@ -0,0 +1,24 @@
+"""
+JSON codec shared by request parsing, downstream calls and responses.
+Writes compact UTF-8 output and, without strict, accepts control characters in strings.
+"""
+
+import json
+
+# Raised for invalid documents
+DecodeError = json.JSONDecodeError
+
+
+def loads(data, strict:bool = True):
+    """
+    Parse JSON text or bytes.
+    Without strict, control characters are allowed inside strings.
+    """
+    return json.loads(data, strict=strict)
+
+
+def dumps(value) -> bytes:
+    """
+    Serialise to compact UTF-8 encoded JSON
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
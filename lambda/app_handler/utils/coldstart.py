@@ -0,0 +1,70 @@
+"""
+Init-phase timings and cold start tracking, kept for the lifetime of the container
+"""
+
+import contextlib
+import time
+
+# Milliseconds spent in each init phase, e.g. imports
+INIT_TIMINGS = {}
+
+# Invocations handled by this container
+INVOCATIONS = 0
+
+
+def record(name:str, start_ns:int) -> None:
+    """
+    Record an init phase that started at the given perf_counter_ns time
+    """
+    INIT_TIMINGS[name] = round((time.perf_counter_ns() - start_ns) / 1e6, 3)
+
+
+@contextlib.contextmanager
+def phase(name:str):
+    """
+    Time a block of init work as the named phase
+    """
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, start)
+
+
+def start_invocation() -> bool:
+    """
+    Count an invocation, returning whether it is the first in the container
+    """
+    global INVOCATIONS  # pylint: disable=global-statement
+    INVOCATIONS += 1
+    return INVOCATIONS == 1
+
+
+def is_cold() -> bool:
+    """
+    Whether the current invocation is the first in the container
+    """
+    return INVOCATIONS <= 1
+
+
+def is_keep_warm(event) -> bool:
+    """
+    Whether the event is a scheduled EventBridge rule keeping the container warm
+    https://docs.aws.amazon.com/eventbridge/latest/userguide/eb-run-lambda-schedule.html
+    """
+    return (
+        isinstance(event, dict)
+        and event.get('source') == 'aws.events'
+        and event.get('detail-type') == 'Scheduled Event'
+    )
+
+
+def keep_warm_response() -> dict:
+    """
+    Response to keep-warm events, reporting the container's init timings
+    """
+    return {
+        'warm': True,
+        'coldStart': is_cold(),
+        'init': INIT_TIMINGS,
+    }
@@ -0,0 +1,31 @@
+"""
+Shared thread pools used to overlap network calls with local work.
+The pools live at module level so worker threads are reused across warm invocations.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Small pool, a single invocation only ever has a handful of calls in flight
+WORKERS = 4
+EXECUTOR = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='app-handler')
+
+# Hedged attempts are awaited from tasks on EXECUTOR, so they need their own workers or
+# a busy pool would deadlock. Every EXECUTOR task may have two attempts in flight.
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=2 * WORKERS, thread_name_prefix='app-handler-hedge')
+
+
+def submit(function, *args, **kwargs):
+    """
+    Schedule function to run in the background, returning a Future.
+    The function runs in a copy of the caller's context, so tracing spans nest correctly.
+    """
+    return submit_to(EXECUTOR, function, *args, **kwargs)
+
+
+def submit_to(executor:ThreadPoolExecutor, function, *args, **kwargs):
+    """
+    Schedule function to run on a given pool, in a copy of the caller's context
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, function, *args, **kwargs)
@@ -0,0 +1,94 @@
+"""
+Case-insensitive view of request headers over the event's own dictionaries.
+Nothing is copied or lowercased up front, values keep their original case, and only
+the names actually read are normalised.
+"""
+
+from collections.abc import Mapping
+
+
+class Headers(Mapping):
+    """
+    Read-only case-insensitive mapping of header names to values.
+    Single value headers take precedence, otherwise the last of multi-value
+    headers, e.g. API Gateway v1 and load balancer multiValueHeaders, is used.
+    """
+
+    def __init__(self, headers:dict = None, multi_value_headers:dict = None) -> None:
+        self.headers = headers if isinstance(headers, dict) else {}
+        self.multi_value_headers = \
+            multi_value_headers if isinstance(multi_value_headers, dict) else {}
+        # Original names of the header names read, by their lowercase form
+        self.names = {}
+        self.multi_value_names = {}
+
+
+    def find(self, headers:dict, names:dict, name:str):
+        """
+        Original name of a header in a dictionary, matched case-insensitively, or None
+        """
+        lower = name.lower()
+        if lower in names:
+            return names[lower]
+
+        # Gateways either keep names as sent or lowercase them
+        key = name if name in headers else lower if lower in headers else None
+        if key is None:
+            # Only names of the same length can match, so few are lowercased
+            for candidate in headers:
+                if isinstance(candidate, str) and len(candidate) == len(lower) and \
+                        candidate.lower() == lower:
+                    key = candidate
+                    break
+
+        names[lower] = key
+        return key
+
+
+    def get_all(self, name:str) -> list:
+        """
+        Every value of a header, in order
+        """
+        key = self.find(self.multi_value_headers, self.multi_value_names, name)
+        if key is not None:
+            values = self.multi_value_headers[key]
+            if isinstance(values, list) and values:
+                return values
+
+        key = self.find(self.headers, self.names, name)
+        if key is not None:
+            return [self.headers[key]]
+
+        return []
+
+
+    def __getitem__(self, name):
+        if not isinstance(name, str):
+            raise KeyError(name)
+
+        key = self.find(self.headers, self.names, name)
+        if key is not None:
+            return self.headers[key]
+
+        values = self.get_all(name)
+        if not values:
+            raise KeyError(name)
+
+        return values[-1]
+
+
+    def __iter__(self):
+        yield from self.headers
+        for key in self.multi_value_headers:
+            if key not in self.headers:
+                yield key
+
+
+    def __len__(self) -> int:
+        return len(self.headers) + sum(
+            1 for key in self.multi_value_headers if key not in self.headers
+        )
+
+
+    def __bool__(self) -> bool:
+        return bool(self.headers) or bool(self.multi_value_headers)
@@ -0,0 +1,242 @@
+"""
+Compact HDR-style latency histograms kept across warm invocations.
+Values are stored in log-linear microsecond buckets with under 2% relative error,
+so memory stays bounded however many samples are recorded.
+"""
+
+import math
+import threading
+import time
+
+# Sub-buckets per power of two, doubling halves the relative error
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+# Recent percentiles cover the current and previous windows of this length or sample count
+WINDOW_SECONDS = 60
+WINDOW_SAMPLES = 1000
+
+
+def bucket_index(value:int) -> int:
+    """
+    Bucket index for a non-negative integer value
+    """
+    if value < SUB_BUCKET_COUNT:
+        return value
+
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * SUB_BUCKET_HALF + (value >> shift)
+
+
+def bucket_upper(index:int) -> int:
+    """
+    Highest value held by a bucket
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index
+
+    shift = index // SUB_BUCKET_HALF - 1
+    mantissa = index - shift * SUB_BUCKET_HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """
+    Latency histogram, recording seconds and reporting percentiles in seconds
+    """
+
+    def __init__(self) -> None:
+        self.counts = {}
+        self.total = 0
+        self.max_value = 0
+
+
+    def record(self, seconds:float) -> None:
+        """
+        Add a latency sample
+        """
+        value = max(round(seconds * 1e6), 0)
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.max_value = max(self.max_value, value)
+
+
+    def merge(self, other) -> None:
+        """
+        Add all samples of another histogram
+        """
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+
+
+    def percentile(self, percent:float):
+        """
+        Nearest-rank percentile, None if empty
+        """
+        if self.total == 0:
+            return None
+
+        rank = max(math.ceil(percent / 100 * self.total), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_upper(index), self.max_value) / 1e6
+
+        return self.max_value / 1e6
+
+
+    def snapshot(self) -> dict:
+        """
+        Sample count and p50/p90/p99/max in milliseconds
+        """
+        return {
+            'count': self.total,
+            'p50': self.percentile(50) * 1e3,
+            'p90': self.percentile(90) * 1e3,
+            'p99': self.percentile(99) * 1e3,
+            'max': self.max_value / 1e3,
+        }
+
+
+class Window:
+    """
+    Samples of one name over a current and a previous window, for percentiles that
+    follow recent conditions. The current window starts over once it is WINDOW_SECONDS
+    old or holds WINDOW_SAMPLES samples.
+    """
+
+    def __init__(self, now:float) -> None:
+        self.current = Histogram()
+        self.previous = Histogram()
+        self.started = now
+
+
+    def rotate(self, now:float) -> None:
+        """
+        Start a new window if the current one is full or too old
+        """
+        elapsed = now - self.started
+        if elapsed < WINDOW_SECONDS and self.current.total < WINDOW_SAMPLES:
+            return
+
+        # Samples older than two windows are no longer recent
+        self.previous = self.current if elapsed < 2 * WINDOW_SECONDS else Histogram()
+        self.current = Histogram()
+        self.started = now
+
+
+    def record(self, seconds:float, now:float) -> None:
+        """
+        Add a sample to the current window
+        """
+        self.rotate(now)
+        self.current.record(seconds)
+
+
+    def recent(self, now:float) -> Histogram:
+        """
+        Histogram of the current and previous windows combined
+        """
+        self.rotate(now)
+        combined = Histogram()
+        combined.merge(self.previous)
+        combined.merge(self.current)
+        return combined
+
+
+class Histograms:
+    """
+    Named histograms, e.g. per stage and per downstream host.
+    Samples are kept in rotating windows for adaptive behaviour, e.g. timeouts, and
+    separately since the last flush for reporting, so windows follow recent conditions
+    whether or not reports are flushed.
+    """
+
+    def __init__(self) -> None:
+        self.windows = {}
+        self.current = {}
+        self.invocations = 0
+        self.flushed = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def record(self, name:str, seconds:float, now:float = None) -> None:
+        """
+        Add a latency sample to the named histogram
+        """
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            window = self.windows.get(name)
+            if window is None:
+                window = self.windows[name] = Window(now)
+            window.record(seconds, now)
+
+            histogram = self.current.get(name)
+            if histogram is None:
+                histogram = self.current[name] = Histogram()
+            histogram.record(seconds)
+
+
+    def recent(self, name:str, now:float = None) -> Histogram:
+        """
+        Histogram of the named samples in the current and previous windows
+        """
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            window = self.windows.get(name)
+            if window is None:
+                return Histogram()
+            return window.recent(now)
+
+
+    def tick(self, flush_invocations:int, flush_seconds:float, now:float = None):
+        """
+        Count an invocation, returning snapshots of all histograms since the last flush
+        and starting over every flush_invocations invocations or flush_seconds seconds,
+        otherwise None
+        """
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            self.invocations += 1
+            elapsed = now - self.flushed
+            if self.invocations < flush_invocations and elapsed < flush_seconds:
+                return None
+
+            flushed = {
+                'invocations': self.invocations,
+                'seconds': round(elapsed, 3),
+                'histograms': {
+                    name: histogram.snapshot() for name, histogram in sorted(self.current.items())
+                },
+            }
+            self.current = {}
+            self.invocations = 0
+            self.flushed = now
+
+        return flushed
+
+
+    def clear(self) -> None:
+        """
+        Forget all samples
+        """
+        with self.lock:
+            self.windows = {}
+            self.current = {}
+            self.invocations = 0
+            self.flushed = time.monotonic()
+
+
+# Shared histograms, kept across warm invocations
+HISTOGRAMS = Histograms()
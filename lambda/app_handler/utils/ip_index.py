@@ -0,0 +1,140 @@
+"""
+Binary prefix tree of IPv4 and IPv6 CIDR allow and deny lists.
+The index is compiled to a file at package time and memory-mapped at runtime,
+so loading costs nothing and lookups walk at most one node per prefix bit.
+
+Build an index with:
+    python -m app_handler.utils.ip_index --deny deny.txt --allow allow.txt --output ip_index.bin
+"""
+
+import argparse
+import ipaddress
+import mmap
+import struct
+
+# File header: magic, IPv4 root node, IPv6 root node
+HEADER = struct.Struct('<4sII')
+MAGIC = b'IPX1'
+# Node: child for bit 0, child for bit 1, value. Child 0 means no child as roots are never children
+NODE = struct.Struct('<IIB')
+
+NONE = 0
+DENY = 1
+ALLOW = 2
+ACTIONS = {NONE: None, DENY: 'deny', ALLOW: 'allow'}
+
+
+def parse_networks(text:str) -> list:
+    """
+    Extract one CIDR per line, ignoring blank lines and # comments
+    """
+    networks = []
+    for line in text.splitlines():
+        stripped = line.split('#', 1)[0].strip()
+        if stripped:
+            networks.append(ipaddress.ip_network(stripped, strict=False))
+
+    return networks
+
+
+def build_index(deny:list, allow:list) -> bytes:
+    """
+    Compile deny and allow networks into the binary index format.
+    Allow entries take precedence over deny entries with the same prefix.
+    """
+    # Nodes as [child 0, child 1, value], IPv4 root then IPv6 root
+    nodes = [[0, 0, NONE], [0, 0, NONE]]
+
+    for value, networks in ((DENY, deny), (ALLOW, allow)):
+        for network in networks:
+            node = 0 if network.version == 4 else 1
+            address = int(network.network_address)
+            for bit in range(network.prefixlen):
+                direction = (address >> (network.max_prefixlen - 1 - bit)) & 1
+                if nodes[node][direction] == 0:
+                    nodes[node][direction] = len(nodes)
+                    nodes.append([0, 0, NONE])
+                node = nodes[node][direction]
+            nodes[node][2] = value
+
+    output = bytearray(HEADER.pack(MAGIC, 0, 1))
+    for node in nodes:
+        output += NODE.pack(*node)
+
+    return bytes(output)
+
+
+class IpIndex:
+    """
+    Memory-mapped longest prefix match lookups
+    """
+
+    def __init__(self, path:str) -> None:
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.root_v4, self.root_v6 = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'Invalid IP index file {path}')
+
+
+    def lookup(self, ip:str):
+        """
+        Return 'deny' or 'allow' for the longest matching prefix, None if nothing matches
+        """
+        address = ipaddress.ip_address(ip)
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        node = self.root_v4 if address.version == 4 else self.root_v6
+        bits = address.max_prefixlen
+        value = int(address)
+
+        buffer = self.buffer
+        offset = HEADER.size
+        size = NODE.size
+        unpack = NODE.unpack_from
+
+        children = unpack(buffer, offset + node * size)
+        result = children[2]
+        for bit in range(bits - 1, -1, -1):
+            node = children[(value >> bit) & 1]
+            if node == 0:
+                break
+            children = unpack(buffer, offset + node * size)
+            if children[2] != NONE:
+                result = children[2]
+
+        return ACTIONS[result]
+
+
+    def close(self) -> None:
+        """
+        Release the memory map, the index cannot be used afterwards
+        """
+        self.buffer.close()
+
+
+def main(args=None) -> None:
+    """
+    Compile CIDR list files into an index file
+    """
+    parser = argparse.ArgumentParser(description='Build an IP allow/deny index')
+    parser.add_argument('--deny', action='append', default=[], help='File of CIDRs to deny')
+    parser.add_argument('--allow', action='append', default=[], help='File of CIDRs to allow')
+    parser.add_argument('--output', required=True, help='Index file to write')
+    options = parser.parse_args(args)
+
+    networks = {}
+    for name in ('deny', 'allow'):
+        networks[name] = []
+        for path in getattr(options, name):
+            with open(path, encoding='UTF-8') as file:
+                networks[name] += parse_networks(file.read())
+
+    with open(options.output, 'wb') as file:
+        file.write(build_index(networks['deny'], networks['allow']))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
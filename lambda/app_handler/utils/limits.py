@@ -0,0 +1,80 @@
+"""
+Limits on request body sizes and structure, checked as early as possible
+"""
+
+from app_handler.utils.form import MAX_FIELDS
+
+# Default largest body as received, and once base64 decoded, in bytes
+MAX_BYTES = 2 * 1024 * 1024
+MAX_DECODED_BYTES = 1536 * 1024
+
+# Default deepest nesting of JSON objects and arrays
+MAX_DEPTH = 32
+
+# Default largest multipart text field and file, and file size kept in memory before
+# moving to a temporary file. Files also count towards the body size limits, so the
+# largest file stays within the largest decoded body.
+MAX_FIELD_BYTES = 64 * 1024
+MAX_FILE_BYTES = 1024 * 1024
+SPOOL_BYTES = 256 * 1024
+
+
+class BodyLimits:
+    """
+    Largest accepted body sizes, form, JSON and multipart field counts,
+    JSON nesting depth and multipart part sizes
+    """
+
+    # Keyword-only, every limit has a default and callers override them by name
+    def __init__(self, *,  # pylint: disable=too-many-arguments
+                 max_bytes:int = MAX_BYTES, max_decoded_bytes:int = MAX_DECODED_BYTES,
+                 max_fields:int = MAX_FIELDS, max_depth:int = MAX_DEPTH,
+                 max_field_bytes:int = MAX_FIELD_BYTES, max_file_bytes:int = MAX_FILE_BYTES,
+                 spool_bytes:int = SPOOL_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.max_decoded_bytes = max_decoded_bytes
+        self.max_fields = max_fields
+        self.max_depth = max_depth
+        self.max_field_bytes = max_field_bytes
+        self.max_file_bytes = max_file_bytes
+        self.spool_bytes = spool_bytes
+
+
+    def too_large(self, body, base64_encoded:bool) -> bool:
+        """
+        Whether a body exceeds either size limit, judged from its encoded length
+        so oversized bodies are never decoded
+        """
+        size = len(body)
+        if size > self.max_bytes:
+            return True
+
+        if base64_encoded:
+            # Every 4 base64 characters decode to 3 bytes, less any padding
+            size = size // 4 * 3 - body[-2:].count('=' if isinstance(body, str) else b'=')
+
+        return size > self.max_decoded_bytes
+
+
+    def check_json(self, value) -> None:
+        """
+        Raise ValueError if parsed JSON has more object members than max_fields
+        or nests objects and arrays deeper than max_depth
+        """
+        fields = 0
+        stack = [(value, 1)]
+        while stack:
+            item, depth = stack.pop()
+            if isinstance(item, dict):
+                fields += len(item)
+                if fields > self.max_fields:
+                    raise ValueError(f'JSON has more than {self.max_fields} fields')
+                children = item.values()
+            else:
+                children = item
+
+            for child in children:
+                if isinstance(child, (dict, list)):
+                    if depth >= self.max_depth:
+                        raise ValueError(f'JSON is nested deeper than {self.max_depth} levels')
+                    stack.append((child, depth + 1))
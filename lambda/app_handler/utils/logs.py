@@ -0,0 +1,122 @@
+"""
+Structured JSON logging with PII redaction.
+Payloads are passed as log arguments, so they are only redacted and rendered
+when a record is actually emitted.
+"""
+
+import json
+import logging
+import random
+
+# Keys whose values are hidden in logged payloads, compared case-insensitively
+DEFAULT_REDACT_FIELDS = (
+    'authorization,body,cookie,email,message,name,phone,remoteip,response,secret,'
+    'sourceip,x-forwarded-for'
+)
+REDACTED = '[REDACTED]'
+
+# Attributes of every log record, anything else was passed as extra
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+# Fields added to every JSON record, such as the current request id
+CONTEXT = {}
+
+# Fraction of invocations whose full event is logged at DEBUG level
+EVENT_SAMPLE_RATE = 1.0
+
+
+def redact(value, fields:frozenset):
+    """
+    Copy of a payload with values of the given keys hidden, recursing into containers
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item, fields) for item in value)
+
+    return value
+
+
+# The single method is the interface logging.Filter defines
+class RedactFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    """
+    Handler filter redacting payload arguments of records about to be emitted
+    """
+
+    def __init__(self, fields:frozenset) -> None:
+        super().__init__()
+        self.fields = fields
+
+    def filter(self, record) -> bool:
+        record.msg = redact(record.msg, self.fields)
+        if record.args:
+            record.args = redact(record.args, self.fields)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single line JSON document
+    """
+
+    def __init__(self, fields:frozenset) -> None:
+        super().__init__()
+        self.fields = fields
+
+    def format(self, record) -> str:
+        document = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        } | CONTEXT
+
+        # Extras are redacted by their own key too, e.g. extra={'sourceIp': ip}
+        for key, value in vars(record).items():
+            if key in RECORD_ATTRIBUTES:
+                continue
+            if key.lower() in self.fields:
+                document[key] = REDACTED
+            else:
+                document[key] = redact(value, self.fields)
+
+        if record.exc_info:
+            document['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(document, default=str)
+
+
+def configure(level:str, log_format:str = 'json', redact_fields:str = DEFAULT_REDACT_FIELDS,
+              event_sample_rate:float = 1.0) -> None:
+    """
+    Set the root log level and install redaction, and JSON formatting unless
+    log_format is text, on the root handlers
+    """
+    global EVENT_SAMPLE_RATE  # pylint: disable=global-statement
+    EVENT_SAMPLE_RATE = event_sample_rate
+
+    fields = frozenset(field.strip().lower() for field in redact_fields.split(',') if field.strip())
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+
+    for handler in root.handlers:
+        for existing in [item for item in handler.filters if isinstance(item, RedactFilter)]:
+            handler.removeFilter(existing)
+        handler.addFilter(RedactFilter(fields))
+        if log_format.lower() == 'json':
+            handler.setFormatter(JsonFormatter(fields))
+
+
+def log_event(event, context) -> None:
+    """
+    Log a sample of invocation events at DEBUG level, costing a level check otherwise
+    """
+    CONTEXT['requestId'] = getattr(context, 'aws_request_id', None)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG) and random.random() < EVENT_SAMPLE_RATE:
+        logging.debug('Received event %s with context %s', event, context)
@@ -0,0 +1,125 @@
+"""
+Per-invocation stage timings and outcome counts, emitted as a single
+CloudWatch Embedded Metric Format (EMF) log line with no extra API calls.
+https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+"""
+
+import contextlib
+import json
+import os
+import time
+
+from app_handler.utils import coldstart
+from app_handler.utils.histogram import HISTOGRAMS
+
+# Shared no-op timer so disabled metrics cost a single attribute check
+NULL_TIMER = contextlib.nullcontext()
+
+
+class Timer:
+    """
+    Context manager adding elapsed time to a stage
+    """
+
+    def __init__(self, metrics, stage:str) -> None:
+        self.metrics = metrics
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter_ns() - self.start
+        timings = self.metrics.timings
+        timings[self.stage] = timings.get(self.stage, 0) + elapsed
+
+
+class Metrics:
+    """
+    Collects stage timings in nanoseconds, repeated stages are summed
+    """
+
+    def __init__(self, enable:bool = None, histograms:bool = None) -> None:
+        if enable is None:
+            enable = os.environ.get('METRICS_ENABLE', 'False').lower() == 'true'
+        if histograms is None:
+            histograms = os.environ.get('HISTOGRAM_ENABLE', 'False').lower() == 'true'
+        self.enable = enable
+        self.histograms = histograms
+        self.namespace = os.environ.get('METRICS_NAMESPACE', 'ContactFormHandler')
+        self.timings = {}
+
+
+    def timer(self, stage:str):
+        """
+        Time a block of code as the given stage
+        """
+        if not self.enable and not self.histograms:
+            return NULL_TIMER
+
+        return Timer(self, stage)
+
+
+    def build(self, response) -> dict:
+        """
+        Build the EMF document for the invocation, with init phase durations on cold starts
+        """
+        cold = coldstart.is_cold()
+        status_code = response.get('statusCode', 0) if isinstance(response, dict) else 0
+        values = {
+            'ColdStart': int(cold),
+            'Success': int(200 <= status_code < 300),
+            'ClientError': int(400 <= status_code < 500),
+            'ServerError': int(status_code >= 500),
+        }
+
+        metrics = [{'Name': name, 'Unit': 'Count'} for name in values]
+        for stage, elapsed in self.timings.items():
+            name = f'{stage.title()}Latency'
+            values[name] = elapsed / 1e6
+            metrics.append({'Name': name, 'Unit': 'Milliseconds'})
+
+        if cold:
+            for init_phase, elapsed in coldstart.INIT_TIMINGS.items():
+                name = f'Init{init_phase.title()}Duration'
+                values[name] = elapsed
+                metrics.append({'Name': name, 'Unit': 'Milliseconds'})
+
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [
+                    {
+                        'Namespace': self.namespace,
+                        'Dimensions': [['FunctionName']],
+                        'Metrics': metrics,
+                    }
+                ],
+            },
+            'FunctionName': os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local'),
+            'StatusCode': status_code,
+        } | values
+
+
+    def emit(self, response) -> None:
+        """
+        Print the EMF document as a single line, picked up by CloudWatch Logs.
+        Stage timings are added to the shared histograms, whose percentiles are printed
+        as a single line every HISTOGRAM_FLUSH_INVOCATIONS invocations or
+        HISTOGRAM_FLUSH_SECONDS seconds.
+        """
+        if self.enable:
+            print(json.dumps(self.build(response), separators=(',', ':')), flush=True)
+
+        if self.histograms:
+            for stage, elapsed in self.timings.items():
+                HISTOGRAMS.record(f'stage.{stage}', elapsed / 1e9)
+
+            flushed = HISTOGRAMS.tick(
+                int(os.environ.get('HISTOGRAM_FLUSH_INVOCATIONS', '100')),
+                float(os.environ.get('HISTOGRAM_FLUSH_SECONDS', '60')),
+            )
+            if flushed is not None:
+                print(json.dumps({'latencyHistograms': flushed}, separators=(',', ':')), flush=True)
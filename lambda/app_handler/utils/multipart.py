@@ -0,0 +1,300 @@
+"""
+Streaming parser for multipart/form-data bodies
+https://www.rfc-editor.org/rfc/rfc7578
+
+The body is parsed in chunks, base64 decoded as it is read, so it is never decoded in full.
+Text parts become fields and file parts are written to spooled temporary files, kept in
+memory up to a threshold and moved to the temporary directory, /tmp in Lambda, beyond it.
+"""
+
+import base64
+import binascii
+import email.message
+import email.utils
+import tempfile
+
+# Bytes decoded and parsed at a time
+CHUNK_SIZE = 64 * 1024
+
+# Largest accepted header block of a single part
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class PartTooLarge(ValueError):
+    """
+    A part exceeds its size limit
+    """
+
+
+class UploadedFile:
+    """
+    File part of a multipart body, with its content in a spooled temporary file
+    """
+
+    def __init__(self, filename:str, content_type:str, spool_bytes:int) -> None:
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)  # pylint: disable=consider-using-with
+
+
+    def __str__(self) -> str:
+        return self.filename
+
+
+    def write(self, data) -> None:
+        """
+        Append data to the file
+        """
+        self.file.write(data)
+        self.size += len(data)
+
+
+    def read(self) -> bytes:
+        """
+        Read the whole file from the start
+        """
+        self.file.seek(0)
+        return self.file.read()
+
+
+    def close(self) -> None:
+        """
+        Close the file, deleting it if it was moved to disk
+        """
+        self.file.close()
+
+
+def get_param(value:str, header:str, name:str):
+    """
+    Parameter of a structured header value, e.g. the boundary of a Content-Type
+    """
+    message = email.message.Message()
+    message[header] = value
+    param = message.get_param(name, header=header)
+    if param is None:
+        return None
+
+    return email.utils.collapse_rfc2231_value(param)
+
+
+def body_chunks(body, base64_encoded:bool, size:int = CHUNK_SIZE):
+    """
+    Yield the body as bytes, decoding base64 one chunk at a time
+    """
+    if base64_encoded:
+        # Whole groups of 4 characters decode independently
+        step = size // 3 * 4
+        for start in range(0, len(body), step):
+            try:
+                yield base64.b64decode(body[start:start + step], validate=True)
+            except binascii.Error as exception:
+                raise ValueError(f'Invalid base64 body: {exception}') from exception
+    elif isinstance(body, str):
+        for start in range(0, len(body), size):
+            yield body[start:start + size].encode('utf-8')
+    else:
+        view = memoryview(body)
+        for start in range(0, len(view), size):
+            yield view[start:start + size]
+
+
+def add(values:dict, name:str, value) -> None:
+    """
+    Add a field value, repeated names map to a list of their values in order
+    """
+    if name not in values:
+        values[name] = value
+    elif isinstance(values[name], list):
+        values[name].append(value)
+    else:
+        values[name] = [values[name], value]
+
+
+# Unparsed data, results and the current part all carry over between chunks
+class MultipartParser:  # pylint: disable=too-many-instance-attributes
+    """
+    Incremental multipart/form-data parser fed with chunks of the body.
+    Keeps at most a chunk and a boundary of unparsed data in memory.
+    """
+
+    def __init__(self, boundary:str, limits) -> None:
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        self.limits = limits
+        self.fields = {}
+        self.files = {}
+        self.buffer = bytearray()
+        # Preamble, delimiter, headers, body or done
+        self.state = 'preamble'
+        self.parts = 0
+        self.part = None
+
+
+    def parse(self, chunks) -> None:
+        """
+        Parse every chunk of a body, raising ValueError if it is malformed and
+        PartTooLarge if a part exceeds its limit
+        """
+        # The first delimiter is not preceded by a line break
+        self.buffer += b'\r\n'
+        for chunk in chunks:
+            self.feed(chunk)
+
+        if self.state != 'done':
+            raise ValueError('Multipart body ended before its closing delimiter')
+
+
+    def feed(self, chunk) -> None:
+        """
+        Parse as much of the buffered data as possible, one state at a time
+        """
+        self.buffer += chunk
+        while getattr(self, f'parse_{self.state}')():
+            pass
+
+
+    def parse_preamble(self) -> bool:
+        """
+        Skip to the first delimiter, returning whether it was found
+        """
+        index = self.buffer.find(self.delimiter)
+        if index < 0:
+            # Keep a possible partial delimiter
+            del self.buffer[:max(len(self.buffer) - len(self.delimiter) + 1, 0)]
+            return False
+
+        del self.buffer[:index]
+        self.state = 'delimiter'
+        return True
+
+
+    def parse_delimiter(self) -> bool:
+        """
+        Consume a delimiter, followed by a line break, or by dashes if it closes the body
+        """
+        end = len(self.delimiter) + 2
+        if len(self.buffer) < end:
+            return False
+
+        suffix = bytes(self.buffer[end - 2:end])
+        if suffix == b'\r\n':
+            self.state = 'headers'
+        elif suffix == b'--':
+            self.state = 'done'
+        else:
+            raise ValueError('Invalid multipart delimiter')
+        del self.buffer[:end]
+        return True
+
+
+    def parse_headers(self) -> bool:
+        """
+        Start a part once its whole header block is buffered
+        """
+        index = self.buffer.find(b'\r\n\r\n')
+        if index < 0:
+            if len(self.buffer) > MAX_HEADER_BYTES:
+                raise ValueError('Multipart part headers too large')
+            return False
+
+        self.start_part(bytes(self.buffer[:index]))
+        del self.buffer[:index + 4]
+        self.state = 'body'
+        return True
+
+
+    def parse_body(self) -> bool:
+        """
+        Write buffered data to the current part, ending it at the next delimiter
+        """
+        index = self.buffer.find(self.delimiter)
+        if index < 0:
+            # Keep a possible partial delimiter
+            self.write_part(max(len(self.buffer) - len(self.delimiter) + 1, 0))
+            return False
+
+        self.write_part(index)
+        self.end_part()
+        self.state = 'delimiter'
+        return True
+
+
+    def parse_done(self) -> bool:
+        """
+        Ignore any epilogue after the closing delimiter
+        """
+        self.buffer.clear()
+        return False
+
+
+    def start_part(self, block:bytes) -> None:
+        """
+        Start a field or file part from its header block
+        """
+        self.parts += 1
+        if self.parts > self.limits.max_fields:
+            raise ValueError(f'Multipart body has more than {self.limits.max_fields} parts')
+
+        headers = {}
+        for line in block.decode('utf-8').split('\r\n'):
+            name, separator, value = line.partition(':')
+            if not separator:
+                raise ValueError(f'Invalid multipart header {line!r}')
+            headers[name.strip().lower()] = value.strip()
+
+        disposition = headers.get('content-disposition', '')
+        name = get_param(disposition, 'content-disposition', 'name')
+        if not disposition.lower().startswith('form-data') or name is None:
+            raise ValueError('Multipart part without a form-data name')
+
+        filename = get_param(disposition, 'content-disposition', 'filename')
+        if filename is None:
+            self.part = (name, bytearray())
+        else:
+            upload = UploadedFile(
+                filename,
+                headers.get('content-type', 'application/octet-stream'),
+                self.limits.spool_bytes,
+            )
+            add(self.files, name, upload)
+            self.part = (name, upload)
+
+
+    def write_part(self, length:int) -> None:
+        """
+        Move the first length bytes of the buffer into the current part
+        """
+        if not length:
+            return
+
+        name, target = self.part
+        if isinstance(target, UploadedFile):
+            if target.size + length > self.limits.max_file_bytes:
+                raise PartTooLarge(f'File `{name}` exceeds {self.limits.max_file_bytes} bytes')
+            with memoryview(self.buffer) as view:
+                target.write(view[:length])
+        else:
+            if len(target) + length > self.limits.max_field_bytes:
+                raise PartTooLarge(f'Field `{name}` exceeds {self.limits.max_field_bytes} bytes')
+            target += self.buffer[:length]
+
+        del self.buffer[:length]
+
+
+    def end_part(self) -> None:
+        """
+        Complete the current part, text parts are decoded as UTF-8 fields
+        """
+        name, target = self.part
+        if not isinstance(target, UploadedFile):
+            add(self.fields, name, target.decode('utf-8'))
+        self.part = None
+
+
+    def close(self) -> None:
+        """
+        Close every uploaded file
+        """
+        for uploads in self.files.values():
+            for upload in uploads if isinstance(uploads, list) else [uploads]:
+                upload.close()
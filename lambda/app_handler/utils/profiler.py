@@ -0,0 +1,145 @@
+"""
+Opt-in per-invocation profiling with cProfile and tracemalloc.
+Profiling is triggered for a sampled fraction of invocations by PROFILE_ENABLE, or for a
+single request by an X-Profile header signed with PROFILE_SECRET.
+"""
+
+import contextlib
+import cProfile
+import glob
+import json
+import os
+import pstats
+import random
+import time
+import tracemalloc
+
+from app_handler.utils.headers import Headers
+from app_handler.utils.signing import verify
+
+# Shared no-op context when an invocation is not profiled
+NULL_PROFILE = contextlib.nullcontext()
+
+# Header carrying a signed Unix timestamp, e.g. sign(secret, str(int(time.time())))
+PROFILE_HEADER = 'x-profile'
+# Signed headers older than this are rejected to limit replay
+PROFILE_HEADER_MAX_AGE = 300
+
+
+def is_signed_request(event, secret:str, now:float = None) -> bool:
+    """
+    Whether the event carries a valid, recent profiling header
+    """
+    if not isinstance(event, dict):
+        return False
+
+    headers = Headers(event.get('headers'), event.get('multiValueHeaders'))
+    timestamp = verify(secret, headers.get(PROFILE_HEADER))
+    if timestamp is None or not timestamp.isdigit():
+        return False
+
+    if now is None:
+        now = time.time()
+
+    return abs(now - int(timestamp)) <= PROFILE_HEADER_MAX_AGE
+
+
+def profile(event):
+    """
+    Return a profiling context for the invocation, or a shared no-op one
+    """
+    secret = os.environ.get('PROFILE_SECRET')
+    if secret and is_signed_request(event, secret):
+        return Profiler()
+
+    if os.environ.get('PROFILE_ENABLE', 'False').lower() != 'true':
+        return NULL_PROFILE
+
+    if random.random() >= float(os.environ.get('PROFILE_SAMPLE_RATE', '1')):
+        return NULL_PROFILE
+
+    return Profiler()
+
+
+class Profiler:
+    """
+    Captures CPU and allocation profiles of the calling thread, then writes a compact
+    summary to the logs or, with PROFILE_SINK set to tmp, a pstats file in PROFILE_DIR,
+    keeping the latest PROFILE_KEEP files
+    """
+
+    def __init__(self) -> None:
+        self.sink = os.environ.get('PROFILE_SINK', 'log').lower()
+        self.directory = os.environ.get('PROFILE_DIR', '/tmp')
+        self.keep = int(os.environ.get('PROFILE_KEEP', '10'))
+        self.top = int(os.environ.get('PROFILE_TOP', '20'))
+        self.profiler = cProfile.Profile()
+        self.started_tracing = False
+        self.summary = None
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self.started_tracing:
+            tracemalloc.stop()
+
+        self.summary = self.summarise(snapshot, peak)
+        print(json.dumps({'profile': self.summary}, separators=(',', ':')), flush=True)
+
+
+    def summarise(self, snapshot, peak:int) -> dict:
+        """
+        Top functions by cumulative time and top allocating lines
+        """
+        stats = pstats.Stats(self.profiler)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        summary = {
+            'totalMs': round(stats.total_tt * 1e3, 3),
+            'peakMemoryKb': round(peak / 1024, 1),
+            'functions': [
+                {
+                    'function': f'{filename}:{line}({name})',
+                    'calls': calls,
+                    'ownMs': round(own * 1e3, 3),
+                    'cumulativeMs': round(cumulative * 1e3, 3),
+                }
+                for (filename, line, name), (_, calls, own, cumulative, _) in functions[:self.top]
+            ],
+            'allocations': [
+                {
+                    'line': str(statistic.traceback[0]),
+                    'count': statistic.count,
+                    'sizeKb': round(statistic.size / 1024, 1),
+                }
+                for statistic in snapshot.statistics('lineno')[:self.top]
+            ],
+        }
+
+        if self.sink == 'tmp':
+            path = os.path.join(self.directory, f'profile-{time.time_ns()}-{os.getpid()}.pstats')
+            stats.dump_stats(path)
+            summary['path'] = path
+            # The pstats file holds the full function list
+            del summary['functions']
+            self.prune()
+
+        return summary
+
+
+    def prune(self) -> None:
+        """
+        Delete all but the latest pstats files, as /tmp persists across warm invocations
+        """
+        # Names start with the time written, so they sort by age
+        paths = sorted(glob.glob(os.path.join(self.directory, 'profile-*.pstats')))
+        for path in paths[:max(len(paths) - self.keep, 0)]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
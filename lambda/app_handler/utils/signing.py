@@ -0,0 +1,32 @@
+"""
+HMAC signing of short string values, e.g. form render timestamps
+"""
+
+import hashlib
+import hmac
+
+
+def sign(secret:str, value:str) -> str:
+    """
+    Takes a value e.g:
+        1700000000
+    and returns it with an appended HMAC-SHA256 signature:
+        1700000000.<hex digest>
+    """
+    digest = hmac.new(secret.encode(), value.encode(), hashlib.sha256).hexdigest()
+    return f'{value}.{digest}'
+
+
+def verify(secret:str, signed:str):
+    """
+    Return the original value if the signature is valid, otherwise None
+    """
+    if not isinstance(signed, str) or '.' not in signed:
+        return None
+
+    value, _, digest = signed.rpartition('.')
+    expected = hmac.new(secret.encode(), value.encode(), hashlib.sha256).hexdigest()
+    if hmac.compare_digest(expected, digest):
+        return value
+
+    return None
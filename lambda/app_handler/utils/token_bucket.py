@@ -0,0 +1,47 @@
+"""
+In-memory token buckets per key with least recently used eviction
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+# Single operation by design, the class only holds buckets shared across invocations
+class TokenBuckets:  # pylint: disable=too-few-public-methods
+    """
+    Token bucket per key, refilled at a fixed rate up to a burst size.
+    Only the most recently used keys are kept to bound memory.
+    """
+
+    def __init__(self, rate:float, burst:float, max_entries:int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        # Key to (tokens, last update time)
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def take(self, key:str, now:float = None) -> float:
+        """
+        Take a token for the key, returning the tokens left afterwards.
+        Returns a negative value if no token was available.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                remaining = tokens
+            else:
+                remaining = -1
+
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+
+        return remaining
@@ -0,0 +1,191 @@
+"""
+Minimal tracer recording nested timing spans per invocation.
+Spans follow the current context, including work submitted to the shared executor,
+and are exported as a single JSON log line or as an X-Ray segment sent to the daemon over UDP.
+When no trace is active, spans are a shared no-op object.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+
+# Span that new spans are nested under, None outside a trace
+CURRENT = contextvars.ContextVar('span', default=None)
+
+
+class NullSpan:
+    """
+    No-op span used when tracing is off
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return None
+
+    def annotate(self, **annotations) -> None:
+        """
+        Discard annotations
+        """
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """
+    Timed operation with annotations and child spans
+    """
+
+    def __init__(self, name:str, parent=None, **annotations) -> None:
+        self.name = name
+        self.annotations = annotations
+        self.children = []
+        self.error = False
+        self.start = None
+        self.end = None
+        self.token = None
+        # Spans are entered as soon as they are created, so this keeps start order
+        if parent is not None:
+            parent.children.append(self)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        self.token = CURRENT.set(self)
+        return self
+
+    def __exit__(self, exception_type, *args):
+        self.end = time.perf_counter_ns()
+        self.error = exception_type is not None
+        CURRENT.reset(self.token)
+
+    def annotate(self, **annotations) -> None:
+        """
+        Add key value annotations, e.g. connection reuse or retry counts
+        """
+        self.annotations.update(annotations)
+
+
+    def to_dict(self, origin:int) -> dict:
+        """
+        Compact span tree with times in milliseconds relative to origin
+        """
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        document = {
+            'name': self.name,
+            'startMs': round((self.start - origin) / 1e6, 3),
+            'durationMs': round((end - self.start) / 1e6, 3),
+        }
+        if self.annotations:
+            document['annotations'] = self.annotations
+        if self.error:
+            document['error'] = True
+        if self.children:
+            document['children'] = [child.to_dict(origin) for child in self.children]
+
+        return document
+
+
+    def to_segment(self, epoch:float, origin:int) -> dict:
+        """
+        X-Ray segment fields with epoch second times
+        https://docs.aws.amazon.com/xray/latest/devguide/xray-api-segmentdocuments.html
+        """
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        document = {
+            'name': self.name,
+            # Only needed by X-Ray, so only generated on export
+            'id': secrets.token_hex(8),
+            'start_time': epoch + (self.start - origin) / 1e9,
+            'end_time': epoch + (end - origin) / 1e9,
+        }
+        if self.annotations:
+            document['annotations'] = {
+                key: value if isinstance(value, (bool, int, float, str)) else str(value)
+                for key, value in self.annotations.items()
+            }
+        if self.error:
+            document['fault'] = True
+        if self.children:
+            document['subsegments'] = [child.to_segment(epoch, origin) for child in self.children]
+
+        return document
+
+
+def span(name:str, **annotations):
+    """
+    Child span of the current span, or the shared no-op span outside a trace
+    """
+    parent = CURRENT.get()
+    if parent is None:
+        return NULL_SPAN
+
+    return Span(name, parent, **annotations)
+
+
+def traced(name:str):
+    """
+    Decorate a function to run within a span
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+class Trace:
+    """
+    Root span of an invocation, exported on exit if TRACE_ENABLE is set
+    """
+
+    def __init__(self, name:str) -> None:
+        self.enable = os.environ.get('TRACE_ENABLE', 'False').lower() == 'true'
+        self.root = Span(name) if self.enable else NULL_SPAN
+        self.epoch = None
+
+    def __enter__(self):
+        self.epoch = time.time()
+        self.root.__enter__()
+        return self.root
+
+    def __exit__(self, *args):
+        self.root.__exit__(*args)
+        if self.enable:
+            # Tracing must never fail the invocation, e.g. if the daemon address does not resolve
+            try:
+                export(self.root, self.epoch)
+            except (OSError, ValueError) as exception:
+                logging.warning('Unable to export trace: %s', exception)
+
+
+def export(root:Span, epoch:float) -> None:
+    """
+    Print the span tree as one JSON line, or send it to the X-Ray daemon
+    """
+    if os.environ.get('TRACE_EXPORT', 'json').lower() != 'xray':
+        print(json.dumps({'trace': root.to_dict(root.start)}, separators=(',', ':')), flush=True)
+        return
+
+    document = root.to_segment(epoch, root.start)
+    # Lambda provides the trace and facade segment ids to attach to
+    trace_header = os.environ.get('_X_AMZN_TRACE_ID', '')
+    header = dict(part.split('=', 1) for part in trace_header.split(';') if '=' in part)
+    if 'Root' in header and 'Parent' in header:
+        document.update(type='subsegment', trace_id=header['Root'], parent_id=header['Parent'])
+    else:
+        document['trace_id'] = f'1-{int(epoch):08x}-{secrets.token_hex(12)}'
+
+    host, _, port = os.environ.get('AWS_XRAY_DAEMON_ADDRESS', '127.0.0.1:2000').rpartition(':')
+    message = '{"format": "json", "version": 1}\n' + json.dumps(document, separators=(',', ':'))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(message.encode(), (host, int(port)))
@@ -0,0 +1,232 @@
+"""
+Utility functions for benchmarks: timing, allocation measurement, machine-readable
+results and a regression check against a stored baseline.
+
+Timings are normalised by a fixed calibration workload so baselines recorded on one
+machine remain comparable on faster or slower ones. Allocation peaks do not depend on
+machine speed and are compared directly.
+
+Timings vary with the load of shared machines, so CI runs benchmarks in a separate job with
+BENCHMARK_REPORT_ONLY set, reporting regressions as warnings rather than failing.
+"""
+
+import base64
+import functools
+import json
+import os
+import time
+import tracemalloc
+import urllib.parse
+import warnings
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Slowest allowed normalised time and largest allowed allocation peak, relative to baseline
+TIME_TOLERANCE = float(os.environ.get('BENCHMARK_TIME_TOLERANCE', '2'))
+MEMORY_TOLERANCE = float(os.environ.get('BENCHMARK_MEMORY_TOLERANCE', '1.5'))
+# Allocation peaks of small payloads vary by a few interpreter-internal blocks
+MEMORY_SLACK = 4096
+# Warn about regressions instead of failing
+REPORT_ONLY = os.environ.get('BENCHMARK_REPORT_ONLY', 'False').lower() == 'true'
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'form': 'application/x-www-form-urlencoded',
+}
+
+
+def encode(fields:dict, body_format:str) -> str:
+    """
+    Encode fields as a JSON or URL encoded body
+    """
+    if body_format == 'json':
+        return json.dumps(fields)
+    return urllib.parse.urlencode(fields)
+
+
+def sized_fields(size:int) -> dict:
+    """
+    Typical contact form fields with the message padded to about size bytes once encoded
+    """
+    fields = {
+        'name': 'First Last',
+        'email': 'a@b.c',
+        'subject': 'My Subject',
+        'message': '',
+    }
+    fields['message'] = 'x' * max(size - len(encode(fields, 'json')), 0)
+    return fields
+
+
+def many_fields(count:int) -> dict:
+    """
+    Form with many short fields
+    """
+    return {f'field{index}': f'value {index}' for index in range(count)}
+
+
+def build_event(version:str, fields:dict, body_format:str, base64_encoded:bool) -> dict:
+    """
+    API Gateway proxy event carrying the encoded fields
+    """
+    body = encode(fields, body_format)
+    if base64_encoded:
+        body = base64.b64encode(body.encode()).decode()
+
+    event = {
+        'version': version,
+        'headers': {
+            'Content-Type': CONTENT_TYPES[body_format],
+            'User-Agent': 'benchmark',
+        },
+        'body': body,
+        'isBase64Encoded': base64_encoded,
+    }
+    if version == '1.0':
+        event['requestContext'] = {'identity': {'sourceIp': '127.0.0.1'}}
+    else:
+        event['requestContext'] = {'http': {'method': 'POST', 'sourceIp': '127.0.0.1'}}
+
+    return event
+
+
+def best_of(function, repeat=5, min_seconds=0.02):
+    """
+    Best average time in seconds of a function over several runs,
+    each run calling it enough times to last at least min_seconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        number *= 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+def peak_allocation(function):
+    """
+    Peak bytes allocated by a single call of a function
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    return max(peak - baseline, 0)
+
+
+@functools.lru_cache(maxsize=None)
+def calibration_seconds():
+    """
+    Time of a fixed decoding workload, used as the unit of normalised timings
+    """
+    document = {f'field{index}': f'value {index} ' * 4 for index in range(50)}
+    encoded_json = json.dumps(document)
+    encoded_form = urllib.parse.urlencode(document)
+
+    def workload():
+        json.loads(encoded_json)
+        urllib.parse.parse_qsl(encoded_form)
+
+    return best_of(workload)
+
+
+def measure(function, size:int = None) -> dict:
+    """
+    Throughput, normalised time and allocation peak of a function
+    """
+    seconds = best_of(function)
+    result = {
+        'seconds': seconds,
+        'opsPerSecond': round(1 / seconds, 1),
+        'normalised': round(seconds / calibration_seconds(), 4),
+        'peakBytes': peak_allocation(function),
+    }
+    if size is not None:
+        result['bytes'] = size
+        result['megabytesPerSecond'] = round(size / seconds / 1e6, 3)
+
+    return result
+
+
+def load_baseline(path:str = BASELINE_PATH) -> dict:
+    """
+    Stored baseline results by benchmark name, empty if none recorded
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def write_results(results:dict, path:str) -> None:
+    """
+    Write results as a JSON document keyed by benchmark name
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(dict(sorted(results.items())), file, indent=2)
+        file.write('\n')
+
+
+def regressions(name:str, result:dict, baseline:dict) -> list:
+    """
+    Descriptions of how a result regressed against its baseline, empty if it did not
+    """
+    expected = baseline.get(name)
+    if expected is None:
+        return []
+
+    found = []
+    if result['normalised'] > expected['normalised'] * TIME_TOLERANCE:
+        found.append(
+            f'{name}: normalised time {result["normalised"]} exceeds baseline '
+            f'{expected["normalised"]} by more than {TIME_TOLERANCE}x'
+        )
+    if result['peakBytes'] > expected['peakBytes'] * MEMORY_TOLERANCE + MEMORY_SLACK:
+        found.append(
+            f'{name}: peak allocation {result["peakBytes"]} bytes exceeds baseline '
+            f'{expected["peakBytes"]} by more than {MEMORY_TOLERANCE}x'
+        )
+
+    return found
+
+
+def not_faster(name:str, seconds:float, reference:float) -> list:
+    """
+    Description of a timing that is not faster than its reference, empty if it is
+    """
+    if seconds < reference:
+        return []
+
+    return [f'{name}: {seconds * 1000:.3f} ms is not faster than {reference * 1000:.3f} ms']
+
+
+def expect(found:list) -> None:
+    """
+    Fail on the regressions found, or only report them with BENCHMARK_REPORT_ONLY
+    """
+    if REPORT_ONLY:
+        for description in found:
+            warnings.warn(description)
+        return
+
+    assert not found, found
@@ -0,0 +1,53 @@
+"""
+URL encoded form decoder benchmark on large forms.
+Compares the single-pass bytes decoder with the previous path, unquoting the whole
+body and then parsing it with urllib.parse.parse_qsl.
+Run with:
+    python -m pytest -s tests/benchmark/test_form.py
+"""
+
+import urllib.parse
+
+import pytest
+from app_handler.utils.form import decode_form
+from tests.benchmark.benchmark_utils import (
+    best_of,
+    expect,
+    many_fields,
+    not_faster,
+    sized_fields,
+)
+
+FORMS = {
+    'fields10000': many_fields(10000),
+    'message1mb': sized_fields(1024 * 1024),
+    # Every character of the message needs percent-decoding
+    'encoded100kb': {'message': 'é&=' * (100 * 1024 // 12)},
+}
+
+
+def previous(body:str) -> dict:
+    """
+    Decoding path replaced by decode_form
+    """
+    return dict(urllib.parse.parse_qsl(urllib.parse.unquote(body)))
+
+
+@pytest.mark.parametrize('name', FORMS)
+def test_form(name):
+    """
+    Single-pass decoding should be faster than unquoting and parsing separately
+    """
+    body = urllib.parse.urlencode(FORMS[name])
+    data = body.encode()
+    assert decode_form(data, max_fields=len(FORMS[name])) == FORMS[name]
+
+    single_pass = best_of(lambda: decode_form(data, max_fields=len(FORMS[name])))
+    two_pass = best_of(lambda: previous(body))
+
+    print(
+        f'\n{name}, {len(body)} bytes: '
+        f'single-pass {single_pass * 1000:.3f} ms, '
+        f'unquote and parse_qsl {two_pass * 1000:.3f} ms'
+    )
+    expect(not_faster(f'single-pass, {name}', single_pass, two_pass))
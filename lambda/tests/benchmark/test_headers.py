@@ -0,0 +1,59 @@
+"""
+Header lookup benchmark on large header sets.
+Compares the case-insensitive view with the previous path, copying every header with
+its name and value lowercased to read the content type, then scanning every header to
+read one with its original value.
+Run with:
+    python -m pytest -s tests/benchmark/test_headers.py
+"""
+
+import pytest
+from app_handler.utils.headers import Headers
+from tests.benchmark.benchmark_utils import best_of, expect, not_faster
+
+HEADERS = {
+    'headers10': 10,
+    'headers100': 100,
+}
+
+
+def previous(headers:dict):
+    """
+    Lookup path replaced by Headers
+    """
+    headers_lower = {}
+    for key, value in headers.items():
+        if isinstance(key, str) and isinstance(value, str):
+            headers_lower[key.lower()] = value.lower()
+
+    idempotency_key = None
+    for key, value in headers.items():
+        if isinstance(key, str) and key.lower() == 'idempotency-key':
+            idempotency_key = value
+            break
+
+    return headers_lower.get('content-type'), idempotency_key
+
+
+@pytest.mark.parametrize('name', HEADERS)
+def test_headers(name):
+    """
+    Reading the content type and an idempotency key through the view should be faster
+    than lowercasing and scanning every header
+    """
+    headers = {f'X-Custom-Header-{index}': f'Value-{index}' for index in range(HEADERS[name])}
+    headers['Content-Type'] = 'application/json'
+    headers['Idempotency-Key'] = 'AbC'
+
+    def lookup():
+        view = Headers(headers)
+        return view.get('content-type'), view.get('Idempotency-Key')
+
+    assert lookup() == ('application/json', 'AbC')
+    assert previous(headers) == ('application/json', 'AbC')
+
+    view = best_of(lookup)
+    copy = best_of(lambda: previous(headers))
+
+    print(f'\n{name}: view {view * 1e6:.2f} µs, lowercased copy and scan {copy * 1e6:.2f} µs')
+    expect(not_faster(f'view, {name}', view, copy))
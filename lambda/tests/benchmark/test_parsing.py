@@ -0,0 +1,128 @@
+"""
+Request parsing and response building benchmarks across event shapes.
+Covers API Gateway v1 and v2 events, plain and base64 encoded JSON and URL encoded
+bodies from 100 B to 1 MB, and forms with many fields.
+
+Each benchmark is compared to tests/benchmark/baseline.json and fails on regression,
+or only warns with BENCHMARK_REPORT_ONLY set.
+Run with:
+    python -m pytest -s tests/benchmark/test_parsing.py
+Write machine-readable results with:
+    BENCHMARK_OUTPUT=benchmark.json python -m pytest tests/benchmark/test_parsing.py
+Record a new baseline with:
+    BENCHMARK_UPDATE_BASELINE=true python -m pytest tests/benchmark/test_parsing.py
+"""
+
+import os
+
+import pytest
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from tests.benchmark.benchmark_utils import (
+    BASELINE_PATH,
+    CONTENT_TYPES,
+    build_event,
+    expect,
+    load_baseline,
+    many_fields,
+    measure,
+    regressions,
+    sized_fields,
+    write_results,
+)
+
+SIZES = {
+    '100b': 100,
+    '10kb': 10 * 1024,
+    '100kb': 100 * 1024,
+    '1mb': 1024 * 1024,
+}
+MANY_FIELDS = 1000
+
+RESULTS = {}
+BASELINE = load_baseline()
+
+
+def request_cases():
+    """
+    Names and events of every request benchmark
+    """
+    for version in ('1.0', '2.0'):
+        api = f'v{version[0]}'
+        for body_format in CONTENT_TYPES:
+            for base64_encoded in (False, True):
+                encoding = 'base64' if base64_encoded else 'plain'
+                for size_name, size in SIZES.items():
+                    fields = sized_fields(size)
+                    yield (
+                        f'request.{api}.{body_format}.{encoding}.{size_name}',
+                        build_event(version, fields, body_format, base64_encoded),
+                    )
+                yield (
+                    f'request.{api}.{body_format}.{encoding}.fields{MANY_FIELDS}',
+                    build_event(version, many_fields(MANY_FIELDS), body_format, base64_encoded),
+                )
+
+
+REQUEST_CASES = dict(request_cases())
+
+RESPONSE_CASES = {
+    'response.direct': 'test',
+    'response.v1': {'version': '1.0'},
+    'response.v2': {'version': '2.0'},
+}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def results():
+    """
+    Write collected results, and the baseline if requested, once all benchmarks ran
+    """
+    yield RESULTS
+
+    if os.environ.get('BENCHMARK_OUTPUT'):
+        write_results(RESULTS, os.environ['BENCHMARK_OUTPUT'])
+
+    if os.environ.get('BENCHMARK_UPDATE_BASELINE', 'False').lower() == 'true':
+        write_results(
+            {
+                name: {'normalised': result['normalised'], 'peakBytes': result['peakBytes']}
+                for name, result in RESULTS.items()
+            },
+            BASELINE_PATH,
+        )
+
+
+def check(name:str, result:dict) -> None:
+    """
+    Record a result and check it did not regress against the baseline
+    """
+    RESULTS[name] = result
+    print(
+        f'\n{name}: {result["opsPerSecond"]} ops/s, '
+        f'normalised {result["normalised"]}, peak {result["peakBytes"]} bytes'
+    )
+    expect(regressions(name, result, BASELINE))
+
+
+@pytest.mark.parametrize('name', REQUEST_CASES)
+def test_request(name):
+    """
+    Parsing throughput and allocations per event shape
+    """
+    event = REQUEST_CASES[name]
+    request = RequestProvider(event)
+    assert not request.has_error
+    assert isinstance(request.content, dict)
+
+    check(name, measure(lambda: RequestProvider(event), len(event['body'])))
+
+
+@pytest.mark.parametrize('name', RESPONSE_CASES)
+def test_response(name):
+    """
+    Response building throughput and allocations per API type
+    """
+    event = RESPONSE_CASES[name]
+
+    check(name, measure(lambda: ResponseProvider(event).message('Message received')))
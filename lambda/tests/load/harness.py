@@ -0,0 +1,352 @@
+"""
+End-to-end load-test harness driving app.handler with generated API Gateway events.
+Every backend is a local stand-in: a local HTTP server answers as hCaptcha, Discord and
+Slack with configurable latency and error injection, and moto serves SES, DynamoDB,
+SSM Parameter Store and Secrets Manager, as a moto server when moto[server] is installed
+and in-process otherwise.
+
+Requests are sent from a pool of threads in one process, so concurrency measures
+contention on shared state, pooled connections and backends rather than Lambda scaling.
+Each Lambda container runs one invocation at a time with its own background pool, so
+the shared pool is sized to give every concurrent invocation as many workers.
+Reports throughput and p50/p95/p99 latencies per stage and downstream host as JSON.
+Run with:
+    python -m tests.load.harness --requests 2000 --concurrency 8 --latency-ms 20
+"""
+
+import argparse
+import collections
+import contextlib
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb, mock_secretsmanager, mock_ses, mock_ssm
+
+from app import handler
+from app_handler.service import aws
+from app_handler.service.http_pool import POOL, RESOLVED
+from app_handler.utils import executor as background
+from app_handler.utils.histogram import HISTOGRAMS, Histogram
+from tests.benchmark.benchmark_utils import build_event, sized_fields
+from tests.unit.service import aws_utils
+from tests.unit.service.http_utils import StandinServer
+
+PERCENTILES = (50, 95, 99)
+
+# Backend resource names shared by the environment and the seeded resources
+SENDER = 'sender@example.com'
+TABLE = 'load-test'
+HCAPTCHA_SECRET_NAME = '/load/hcaptcha/secret'
+RESPONSE_FIELD = 'h-captcha-response'
+
+
+def summarise(histogram:Histogram) -> dict:
+    """
+    Sample count and percentiles in milliseconds
+    """
+    summary = {'count': histogram.total}
+    for percent in PERCENTILES:
+        summary[f'p{percent}'] = round(histogram.percentile(percent) * 1e3, 3)
+    summary['max'] = round(histogram.max_value / 1e3, 3)
+    return summary
+
+
+def standin_respond(body:str, latency:float, error_rate:float, seed:int = 0):
+    """
+    Stand-in respond function answering with body after latency seconds,
+    or with a 500 error for a random error_rate fraction of requests
+    """
+    generator = random.Random(seed)
+    lock = threading.Lock()
+
+    def respond(index, request_body):  # pylint: disable=unused-argument
+        with lock:
+            failed = generator.random() < error_rate
+        if failed:
+            return 500, '{"error": "injected"}', latency, True
+        return 200, body, latency, True
+
+    return respond
+
+
+def free_port() -> int:
+    """
+    Port the operating system considers free on the loopback interface
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def aws_backend():
+    """
+    Run AWS stand-ins, yielding the moto server URL or None when mocked in-process
+    """
+    try:
+        with warnings.catch_warnings():
+            # moto warns on import when its server dependencies are missing
+            warnings.simplefilter('ignore')
+            from moto.server import ThreadedMotoServer  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        ThreadedMotoServer = None  # pylint: disable=invalid-name
+
+    if ThreadedMotoServer is None:
+        mocks = [mock_dynamodb(), mock_secretsmanager(), mock_ses(), mock_ssm()]
+        for backend in mocks:
+            backend.start()
+        try:
+            yield None
+        finally:
+            for backend in reversed(mocks):
+                backend.stop()
+        return
+
+    port = free_port()
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    try:
+        with aws_endpoint(f'http://127.0.0.1:{port}') as url:
+            yield url
+    finally:
+        server.stop()
+
+
+@contextlib.contextmanager
+def aws_endpoint(url:str):
+    """
+    Send every boto3 client and resource created without an endpoint to url, including
+    those of the config fetcher. AWS_ENDPOINT_URL is only honoured from boto3 1.28.
+    """
+    client = boto3.session.Session.client
+    resource = boto3.session.Session.resource
+
+    def patched(create):
+        def create_with_endpoint(session, *args, **kwargs):
+            kwargs['endpoint_url'] = kwargs.get('endpoint_url') or url
+            return create(session, *args, **kwargs)
+        return create_with_endpoint
+
+    with mock.patch.object(boto3.session.Session, 'client', patched(client)), \
+            mock.patch.object(boto3.session.Session, 'resource', patched(resource)):
+        yield url
+
+
+def seed_aws() -> None:
+    """
+    Create the AWS resources used by the enabled runners
+    """
+    aws_utils.put_secretsmanager_secret(HCAPTCHA_SECRET_NAME, 'secret')
+    aws_utils.ses_verify_email_identity(SENDER)
+    aws_utils.create_dynamodb_table(TABLE)
+
+
+def environment(standin_url:str) -> dict:
+    """
+    Environment enabling every runner against the local stand-ins
+    """
+    env = {
+        'AWS_DEFAULT_REGION': 'eu-west-2',
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'REQUIRED_FIELDS': 'name,email,subject,message',
+        'HCAPTCHA_ENABLE': 'true',
+        'HCAPTCHA_SITEKEY': 'sitekey',
+        'HCAPTCHA_SECRET_SOURCE': 'aws_secrets_manager',
+        'HCAPTCHA_SECRET_SECRETS_MANAGER_NAME': HCAPTCHA_SECRET_NAME,
+        'HCAPTCHA_RESPONSE_FIELD': RESPONSE_FIELD,
+        'HCAPTCHA_VERIFY_URL': f'{standin_url}/siteverify',
+        'DISCORD_ENABLE': 'true',
+        'DISCORD_WEBHOOK_URL': f'{standin_url}/discord',
+        'DISCORD_JSON_TEMPLATE': '{"content": "${subject}"}',
+        'SLACK_ENABLE': 'true',
+        'SLACK_WEBHOOK_URL': f'{standin_url}/slack',
+        'SLACK_JSON_TEMPLATE': '{"text": "${subject}"}',
+        'EMAIL_ENABLE': 'true',
+        'EMAIL_SENDER': SENDER,
+        'EMAIL_RECIPIENTS': 'recipient@example.com',
+        'EMAIL_SUBJECT_TEMPLATE': '${subject}',
+        'EMAIL_TEXT_TEMPLATE': '${message}',
+        'DYNAMODB_ENABLE': 'true',
+        'DYNAMODB_TABLE': TABLE,
+        'HISTOGRAM_ENABLE': 'true',
+        # Never flush, so every sample is kept until the report is taken
+        'HISTOGRAM_FLUSH_INVOCATIONS': str(sys.maxsize),
+        'HISTOGRAM_FLUSH_SECONDS': 'inf',
+    }
+
+    return env
+
+
+def generate_events(count:int, size:int, seed:int = 0) -> list:
+    """
+    Mix of API Gateway v1 and v2 events with JSON and URL encoded bodies
+    """
+    generator = random.Random(seed)
+    events = []
+    for index in range(count):
+        fields = sized_fields(size)
+        fields['subject'] = f'Subject {index}'
+        fields[RESPONSE_FIELD] = f'token-{index}'
+        events.append(build_event(
+            generator.choice(('1.0', '2.0')),
+            fields,
+            generator.choice(('json', 'form')),
+            generator.random() < 0.5,
+        ))
+
+    return events
+
+
+@contextlib.contextmanager
+def patched_environ(env:dict):
+    """
+    Temporarily set environment variables
+    """
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextlib.contextmanager
+def standins(respond):
+    """
+    Run HTTP and AWS stand-ins with every runner configured to use them,
+    yielding the HTTP stand-in server
+    """
+    standin = StandinServer(respond)
+    try:
+        with aws_backend(), patched_environ(environment(standin.url)):
+            # Clients and connections must follow the stand-ins of this run
+            aws.CLIENTS.clear()
+            POOL.clear()
+            RESOLVED.clear()
+            seed_aws()
+            HISTOGRAMS.clear()
+            yield standin
+    finally:
+        standin.close()
+        aws.CLIENTS.clear()
+        POOL.clear()
+        HISTOGRAMS.clear()
+
+
+def invoke(event) -> int:
+    """
+    Invoke the handler, recording its latency, and return the response status
+    """
+    start = time.perf_counter()
+    response = handler(event, None)
+    HISTOGRAMS.record('handler', time.perf_counter() - start)
+    return response['statusCode']
+
+
+def drive(events:list, concurrency:int, delays:list = None) -> dict:
+    """
+    Invoke the handler with each event from a pool of threads and report latencies.
+    With delays, each event is sent no earlier than its delay in seconds after the start,
+    so arrivals follow a fixed rate or a captured profile rather than waiting on responses.
+    """
+    HISTOGRAMS.clear()
+    workers = background.WORKERS * concurrency
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='app-handler')
+    start = time.perf_counter()
+    with pool, mock.patch.object(background, 'EXECUTOR', pool), \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if delays is None:
+            statuses = collections.Counter(executor.map(invoke, events))
+        else:
+            futures = []
+            for event, delay in zip(events, delays):
+                time.sleep(max(start + delay - time.perf_counter(), 0))
+                futures.append(executor.submit(invoke, event))
+            statuses = collections.Counter(future.result() for future in futures)
+    seconds = time.perf_counter() - start
+
+    # Histograms since the last flush hold every sample, flushing is disabled for the run
+    stages = {name: summarise(histogram) for name, histogram in sorted(HISTOGRAMS.current.items())}
+    return {
+        'requests': len(events),
+        'concurrency': concurrency,
+        'backgroundWorkers': workers,
+        'seconds': round(seconds, 3),
+        'requestsPerSecond': round(len(events) / seconds, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'handler': stages.pop('handler'),
+        'stages': stages,
+    }
+
+
+def write_report(report:dict, output:str = None) -> None:
+    """
+    Print the JSON report, also writing it to output if given
+    """
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+
+def run(*, requests:int = 1000, concurrency:int = 8, size:int = 500, seed:int = 0,
+        respond=None) -> dict:
+    """
+    Send generated requests through app.handler and report latencies.
+    Stand-ins answer with respond, by default successfully and without delay.
+    """
+    events = generate_events(requests, size, seed)
+    if respond is None:
+        respond = standin_respond('{"success": true}', 0.0, 0.0, seed)
+    with standins(respond):
+        return drive(events, concurrency)
+
+
+def main(arguments:list = None) -> dict:
+    """
+    Parse command line arguments, run the load test and print the JSON report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='stand-in HTTP backend response latency')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of stand-in HTTP backend responses that are 500 errors')
+    parser.add_argument('--size', type=int, default=500, help='approximate body size in bytes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the report to this file')
+    parser.add_argument('--log-level', default='ERROR')
+    options = parser.parse_args(arguments)
+    logging.getLogger().setLevel(options.log_level)
+
+    report = run(
+        requests=options.requests,
+        concurrency=options.concurrency,
+        size=options.size,
+        seed=options.seed,
+        respond=standin_respond(
+            '{"success": true}', options.latency_ms / 1e3, options.error_rate, options.seed
+        ),
+    )
+    write_report(report, options.output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
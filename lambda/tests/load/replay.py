@@ -0,0 +1,126 @@
+"""
+Replay a captured event corpus through app.handler against the load-test stand-ins.
+Corpora are the gzip compressed NDJSON files written by app_handler.utils.capture,
+copied locally from /tmp or S3, e.g. with aws s3 cp --recursive.
+
+Events are sent at a fixed rate, as fast as the handler allows, or with their captured
+inter-arrival times scaled by a speed-up factor, to reproduce production latency
+profiles offline. Reports latencies as the load-test harness does, alongside the status
+mix seen in production.
+Run with:
+    python -m tests.load.replay corpus/ --speed 10 --concurrency 8
+"""
+
+import argparse
+import collections
+import gzip
+import json
+import logging
+import os
+
+from tests.load.harness import (
+    RESPONSE_FIELD, drive, patched_environ, standin_respond, standins, write_report,
+)
+
+
+def corpus_paths(paths:list) -> list:
+    """
+    Corpus files, expanding directories to the .ndjson.gz files they contain
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith('.ndjson.gz')
+            )
+        else:
+            found.append(path)
+
+    return found
+
+
+def read_corpus(paths:list) -> list:
+    """
+    Captured records of all corpus files, ordered by capture time
+    """
+    records = []
+    for path in corpus_paths(paths):
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            records.extend(json.loads(line) for line in file if line.strip())
+
+    return sorted(records, key=lambda record: record['time'])
+
+
+def schedule(records:list, rate:float = 0.0, speed:float = 0.0):
+    """
+    Seconds after the start to send each record, None to send as fast as possible.
+    Speed follows captured inter-arrival times, rate spaces records evenly.
+    """
+    if speed:
+        first = records[0]['time']
+        return [(record['time'] - first) / speed for record in records]
+    if rate:
+        return [index / rate for index in range(len(records))]
+
+    return None
+
+
+def replay(records:list, *, concurrency:int = 8, delays:list = None, latency:float = 0.0,
+           overrides:dict = None) -> dict:
+    """
+    Send captured events through app.handler, each no earlier than its delay from
+    schedule() if given, and report latencies and status mixes.
+    Overrides are applied to the stand-in environment, e.g. to match production field names.
+    """
+    with standins(standin_respond('{"success": true}', latency, 0.0)), \
+            patched_environ(overrides or {}):
+        report = drive([record['event'] for record in records], concurrency, delays)
+
+    captured = collections.Counter(str(record['status']) for record in records)
+    report['capturedStatuses'] = dict(sorted(captured.items()))
+    return report
+
+
+def main(arguments:list = None) -> dict:
+    """
+    Parse command line arguments, replay the corpus and print the JSON report
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('paths', nargs='+', help='corpus files or directories')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='events per second, 0 to send as fast as possible')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='follow captured arrival times sped up by this factor')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='stand-in HTTP backend response latency')
+    parser.add_argument('--required-fields',
+                        help='fields required of replayed events and used by templates, '
+                             'as REQUIRED_FIELDS')
+    parser.add_argument('--captcha-field', default=RESPONSE_FIELD,
+                        help='captcha response field of replayed events')
+    parser.add_argument('--output', help='also write the report to this file')
+    parser.add_argument('--log-level', default='ERROR')
+    options = parser.parse_args(arguments)
+    logging.getLogger().setLevel(options.log_level)
+
+    overrides = {'HCAPTCHA_RESPONSE_FIELD': options.captcha_field}
+    if options.required_fields is not None:
+        overrides['REQUIRED_FIELDS'] = options.required_fields
+
+    records = read_corpus(options.paths)
+    report = replay(
+        records,
+        concurrency=options.concurrency,
+        delays=schedule(records, options.rate, options.speed),
+        latency=options.latency_ms / 1e3,
+        overrides=overrides,
+    )
+    write_report(report, options.output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Warm-container soak test running many invocations through one reused pipeline.
+A single configured AppProvider handles every event against the load-test stand-ins,
+as a long-lived warm container would if runners were kept between invocations.
+
+Every response and every downstream request is checked against the event that caused
+it, so state carried over from a previous request is reported as cross-request bleed.
+Some events fail on purpose, by an injected webhook error or a missing field, to check
+failures do not leak into later requests. Resident memory is sampled from the end of
+warm-up, and allocations made by app_handler are traced over the final invocations,
+where anything still held at the end is growth. Tracing slows invocations several
+times, so only that window is traced.
+Run with:
+    python -m tests.load.soak --invocations 20000
+"""
+
+import argparse
+import json
+import linecache
+import logging
+import os
+import re
+import resource
+import sys
+import tracemalloc
+
+from app_handler.provider.app import AppProvider
+from tests.benchmark.benchmark_utils import build_event
+from tests.load.harness import RESPONSE_FIELD, standins
+
+# Webhook requests containing this are answered with a 500 error
+FAIL_MARKER = 'inject-failure'
+
+# Markers of the event each request or item was made for
+MARKER = re.compile(rb'x(\d+)x')
+
+# Only allocations made by the handler package count towards traced growth
+TRACE_FILTERS = [tracemalloc.Filter(True, f'*{os.sep}app_handler{os.sep}*')]
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size, or the peak where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm', encoding='utf-8') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def respond(index, body):  # pylint: disable=unused-argument
+    """
+    Stand-in answering as hCaptcha and webhooks, failing requests carrying FAIL_MARKER
+    """
+    if FAIL_MARKER.encode() in body:
+        return 500, '{"error": "injected"}', 0, True
+    return 200, '{"success": true}', 0, True
+
+
+def soak_event(index:int, fail_every:int, missing_every:int):
+    """
+    Event marked with its index, and the expected status code
+    """
+    marker = f'x{index}x'
+    fields = {
+        'name': f'Name {marker}',
+        'email': f'{marker}@example.com',
+        'subject': f'Subject {marker}',
+        'message': f'Message {marker}',
+        RESPONSE_FIELD: f'token{marker}',
+    }
+    status = 200
+    if fail_every and index % fail_every == 0:
+        fields['subject'] += f' {FAIL_MARKER}'
+        status = 500
+    elif missing_every and index % missing_every == 0:
+        del fields['message']
+        status = 400
+
+    version = '1.0' if index % 2 else '2.0'
+    body_format = 'json' if index % 3 else 'form'
+    return build_event(version, fields, body_format, index % 5 == 0), status
+
+
+def bleed(provider:AppProvider, index:int, status:int, requests:list) -> list:
+    """
+    Downstream requests and sent content not belonging to the current event
+    """
+    found = []
+    for body in requests:
+        # Validation cancelled for a rejected event may cut its request off before the body
+        if not body:
+            continue
+        indexes = {int(value) for value in MARKER.findall(body)}
+        if indexes != {index}:
+            found.append(f'downstream request {body[:80]!r}')
+
+    if status == 200:
+        marker = f'x{index}x'
+        email = provider.runners['email']
+        if marker not in email.subject:
+            found.append(f'email subject {email.subject!r}')
+        dynamodb = provider.runners['dynamodb']
+        if marker not in dynamodb.values['subject']:
+            found.append(f'dynamodb values {dynamodb.values!r}')
+
+    return found
+
+
+def growth(start, end) -> dict:
+    """
+    Traced bytes gained between two snapshots, with the largest growing lines
+    """
+    differences = end.compare_to(start, 'lineno')
+    top = []
+    for difference in differences[:10]:
+        if difference.size_diff <= 0:
+            break
+        frame = difference.traceback[0]
+        top.append({
+            'line': f'{frame.filename}:{frame.lineno}',
+            'code': linecache.getline(frame.filename, frame.lineno).strip(),
+            'sizeKb': round(difference.size_diff / 1024, 1),
+            'count': difference.count_diff,
+        })
+
+    return {
+        'sizeKb': round(sum(item.size_diff for item in differences) / 1024, 1),
+        'top': top,
+    }
+
+
+def check(provider:AppProvider, standin, index:int, event, expected:int) -> list:
+    """
+    Handle one event, returning errors for an unexpected status or cross-request bleed
+    """
+    errors = []
+    sent = len(standin.requests)
+    status = provider.handle(event)['statusCode']
+    if expected == 400:
+        # Validation cancelled by the rejection may have sent its request
+        standin.settle()
+    if status != expected:
+        errors.append(f'invocation {index}: status {status}, expected {expected}')
+    for found in bleed(provider, index, status, standin.requests[sent:]):
+        errors.append(f'invocation {index}: {found}')
+
+    return errors
+
+
+def run(*, invocations:int = 20000, warmup:int = 1000, traced:int = 1000,
+        fail_every:int = 97, missing_every:int = 89) -> dict:
+    """
+    Handle invocations events with one provider, reporting errors, bleed and memory growth
+    """
+    errors = []
+    rss = []
+    trace_from = max(invocations - traced, warmup)
+    started_tracing = False
+
+    start = None
+
+    try:
+        with standins(respond) as standin:
+            provider = AppProvider(None, process=False)
+
+            for index in range(invocations):
+                if index >= warmup and (index - warmup) % max(invocations // 10, 1) == 0:
+                    rss.append(rss_bytes())
+                if index == trace_from:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        started_tracing = True
+                    start = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+
+                case = soak_event(index, fail_every, missing_every)
+                errors.extend(check(provider, standin, index, *case))
+
+            end = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+            rss.append(rss_bytes())
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return {
+        'invocations': invocations,
+        'warmup': warmup,
+        'traced': invocations - trace_from,
+        'errors': len(errors),
+        'firstErrors': errors[:10],
+        'rssMb': [round(value / 2**20, 1) for value in rss],
+        'rssGrowthMb': round((rss[-1] - rss[0]) / 2**20, 1),
+        'tracedGrowth': growth(start, end),
+    }
+
+
+def failures(report:dict, max_rss_growth_mb:float, max_traced_growth_kb:float) -> list:
+    """
+    Reasons the soak test failed, empty if it passed
+    """
+    found = []
+    if report['errors']:
+        found.append(f'{report["errors"]} incorrect responses or cross-request bleed')
+    if report['rssGrowthMb'] > max_rss_growth_mb:
+        found.append(f'resident memory grew {report["rssGrowthMb"]} MB after warm-up')
+    if report['tracedGrowth']['sizeKb'] > max_traced_growth_kb:
+        found.append(f'app_handler allocations grew {report["tracedGrowth"]["sizeKb"]} KB')
+
+    return found
+
+
+def main(arguments:list = None) -> dict:
+    """
+    Parse command line arguments, run the soak test, print the JSON report and
+    exit with an error status if it failed
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--invocations', type=int, default=20000)
+    parser.add_argument('--warmup', type=int, default=1000)
+    parser.add_argument('--traced', type=int, default=1000,
+                        help='trace allocations over this many final invocations')
+    parser.add_argument('--fail-every', type=int, default=97,
+                        help='inject a webhook error every N invocations, 0 to disable')
+    parser.add_argument('--missing-every', type=int, default=89,
+                        help='omit a required field every N invocations, 0 to disable')
+    # The in-process AWS stand-ins keep every email and item, so resident memory grows slowly
+    parser.add_argument('--max-rss-growth-mb', type=float, default=64.0)
+    parser.add_argument('--max-traced-growth-kb', type=float, default=256.0)
+    parser.add_argument('--log-level', default='CRITICAL')
+    options = parser.parse_args(arguments)
+    logging.getLogger().setLevel(options.log_level)
+
+    report = run(
+        invocations=options.invocations,
+        warmup=options.warmup,
+        traced=options.traced,
+        fail_every=options.fail_every,
+        missing_every=options.missing_every,
+    )
+    report['failures'] = failures(
+        report, options.max_rss_growth_mb, options.max_traced_growth_kb
+    )
+    print(json.dumps(report, indent=2))
+    if report['failures']:
+        sys.exit(1)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
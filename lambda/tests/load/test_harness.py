@@ -0,0 +1,47 @@
+"""
+Load-test harness smoke tests, run at low volume
+"""
+
+import boto3
+
+from tests.load.harness import aws_endpoint, main, run
+
+
+def test_load():
+    """
+    All generated requests should succeed against healthy stand-ins, with every stage reported
+    """
+    report = run(requests=40, concurrency=4)
+    assert report['statuses'] == {'200': 40}
+    assert report['backgroundWorkers'] == 16
+    assert report['handler']['count'] == 40
+    for stage in ('parse', 'hcaptcha', 'discord', 'dynamodb', 'email', 'slack', 'total'):
+        assert report['stages'][f'stage.{stage}']['count'] == 40
+    assert any(name.startswith('http.127.0.0.1') for name in report['stages'])
+    assert report['handler']['p50'] <= report['handler']['p99']
+
+
+def test_error_injection(tmp_path):
+    """
+    Injected backend errors should fail requests, and the report is written as JSON
+    """
+    output = tmp_path / 'report.json'
+    report = main(['--requests', '10', '--error-rate', '1', '--output', str(output)])
+    assert '200' not in report['statuses']
+    assert output.read_text(encoding='utf-8').startswith('{')
+
+
+def test_aws_endpoint():
+    """
+    Clients and resources without an endpoint should be sent to the AWS stand-in
+    """
+    with aws_endpoint('http://127.0.0.1:5000'):
+        assert boto3.client('ses', region_name='eu-west-2').meta.endpoint_url == \
+            'http://127.0.0.1:5000'
+        resource = boto3.resource('dynamodb', region_name='eu-west-2', endpoint_url=None)
+        assert resource.meta.client.meta.endpoint_url == 'http://127.0.0.1:5000'
+        client = boto3.client('ssm', region_name='eu-west-2', endpoint_url='http://other:1')
+        assert client.meta.endpoint_url == 'http://other:1'
+
+    assert boto3.client('ses', region_name='eu-west-2').meta.endpoint_url != \
+        'http://127.0.0.1:5000'
@@ -0,0 +1,41 @@
+"""
+Corpus replay smoke tests, run at low volume
+"""
+
+from app_handler.utils import capture
+from tests.load.harness import generate_events
+from tests.load.replay import main, read_corpus, schedule
+
+
+def test_replay(monkeypatch, tmp_path):
+    """
+    Captured events should replay through the handler, reporting captured and replayed statuses
+    """
+    monkeypatch.setattr(capture, 'BUFFER', [])
+    monkeypatch.setenv('CAPTURE_ENABLE', 'true')
+    monkeypatch.setenv('CAPTURE_SAMPLE_RATE', '1')
+    monkeypatch.setenv('CAPTURE_BATCH_SIZE', '5')
+    monkeypatch.setenv('CAPTURE_DIR', str(tmp_path))
+    for event in generate_events(20, 200):
+        capture.capture(event, {'statusCode': 200})
+    monkeypatch.delenv('CAPTURE_ENABLE')
+
+    output = tmp_path / 'report.json'
+    report = main([str(tmp_path), '--rate', '500', '--concurrency', '4',
+                   '--required-fields', 'name,email,subject,message', '--output', str(output)])
+    assert report['statuses'] == {'200': 20}
+    assert report['capturedStatuses'] == {'200': 20}
+    assert output.read_text(encoding='utf-8').startswith('{')
+
+    # Files can also be given directly
+    assert len(read_corpus([str(path) for path in tmp_path.glob('*.ndjson.gz')])) == 20
+
+
+def test_schedule():
+    """
+    Captured arrival times are scaled by the speed-up, rates space events evenly
+    """
+    records = [{'time': 100.0}, {'time': 101.0}, {'time': 103.0}]
+    assert schedule(records, speed=2) == [0.0, 0.5, 1.5]
+    assert schedule(records, rate=4) == [0.0, 0.25, 0.5]
+    assert schedule(records) is None
@@ -0,0 +1,40 @@
+"""
+Soak test smoke tests, run at low volume
+"""
+
+import pytest
+from tests.load.soak import bleed, failures, main, run
+
+
+def test_soak():
+    """
+    A reused pipeline should answer every event correctly, including after failures
+    """
+    report = run(invocations=300, warmup=100, traced=100, fail_every=7, missing_every=11)
+    assert report['errors'] == 0, report['firstErrors']
+    assert report['traced'] == 100
+    assert len(report['rssMb']) > 1
+    assert not failures(report, 64, 256)
+
+
+def test_bleed():
+    """
+    Requests made for another event are reported, requests cut off before their body are not
+    """
+    assert not bleed(None, 5, 400, [b'', b'{"content": "x5x"}'])
+    assert bleed(None, 5, 400, [b'secret=a&response=tokenx4x'])
+    assert bleed(None, 5, 500, [b'{"content": "Subject x4x"}'])
+    assert bleed(None, 5, 500, [b'{"content": "Subject"}'])
+
+
+def test_failures(capsys):
+    """
+    Errors and growth beyond the limits fail the soak test with an error status
+    """
+    report = {'errors': 1, 'rssGrowthMb': 10, 'tracedGrowth': {'sizeKb': 300}}
+    assert len(failures(report, 5, 256)) == 3
+
+    with pytest.raises(SystemExit):
+        main(['--invocations', '20', '--warmup', '5', '--traced', '5',
+              '--max-rss-growth-mb', '-1'])
+    assert '"failures"' in capsys.readouterr().out
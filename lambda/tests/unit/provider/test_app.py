@@ -2,11 +2,18 @@
 App provider unit tests
 """
 
+import json
 import os
+import time
 import httpretty
-from moto import mock_dynamodb, mock_ses, mock_secretsmanager, mock_ssm
+import pytest
+from moto import mock_dynamodb, mock_s3, mock_ses, mock_secretsmanager, mock_ssm
 
 from app_handler.provider.app import AppProvider
+from app_handler.service.aws import AwsService
+from app_handler.service.http_pool import POOL, RESOLVED
+from app_handler.utils.ip_index import build_index
+from app_handler.utils.signing import sign
 from tests.unit.service import aws_utils, discord_utils, hcaptcha_utils, slack_utils
 
 # Set boto/moto client default values
@@ -68,7 +75,7 @@ def test_app_error(monkeypatch):
     monkeypatch.setenv('REQUIRED_FIELDS', 'a')
     app_provider = AppProvider({'version':'1.0', 'body': {}})
     assert app_provider.response['statusCode'] == 400
-    assert app_provider.response['body'] == '{"message": "Missing required field `a`"}'
+    assert app_provider.response['body'] == '{"message":"Missing required field `a`"}'
 
 
 def test_hcaptcha_error(monkeypatch):
@@ -221,4 +228,374 @@ def test_all_success(monkeypatch):
 
     app_provider = AppProvider(PAYLOAD)
     assert app_provider.response['statusCode'] == 200
-    assert app_provider.response['body'] == '{"message": "Message received"}'
+    assert app_provider.response['body'] == '{"message":"Message received"}'
+
+
+def test_parse_error():
+    """
+    Test app provider returns parsing errors before starting any runners
+    """
+    payload = {'version': '2.0', 'headers': {'content-type': 'application/json'}, 'body': '"{'}
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 400
+    assert app_provider.response['body'] == '{"message":"Error parsing request"}'
+
+
+def test_uploaded_files_closed():
+    """
+    Test uploaded files are closed at the end of the invocation
+    """
+    payload = {
+        'version': '2.0',
+        'headers': {'content-type': 'multipart/form-data; boundary=b'},
+        'body': '--b\r\nContent-Disposition: form-data; name="f"; filename="a"\r\n\r\nx\r\n--b--',
+    }
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 200
+    assert app_provider.app_runner.request_provider.files['f'].file.closed
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_missing_field_before_hcaptcha(monkeypatch):
+    """
+    Test required field errors are returned before hCaptcha validation is started
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name, email')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_success()
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 400
+    assert app_provider.response['body'] == '{"message":"Missing required field `email`"}'
+    assert app_provider.hcaptcha_runner.hcaptcha_service is None
+    assert not httpretty.latest_requests()
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_hcaptcha_cancelled_on_error(monkeypatch):
+    """
+    Test validation in flight when processing fails does not outlive the invocation
+    """
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_success()
+
+    def fail(*args):
+        raise RuntimeError('prepare failed')
+
+    app_provider = AppProvider(None, process=False)
+    monkeypatch.setattr(app_provider.runners['discord'], 'prepare', fail)
+    with pytest.raises(RuntimeError):
+        app_provider.handle(PAYLOAD)
+    assert app_provider.hcaptcha_runner.future is None
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_hcaptcha_failure_gates_runners(monkeypatch):
+    """
+    Test prepared runners do not send anything when hCaptcha validation fails
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    monkeypatch.setenv('DISCORD_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_WEBHOOK_URL', DISCORD_WEBHOOK_URL)
+    monkeypatch.setenv('DISCORD_JSON_TEMPLATE', '{"content":"${name}"}')
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_failure()
+    discord_utils.httpretty_register_discord_webhook_success()
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 401
+    assert app_provider.runners['discord'].client is not None
+    # Only the siteverify request should have been sent
+    hosts = {request.headers['Host'] for request in httpretty.latest_requests()}
+    assert hosts == {'hcaptcha.com'}
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_hcaptcha_success_prepare_error(monkeypatch):
+    """
+    Test runner preparation errors are returned once hCaptcha validation succeeds
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    monkeypatch.setenv('DISCORD_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_WEBHOOK_URL', DISCORD_WEBHOOK_URL)
+    monkeypatch.setenv('DISCORD_JSON_TEMPLATE', '{"content":"${missing}"}')
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_success()
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 500
+    assert app_provider.response['body'] == '{"message":"Notification service error"}'
+
+
+def test_prefilter_rejects_before_hcaptcha(monkeypatch):
+    """
+    Test prefilter rejections happen before any hCaptcha call
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'true')
+    monkeypatch.setenv('PREFILTER_BLOCKED_KEYWORDS', 'multiline')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 400
+    assert app_provider.response['body'] == '{"message":"Submission rejected"}'
+    assert app_provider.hcaptcha_runner.hcaptcha_service is None
+
+
+def test_blocklist_rejects(monkeypatch, tmp_path):
+    """
+    Test blocklisted submissions are rejected once required fields are validated
+    """
+    path = tmp_path / 'blocklist.txt'
+    path.write_text('multiline\n', 'UTF-8')
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name, message')
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'true')
+    monkeypatch.setenv('BLOCKLIST_PATH', str(path))
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 400
+    assert app_provider.response['body'] == '{"message":"Submission rejected"}'
+
+
+def test_ipfilter_denies(monkeypatch, tmp_path):
+    """
+    Test requests from denied IPs are rejected before any other runner
+    """
+    path = tmp_path / 'ip_index.bin'
+    path.write_bytes(build_index([], []))
+    monkeypatch.setenv('IPFILTER_ENABLE', 'true')
+    monkeypatch.setenv('IPFILTER_INDEX_PATH', str(path))
+    monkeypatch.setenv('IPFILTER_DEFAULT_ACTION', 'deny')
+    payload = PAYLOAD | {'requestContext': {'http': {'sourceIp': '198.51.100.1'}}}
+
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 403
+    assert app_provider.response['body'] == '{"message":"Forbidden"}'
+
+
+def test_ratelimit_rejects(monkeypatch):
+    """
+    Test rate limited requests are rejected
+    """
+    monkeypatch.setenv('RATELIMIT_ENABLE', 'true')
+    monkeypatch.setenv('RATELIMIT_RATE', '0')
+    monkeypatch.setenv('RATELIMIT_BURST', '1')
+    payload = PAYLOAD | {'requestContext': {'http': {'sourceIp': '198.51.100.99'}}}
+
+    assert AppProvider(payload).response['statusCode'] == 200
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 429
+    assert app_provider.response['body'] == '{"message":"Too many requests"}'
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_dedup_short_circuits(monkeypatch):
+    """
+    Test duplicate submissions return the original outcome without running any runner
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name, message')
+    monkeypatch.setenv('DEDUP_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_WEBHOOK_URL', DISCORD_WEBHOOK_URL)
+    monkeypatch.setenv('DISCORD_JSON_TEMPLATE', '{"content":"${name}"}')
+    discord_utils.httpretty_register_discord_webhook_success()
+    payload = PAYLOAD | {
+        'headers': {'Content-Type': 'application/json', 'Idempotency-Key': 'test-dedup'}
+    }
+
+    first = AppProvider(payload)
+    assert first.response['statusCode'] == 200
+    httpretty.reset()
+
+    duplicate = AppProvider(payload)
+    assert duplicate.response == first.response
+    assert duplicate.runners['discord'].client is None
+    assert not httpretty.latest_requests()
+
+
+@mock_s3
+@httpretty.activate(allow_net_connect=False)
+def test_uploads(monkeypatch):
+    """
+    Test upload URLs are issued without a submission, and referenced uploads are linked
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    monkeypatch.setenv('UPLOAD_ENABLE', 'true')
+    monkeypatch.setenv('UPLOAD_BUCKET', 'attachments')
+    monkeypatch.setenv('UPLOAD_TICKET_SECRET', 'abc')
+    monkeypatch.setenv('DISCORD_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_WEBHOOK_URL', DISCORD_WEBHOOK_URL)
+    monkeypatch.setenv('DISCORD_JSON_TEMPLATE', '{"content":"${name}: ${attachments}"}')
+    discord_utils.httpretty_register_discord_webhook_success()
+
+    payload = {
+        'version': '2.0',
+        'rawPath': '/uploads',
+        'body': {'contentType': 'application/pdf', 'size': 100, 'ticket': sign('abc', 'a.0')},
+    }
+    # Tickets must be recent
+    assert AppProvider(payload).response['statusCode'] == 401
+
+    payload['body']['ticket'] = sign('abc', f'a.{int(time.time())}')
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 200
+    key = json.loads(app_provider.response['body'])['key']
+    assert not httpretty.latest_requests()
+
+    payload = {'version': '2.0', 'rawPath': '/', 'body': {'name': 'a', 'attachments': [key]}}
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 200
+    content = json.loads(httpretty.last_request().body)['content']
+    assert content.startswith(f'a: https://attachments.s3.amazonaws.com/{key}?')
+
+    payload['body']['attachments'] = ['config/secrets.txt']
+    assert AppProvider(payload).response['statusCode'] == 400
+
+
+@mock_s3
+@httpretty.activate(allow_net_connect=False)
+def test_uploads_hcaptcha(monkeypatch):
+    """
+    Test upload requests without a ticket open a session once hCaptcha succeeds, whose
+    ticket covers further uploads without solving hCaptcha again
+    """
+    monkeypatch.setenv('UPLOAD_ENABLE', 'true')
+    monkeypatch.setenv('UPLOAD_BUCKET', 'attachments')
+    monkeypatch.setenv('UPLOAD_TICKET_SECRET', 'abc')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    payload = {
+        'version': '2.0',
+        'rawPath': '/uploads',
+        'body': {'contentType': 'application/pdf', 'size': 100, 'captcha-response': 'xyz'},
+    }
+
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_failure()
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 401
+
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_success()
+    app_provider = AppProvider(payload)
+    assert app_provider.response['statusCode'] == 200
+    body = json.loads(app_provider.response['body'])
+    assert 'key' in body
+    verifications = len(httpretty.latest_requests())
+
+    payload['body'] = {'contentType': 'application/pdf', 'size': 100, 'ticket': body['ticket']}
+    assert AppProvider(payload).response['statusCode'] == 200
+    assert len(httpretty.latest_requests()) == verifications
+
+    # Without hCaptcha, requests without a ticket are rejected
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'false')
+    del payload['body']['ticket']
+    assert AppProvider(payload).response['statusCode'] == 401
+
+    # Uploads without a ticket secret fail configuration
+    monkeypatch.setenv('UPLOAD_TICKET_SECRET', '')
+    assert AppProvider(payload).response['statusCode'] == 500
+
+
+def test_metrics(monkeypatch, capsys):
+    """
+    Test stage timings are emitted as a single EMF line per invocation
+    """
+    monkeypatch.setenv('METRICS_ENABLE', 'true')
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 200
+    assert {'total', 'config', 'parse', 'validate', 'prepare'} <= set(app_provider.metrics.timings)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert '"TotalLatency"' in lines[0]
+
+
+def test_profiling(monkeypatch, capsys):
+    """
+    Test sampled invocations are profiled around request processing
+    """
+    monkeypatch.setenv('PROFILE_ENABLE', 'true')
+    monkeypatch.setenv('PROFILE_SAMPLE_RATE', '1')
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 200
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert '"profile"' in lines[0]
+
+
+@httpretty.activate(allow_net_connect=False)
+@mock_dynamodb
+@mock_secretsmanager
+@mock_ses
+@mock_ssm
+def test_tracing(monkeypatch, capsys):
+    """
+    Test runner, AWS and HTTP spans are exported as one span tree per invocation
+    """
+    patch_env_all_success(monkeypatch)
+    aws_config_all_success()
+    hcaptcha_utils.httpretty_register_hcaptcha_siteverify_success()
+    discord_utils.httpretty_register_discord_webhook_success()
+    slack_utils.httpretty_register_slack_webhook_success()
+    monkeypatch.setenv('TRACE_ENABLE', 'true')
+    POOL.clear()
+    RESOLVED.clear()
+
+    app_provider = AppProvider(PAYLOAD)
+    assert app_provider.response['statusCode'] == 200
+
+    tree = json.loads(capsys.readouterr().out)['trace']
+    assert tree['annotations'] == {'status': 200}
+    names = [child['name'] for child in tree['children']]
+    assert names[-4:] == ['discord', 'dynamodb', 'email', 'slack']
+    assert 'hcaptcha' in names
+
+    discord = tree['children'][names.index('discord')]
+    http = discord['children'][0]
+    assert http['annotations']['host'] == 'discord.com'
+    assert [child['name'] for child in http['children'][0]['children']] == ['dns', 'tcp', 'tls']
+    assert tree['children'][-3]['children'][0]['name'] == 'dynamodb.put_item'
+    assert tree['children'][-2]['children'][0]['name'] == 'ses.send_email'
+
+
+def test_reused_provider(monkeypatch):
+    """
+    Test one provider handles several events without carrying over errors
+    """
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    app_provider = AppProvider(None, process=False)
+    assert app_provider.handle({'version': '1.0', 'body': {}})['statusCode'] == 400
+    assert app_provider.handle({'version': '1.0', 'body': {'name': 'a'}})['statusCode'] == 200
+
+
+@mock_dynamodb
+def test_reused_provider_dedup(monkeypatch):
+    """
+    Test a request rejected before the duplicate check does not release the claim
+    of the previous request handled by the same provider
+    """
+    aws_utils.create_dynamodb_counter_table('dedup')
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    monkeypatch.setenv('DEDUP_ENABLE', 'true')
+    monkeypatch.setenv('DEDUP_TABLE', 'dedup')
+    monkeypatch.setenv('PREFILTER_ENABLE', 'true')
+    monkeypatch.setenv('PREFILTER_HONEYPOT_FIELD', 'website')
+    payload = PAYLOAD | {
+        'headers': {'Content-Type': 'application/json', 'Idempotency-Key': 'test-reuse'}
+    }
+
+    app_provider = AppProvider(None, process=False)
+    assert app_provider.handle(payload)['statusCode'] == 200
+    spam = {'version': '2.0', 'body': {'name': 'a', 'website': 'spam'}}
+    assert app_provider.handle(spam)['statusCode'] == 400
+    assert AwsService().get_dynamodb_record('dedup', 'dedup#key#test-reuse') is not None
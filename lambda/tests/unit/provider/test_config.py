@@ -0,0 +1,46 @@
+"""
+Config provider unit tests
+"""
+
+import os
+import boto3
+from moto import mock_ssm
+
+from app_handler.provider import config
+from app_handler.provider.config import ConfigProvider
+from tests.unit.service import aws_utils
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+
+@mock_ssm
+def test_remote_values_cached(monkeypatch):
+    """
+    Test values from remote sources are only fetched again once the cache expires
+    """
+    monkeypatch.setattr(config, 'REMOTE_VALUES', {})
+    monkeypatch.setenv('HCAPTCHA_SECRET_SOURCE', 'aws_ssm_parameter_store')
+    monkeypatch.setenv('HCAPTCHA_SECRET_PARAMETER_STORE_NAME', '/a/hcaptcha/secret')
+    aws_utils.ssm_put_parameter_securestring('/a/hcaptcha/secret', 'first')
+
+    # Without a cache duration every call fetches the value
+    assert ConfigProvider().get('HCAPTCHA_SECRET') == 'first'
+    assert not config.REMOTE_VALUES
+
+    monkeypatch.setenv('CONFIG_CACHE_SECONDS', '300')
+    assert ConfigProvider().get('hcaptcha_secret') == 'first'
+    boto3.client('ssm').put_parameter(
+        Name='/a/hcaptcha/secret', Value='second', Type='SecureString', Overwrite=True
+    )
+    assert ConfigProvider().get('HCAPTCHA_SECRET') == 'first'
+
+    # Expired values are fetched again
+    for key, (_, value) in config.REMOTE_VALUES.items():
+        config.REMOTE_VALUES[key] = (0, value)
+    assert ConfigProvider().get('HCAPTCHA_SECRET') == 'second'
+
+    # Environment values are never cached
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    assert ConfigProvider().get('REQUIRED_FIELDS') == 'name'
+    assert len(config.REMOTE_VALUES) == 1
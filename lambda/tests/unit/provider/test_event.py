@@ -0,0 +1,72 @@
+"""
+Event source unit tests
+"""
+
+import pathlib
+import json
+
+import pytest
+
+from app_handler.provider import event as sources
+from app_handler.provider.event import get_event_source
+
+
+def get_json_fixture_file(filename):
+    """
+    Return JSON fixture from local file
+    """
+    path = pathlib.Path(__file__).parent.parent / f"fixtures/{filename}"
+    return json.loads(path.read_text('UTF-8'))
+
+
+@pytest.mark.parametrize('filename, source', [
+    ('api_gateway_request_json_base64.json', sources.API_V1),
+    ('httpapiv2_gateway_request_json_base64.json', sources.API_V2),
+    ('function_url_request_json_no_base64.json', sources.FUNCTION_URL),
+    ('alb_request_urlencoded_base64.json', sources.ALB),
+    ('alb_request_multi_value_json_no_base64.json', sources.ALB_MULTI_VALUE),
+    ('sns_message_v1.json', sources.SNS),
+    ('sqs_message.json', sources.SQS),
+    ('request.json', sources.DIRECT),
+])
+def test_event_fixtures(filename, source):
+    """
+    Ensure fixture events of every source are classified
+    """
+    assert get_event_source(get_json_fixture_file(filename)) is source
+
+
+def test_event_shapes():
+    """
+    Ensure events are classified from their discriminating keys only
+    """
+    assert get_event_source({'version': '1.0'}) is sources.API_V1
+    assert get_event_source({'version': '2.0'}) is sources.API_V2
+    assert get_event_source({'version': '3.0'}) is sources.DIRECT
+    # REST APIs may omit the version
+    assert get_event_source({'httpMethod': 'POST', 'requestContext': {}}) is sources.API_V1
+    assert get_event_source({'requestContext': {}}) is sources.DIRECT
+    assert get_event_source({'Records': []}) is sources.DIRECT
+    assert get_event_source({'Records': [{'eventSource': 'aws:s3'}]}) is sources.DIRECT
+    assert get_event_source({'body': {}}) is sources.DIRECT
+    assert get_event_source('text') is sources.DIRECT
+    assert get_event_source(None) is sources.DIRECT
+
+
+def test_direct_source():
+    """
+    Ensure direct invocations fall back to any path or remote IP provided
+    """
+    source = sources.DIRECT
+    assert source.get_path({'rawPath': '/uploads'}) == '/uploads'
+    assert source.get_path({'path': 1}) is None
+    assert source.get_path('text') is None
+    event = {'requestContext': {'identity': {'sourceIp': '127.0.0.1'}}}
+    assert source.get_remote_ip(event) == '127.0.0.1'
+    assert source.get_remote_ip({'requestContext': {'http': {}}}) is None
+    assert source.get_remote_ip({'requestContext': None}) is None
+    assert source.get_remote_ip('text') is None
+
+    # API sources without a request context have no remote IP
+    assert sources.API_V1.get_remote_ip({}) is None
+    assert sources.API_V2.get_remote_ip({}) is None
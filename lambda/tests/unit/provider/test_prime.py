@@ -0,0 +1,84 @@
+"""
+Init-time priming unit tests
+"""
+
+import os
+import socket
+from moto import mock_ssm
+
+from app_handler.provider import config
+from app_handler.provider.prime import prime
+from app_handler.service.http_pool import POOL, RESOLVED
+from app_handler.utils import coldstart
+from tests.unit.service import aws_utils
+from tests.unit.service.http_utils import StandinServer
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+
+@mock_ssm
+def test_prime(monkeypatch):
+    """
+    Test configs are cached, hosts resolved and connections opened before the first request
+    """
+    monkeypatch.setattr(config, 'REMOTE_VALUES', {})
+    monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {})
+    server = StandinServer(lambda index, body: (200, '{}', 0, True))
+    host = server.url.split('/')[2]
+    monkeypatch.setenv('CONFIG_CACHE_SECONDS', '300')
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'true')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET_SOURCE', 'aws_ssm_parameter_store')
+    monkeypatch.setenv('HCAPTCHA_SECRET_PARAMETER_STORE_NAME', '/a/hcaptcha/secret')
+    monkeypatch.setenv('HCAPTCHA_VERIFY_URL', f'{server.url}/siteverify')
+    monkeypatch.setenv('DISCORD_ENABLE', 'true')
+    monkeypatch.setenv('DISCORD_WEBHOOK_URL', f'{server.url}/discord')
+    monkeypatch.setenv('DISCORD_JSON_TEMPLATE', '{}')
+    aws_utils.ssm_put_parameter_securestring('/a/hcaptcha/secret', 'xyz')
+    POOL.clear()
+    try:
+        prime()
+        assert set(coldstart.INIT_TIMINGS) == {'config', 'clients', 'dns', 'connect'}
+        assert [value for _, value in config.REMOTE_VALUES.values()] == ['xyz']
+        assert ('127.0.0.1', server.server.server_address[1]) in RESOLVED
+        # The second URL on the same host finds the first connection already pooled
+        assert len(POOL.idle[('http', host)]) == 1
+
+        # Refreshing from keep-warm events does not overwrite init timings
+        monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {})
+        prime(record=False)
+        assert not coldstart.INIT_TIMINGS
+    finally:
+        server.close()
+        POOL.clear()
+        RESOLVED.clear()
+
+    assert not server.requests
+
+
+def test_prime_config_error(monkeypatch):
+    """
+    Test invalid configs stop priming, leaving the error to the first request
+    """
+    monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {})
+    monkeypatch.setenv('IPFILTER_ENABLE', 'true')
+    monkeypatch.setenv('IPFILTER_DEFAULT_ACTION', 'unknown')
+    prime()
+    assert 'clients' not in coldstart.INIT_TIMINGS
+
+
+def test_prime_network_errors(monkeypatch):
+    """
+    Test DNS and connection failures are logged without failing init
+    """
+    def getaddrinfo(*_):
+        raise socket.gaierror('Name or service not known')
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setenv('SLACK_ENABLE', 'true')
+    monkeypatch.setenv('SLACK_WEBHOOK_URL', 'https://hooks.slack.com/services/abc')
+    monkeypatch.setenv('SLACK_JSON_TEMPLATE', '{}')
+    POOL.clear()
+    prime()
+    assert not POOL.idle
@@ -2,9 +2,11 @@
 Payload parsing unit tests
 """
 
+import base64
 import json
 import pathlib
 from app_handler.provider.request import RequestProvider
+from app_handler.utils.limits import BodyLimits
 
 json_data = {'key': 'test value'}
 
@@ -147,6 +149,125 @@ def test_get_remote_ip():
     assert RequestProvider(eventv1).get_remote_ip() == '127.0.0.1'
     assert RequestProvider(eventv2).get_remote_ip() == '127.0.0.1'
 
+def test_get_path():
+    """
+    Ensure request paths are returned for all gateway types
+    """
+
+    eventv1 = get_json_fixture_file('api_gateway_request_urlencoded_base64.json')
+    eventv2 = get_json_fixture_file('httpapiv2_gateway_request_urlencoded_base64.json')
+    assert RequestProvider(eventv1).get_path() == '/api'
+    assert RequestProvider(eventv2).get_path() == '/httpapiv2'
+    assert RequestProvider({'body': ''}).get_path() is None
+    assert RequestProvider('text').get_path() is None
+
+def test_get_header():
+    """
+    Ensure headers are fetched by case-insensitive name with their original value
+    """
+
+    request = RequestProvider({'body': '', 'headers': {'Idempotency-Key': 'AbC', 1: 'x'}})
+    assert request.get_header('idempotency-key') == 'AbC'
+    assert request.get_header('Missing') is None
+    assert RequestProvider({'body': ''}).get_header('Idempotency-Key') is None
+    assert RequestProvider('text').get_header('Idempotency-Key') is None
+
+    # Media types are matched case-insensitively without changing header values
+    request = RequestProvider({
+        'body': '{"key": "test value"}',
+        'headers': {'CONTENT-TYPE': 'Application/JSON', 'X-Signature': 'SiG'},
+    })
+    assert request.content == json_data
+    assert request.get_header('content-type') == 'Application/JSON'
+    assert request.get_header('x-signature') == 'SiG'
+
+    # API Gateway v1 multi-value headers
+    request = RequestProvider({
+        'version': '1.0',
+        'body': '{"key": "test value"}',
+        'multiValueHeaders': {'Content-Type': ['application/json']},
+    })
+    assert request.content == json_data
+    assert request.headers.get_all('content-type') == ['application/json']
+
+def test_payload_parse_form_values():
+    """
+    Ensure encoded separators are kept in values, repeated keys are kept and
+    forms with too many fields are rejected
+    """
+
+    event = {
+        'headers': {'Content-Type': 'application/x-www-form-urlencoded'},
+        'body': 'q=a%26b%3Dc&topic=sales&topic=support',
+    }
+    assert RequestProvider(event).content == {'q': 'a&b=c', 'topic': ['sales', 'support']}
+    assert RequestProvider(event, BodyLimits(max_fields=2)).has_error
+
+
+def test_payload_parse_limits():
+    """
+    Ensure oversized bodies and JSON beyond field and depth limits are rejected,
+    and base64 bodies that do not decode are errors
+    """
+
+    event = {
+        'headers': {'Content-Type': 'application/json'},
+        'body': '{"a": {"b": [1, {"c": 2}]}}',
+    }
+    assert RequestProvider(event).content == {'a': {'b': [1, {'c': 2}]}}
+    assert RequestProvider(event, BodyLimits(max_fields=2)).has_error
+    assert RequestProvider(event, BodyLimits(max_depth=3)).has_error
+    assert not RequestProvider(event, BodyLimits(max_depth=4)).has_error
+    assert RequestProvider({**event, 'body': '[' * 100000}).has_error
+
+    request = RequestProvider(event, BodyLimits(max_bytes=10))
+    assert request.too_large and request.has_error
+    assert not RequestProvider(event, BodyLimits(max_decoded_bytes=30)).too_large
+
+    encoded = {'body': 'not base64!', 'isBase64Encoded': True}
+    assert RequestProvider(encoded).has_error
+    assert RequestProvider({**encoded, 'body': '/w=='}).has_error
+    assert RequestProvider({**encoded, 'body': b'aGk='}).content == 'hi'
+
+
+def test_payload_parse_multipart():
+    """
+    Ensure multipart forms are parsed into fields and uploaded files, using the boundary
+    in its original case, and part limits apply
+    """
+
+    body = (
+        b'--AbC\r\nContent-Disposition: form-data; name="key"\r\n\r\ntest value\r\n'
+        b'--AbC\r\nContent-Disposition: form-data; name="file"; filename="a.txt"\r\n\r\n'
+        b'abc\r\n--AbC--\r\n'
+    )
+    event = {
+        'headers': {'Content-Type': 'multipart/form-data; boundary=AbC'},
+        'body': base64.b64encode(body).decode(),
+        'isBase64Encoded': True,
+    }
+    request = RequestProvider(event)
+    assert request.content == json_data
+    assert request.files['file'].read() == b'abc'
+    request.close()
+
+    request = RequestProvider(event, BodyLimits(max_file_bytes=2))
+    assert request.too_large and request.has_error
+    assert not request.files
+    truncated = {**event, 'body': body.decode()[:-4], 'isBase64Encoded': False}
+    assert RequestProvider(truncated).has_error
+    missing = {**event, 'headers': {'Content-Type': 'multipart/form-data'}}
+    assert RequestProvider(missing).has_error
+
+
+def test_payload_parse_json_bytes():
+    """
+    Ensure base64 decoded JSON is parsed
+    """
+
+    event = get_json_fixture_file('httpapiv2_gateway_request_json_base64.json')
+    assert RequestProvider(event).content == json_data
+
 # SNS topic
 
 def test_payload_parse_sns_message():
@@ -157,3 +278,61 @@ def test_payload_parse_sns_message():
     sns_request = get_json_fixture_file('sns_message_v1.json')
     assert RequestProvider(sns_request).content['Message'] == 'Hello from SNS!'
     assert RequestProvider(sns_request).content['Subject'] == 'TestInvoke'
+
+# Function URL, load balancer and SQS queue
+
+def test_payload_parse_function_url():
+    """
+    Ensure function URL requests are parsed like HTTP API requests
+    """
+
+    event = get_json_fixture_file('function_url_request_json_no_base64.json')
+    request = RequestProvider(event)
+    assert request.source.name == 'function_url'
+    assert request.content == json_data
+    assert request.get_path() == '/'
+    assert request.get_remote_ip() == '127.0.0.1'
+
+def test_payload_parse_alb():
+    """
+    Ensure load balancer requests are parsed, with or without multi-value headers,
+    taking the remote IP from the address the load balancer appended
+    """
+
+    event = get_json_fixture_file('alb_request_urlencoded_base64.json')
+    request = RequestProvider(event)
+    assert request.source.name == 'alb'
+    assert request.content == json_data
+    assert request.get_path() == '/contact'
+    assert request.get_remote_ip() == '127.0.0.1'
+
+    event = get_json_fixture_file('alb_request_multi_value_json_no_base64.json')
+    request = RequestProvider(event)
+    assert request.source.name == 'alb_multi_value'
+    assert request.content == json_data
+    assert request.get_header('Content-Type') == 'application/json'
+    assert request.get_remote_ip() == '127.0.0.1'
+
+    # Missing forwarding headers have no remote IP
+    del event['multiValueHeaders']['x-forwarded-for']
+    assert RequestProvider(event).get_remote_ip() is None
+    event['multiValueHeaders'] = None
+    assert RequestProvider(event).content == '{"key": "test value"}'
+
+def test_payload_parse_sqs_message():
+    """
+    Ensure the first SQS message body is parsed, as JSON unless its attributes
+    give another content type
+    """
+
+    event = get_json_fixture_file('sqs_message.json')
+    request = RequestProvider(event)
+    assert request.source.name == 'sqs'
+    assert request.content == json_data
+    assert request.get_remote_ip() is None
+
+    event['Records'][0]['body'] = 'key=test+value'
+    event['Records'][0]['messageAttributes'] = {
+        'Content-Type': {'stringValue': 'application/x-www-form-urlencoded', 'dataType': 'String'}
+    }
+    assert RequestProvider(event).content == json_data
@@ -17,7 +17,7 @@ def test_api_v1_json_message():
             "content-type": "application/json"
         },
         "multiValueHeaders": {},
-        "body": '{"message": "OK"}'
+        "body": '{"message":"OK"}'
     }
 
     assert ResponseProvider({'version':'1.0'}).message('OK') == expected
@@ -26,3 +26,54 @@ def test_api_v1_json_message():
     assert ResponseProvider({'version':'2.1'}).message('OK') == expected
     # Handle unknown version
     assert ResponseProvider({'version':'3.0'}).message('OK') == {'message': 'OK', 'statusCode': 200}
+
+
+def test_function_url_json_message():
+    """
+    Test function URL response, without multi-value headers
+    """
+
+    event = {'version': '2.0', 'requestContext': {'domainName': 'abc.lambda-url.eu-west-2.on.aws'}}
+    assert ResponseProvider(event).message('OK') == {
+        "isBase64Encoded": False,
+        "statusCode": 200,
+        "headers": {
+            "content-type": "application/json"
+        },
+        "body": '{"message":"OK"}'
+    }
+
+
+def test_alb_json_message():
+    """
+    Test load balancer responses, using multi-value headers if the request did
+    """
+
+    event = {'requestContext': {'elb': {}}, 'headers': {}}
+    assert ResponseProvider(event).message('Too many requests', 429) == {
+        "isBase64Encoded": False,
+        "statusCode": 429,
+        "statusDescription": "429 Too Many Requests",
+        "headers": {
+            "content-type": "application/json"
+        },
+        "body": '{"message":"Too many requests"}'
+    }
+
+    event = {'requestContext': {'elb': {}}, 'multiValueHeaders': {}}
+    assert ResponseProvider(event).build(
+        {'message': 'OK'},
+        multi_value_headers={'set-cookie': ['a=1', 'b=2']},
+    ) == {
+        "isBase64Encoded": False,
+        "statusCode": 200,
+        "statusDescription": "200 OK",
+        "multiValueHeaders": {
+            "content-type": ["application/json"],
+            "set-cookie": ["a=1", "b=2"],
+        },
+        "body": '{"message":"OK"}'
+    }
+
+    # Non-standard status codes have no description
+    assert ResponseProvider(event).message('OK', 299)['statusDescription'] == '299'
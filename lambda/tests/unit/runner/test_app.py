@@ -94,3 +94,48 @@ def test_bad_url_encoded_body():
     response = runner.run(payload)
     assert response == None
     assert runner.error_response['statusCode'] == 400
+
+
+def test_body_too_large(monkeypatch):
+    """
+    Test bodies over the configured size limits are rejected before decoding
+    """
+    monkeypatch.setenv('BODY_MAX_BYTES', '12')
+    monkeypatch.setenv('BODY_MAX_DECODED_BYTES', '5')
+    runner = AppRunner()
+    runner.configure()
+
+    payload = {
+        'version': '2.0',
+        'headers': {'content-type': 'application/json'},
+        'body': '{"a": 12}',
+    }
+    runner.run(payload)
+    assert runner.error_response['statusCode'] == 413
+    runner.run({**payload, 'body': '{"a": 1, "b": 2}'})
+    assert runner.error_response['statusCode'] == 413
+
+    # Base64 bodies are measured by their decoded size, here 7 and 2 bytes
+    runner.run({**payload, 'body': 'eyJhIjoxfQ==', 'isBase64Encoded': True})
+    assert runner.error_response['statusCode'] == 413
+    runner.run({**payload, 'body': 'e30=', 'isBase64Encoded': True})
+    assert runner.error_response is None
+
+
+def test_uploaded_files_closed():
+    """
+    Test uploaded files of a request are closed when the next request is parsed
+    """
+    payload = {
+        'version': '2.0',
+        'headers': {'content-type': 'multipart/form-data; boundary=b'},
+        'body': '--b\r\nContent-Disposition: form-data; name="f"; filename="a"\r\n\r\nx\r\n--b--',
+    }
+    runner = AppRunner()
+    runner.configure()
+    runner.run(payload)
+    uploaded = runner.request_provider.files['f']
+    assert runner.error_response is None
+
+    runner.run(payload)
+    assert uploaded.file.closed
@@ -0,0 +1,116 @@
+"""
+Runner unit tests
+"""
+
+import os
+import pytest
+from moto import mock_s3
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import blocklist
+from app_handler.runner.blocklist import BlocklistRunner
+from tests.unit.service.aws_utils import put_s3_object
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+
+def run_blocklist(body):
+    """
+    Configure and run blocklist runner against a request body
+    """
+    payload = {'version': '1.0', 'body': body}
+    runner = BlocklistRunner()
+    runner.configure()
+    pattern = runner.run(RequestProvider(payload), ResponseProvider(payload))
+    return runner, pattern
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    Running should not produce any errors
+    """
+    runner, pattern = run_blocklist({})
+    assert runner.enable == False
+    assert pattern is None
+    assert not runner.error_response
+
+
+def test_packaged_blocklist(monkeypatch):
+    """
+    Test the packaged blocklist is loaded by default
+    """
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'True')
+    monkeypatch.setenv('REQUIRED_FIELDS', 'message')
+    monkeypatch.setattr(blocklist, 'MATCHERS', {})
+    runner, pattern = run_blocklist({'message': 'Hello'})
+    assert pattern is None
+    assert str(blocklist.DEFAULT_PATH) in blocklist.MATCHERS
+    assert runner.matcher.size == 0
+
+
+def test_file_blocklist(monkeypatch, tmp_path):
+    """
+    Test a local blocklist file is matched across all required fields
+    """
+    path = tmp_path / 'blocklist.txt'
+    path.write_text('# comment\n\ncheap pills\nspam.example\n', 'UTF-8')
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'True')
+    monkeypatch.setenv('BLOCKLIST_PATH', str(path))
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name, message')
+    monkeypatch.setattr(blocklist, 'MATCHERS', {})
+
+    runner, pattern = run_blocklist({'name': 'a', 'message': 'Visit SPAM.example', 'other': 'cheap pills'})
+    assert pattern == 'spam.example'
+    assert runner.error_response['statusCode'] == 400
+
+    # Matches never span fields and other fields are ignored
+    runner, pattern = run_blocklist({'name': 'cheap', 'message': 'pills', 'other': 'cheap pills'})
+    assert pattern is None
+    assert not runner.error_response
+    assert runner.matcher.size == 2
+
+
+def test_missing_file(monkeypatch, tmp_path):
+    """
+    Test a missing blocklist file fails configuration
+    """
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'True')
+    monkeypatch.setenv('BLOCKLIST_PATH', str(tmp_path / 'missing.txt'))
+    monkeypatch.setattr(blocklist, 'MATCHERS', {})
+    with pytest.raises(ValueError) as exception:
+        BlocklistRunner().configure()
+
+    assert 'missing.txt' in str(exception.value)
+
+
+@mock_s3
+def test_s3_blocklist(monkeypatch):
+    """
+    Test a blocklist is loaded from S3 once and cached
+    """
+    put_s3_object('config', 'blocklist.txt', 'casino\n')
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'True')
+    monkeypatch.setenv('BLOCKLIST_S3_URI', 's3://config/blocklist.txt')
+    monkeypatch.setenv('REQUIRED_FIELDS', 'message')
+    monkeypatch.setattr(blocklist, 'MATCHERS', {})
+
+    assert run_blocklist({'message': 'Online Casino'})[1] == 'casino'
+    matcher = blocklist.MATCHERS['s3://config/blocklist.txt']
+    assert run_blocklist({'message': 'Hello'})[0].matcher is matcher
+
+
+@mock_s3
+def test_missing_s3_blocklist(monkeypatch):
+    """
+    Test a missing S3 blocklist fails configuration
+    """
+    monkeypatch.setenv('BLOCKLIST_ENABLE', 'True')
+    monkeypatch.setenv('BLOCKLIST_S3_URI', 's3://config/missing.txt')
+    monkeypatch.setattr(blocklist, 'MATCHERS', {})
+    with pytest.raises(ValueError) as exception:
+        BlocklistRunner().configure()
+
+    assert 's3://config/missing.txt' in str(exception.value)
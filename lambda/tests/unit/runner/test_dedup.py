@@ -0,0 +1,185 @@
+"""
+Runner unit tests
+"""
+
+import os
+import time
+from collections import OrderedDict
+import pytest
+from moto import mock_dynamodb
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import dedup
+from app_handler.runner.dedup import DedupRunner
+from app_handler.service.aws import AwsService
+from tests.unit.service.aws_utils import create_dynamodb_counter_table
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+OK = {'message': 'Message received', 'statusCode': 200}
+
+
+def run_dedup(body, headers=None):
+    """
+    Configure and run dedup runner against a request body
+    """
+    payload = {'body': body}
+    if headers is not None:
+        payload['headers'] = headers
+    runner = DedupRunner()
+    runner.configure()
+    runner.run(RequestProvider(payload), ResponseProvider(payload))
+    return runner
+
+
+@pytest.fixture(autouse=True)
+def fixture_recent(monkeypatch):
+    """
+    Start each test with no recent outcomes
+    """
+    monkeypatch.setattr(dedup, 'RECENT', OrderedDict())
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name, message')
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    Running and recording should not do anything
+    """
+    runner = run_dedup({'name': 'a', 'message': 'b'})
+    assert runner.enable == False
+    runner.record(OK)
+    assert runner.duplicate_response is None
+    assert not dedup.RECENT
+
+
+def test_local_duplicates(monkeypatch):
+    """
+    Test normalised duplicates of a successful submission return its outcome
+    """
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    runner = run_dedup({'name': 'a', 'message': 'hello  world', 'captcha-response': '1'})
+    assert runner.duplicate_response is None
+    runner.record(OK)
+
+    duplicate = run_dedup({'name': ' a', 'message': 'hello world\n', 'captcha-response': '2'})
+    assert duplicate.duplicate_response == OK
+    # Duplicates do not record again
+    duplicate.record({'statusCode': 500})
+    assert len(dedup.RECENT) == 1
+
+    assert run_dedup({'name': 'b', 'message': 'hello world'}).duplicate_response is None
+
+
+def test_failures_not_remembered(monkeypatch):
+    """
+    Test failed submissions can be retried
+    """
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    run_dedup({'name': 'a', 'message': 'b'}).record({'statusCode': 500})
+    assert run_dedup({'name': 'a', 'message': 'b'}).duplicate_response is None
+
+
+def test_expiry_and_eviction(monkeypatch):
+    """
+    Test outcomes expire and the least recently used are evicted
+    """
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    monkeypatch.setenv('DEDUP_MAX_ENTRIES', '1')
+    run_dedup({'name': 'a', 'message': 'b'}).record(OK)
+    run_dedup({'name': 'c', 'message': 'd'}).record(OK)
+    assert run_dedup({'name': 'a', 'message': 'b'}).duplicate_response is None
+
+    monkeypatch.setenv('DEDUP_TTL_SECONDS', '-1')
+    run_dedup({'name': 'e', 'message': 'f'}).record(OK)
+    assert run_dedup({'name': 'e', 'message': 'f'}).duplicate_response is None
+
+
+def test_keys(monkeypatch):
+    """
+    Test idempotency header, all field and string content keys
+    """
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    runner = run_dedup({'name': 'a'}, headers={'idempotency-key': 'AbC'})
+    assert runner.key == 'dedup#key#AbC'
+
+    monkeypatch.setenv('REQUIRED_FIELDS', '')
+    first = run_dedup({'name': 'a', 'message': 'b'}).key
+    assert first == run_dedup({'message': 'b ', 'name': 'a'}).key
+    assert first != run_dedup({'name': 'a', 'message': 'c'}).key
+    assert run_dedup('a  b').key == run_dedup('a b').key
+
+
+@mock_dynamodb
+def test_shared_duplicates(monkeypatch):
+    """
+    Test outcomes are shared across containers through DynamoDB
+    """
+    create_dynamodb_counter_table('dedup')
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    monkeypatch.setenv('DEDUP_TABLE', 'dedup')
+
+    runner = run_dedup({'name': 'a', 'message': 'b'})
+    assert runner.claimed
+    claim = AwsService().get_dynamodb_record('dedup', runner.key)
+    assert claim['expires'] <= time.time() + 900
+
+    # Duplicate while the first submission is still in progress
+    in_progress = run_dedup({'name': 'a', 'message': 'b'})
+    assert in_progress.duplicate_response['statusCode'] == 409
+
+    # Storing the outcome extends the claim to the full TTL
+    runner.record(OK)
+    assert AwsService().get_dynamodb_record('dedup', runner.key)['expires'] > claim['expires']
+    # Another container without the outcome in memory
+    monkeypatch.setattr(dedup, 'RECENT', OrderedDict())
+    duplicate = run_dedup({'name': 'a', 'message': 'b'})
+    assert duplicate.duplicate_response == OK
+    assert runner.key in dedup.RECENT
+
+
+@mock_dynamodb
+def test_shared_failure_released(monkeypatch):
+    """
+    Test failed submissions release their claim
+    """
+    create_dynamodb_counter_table('dedup')
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    monkeypatch.setenv('DEDUP_TABLE', 'dedup')
+
+    runner = run_dedup({'name': 'a', 'message': 'b'})
+    runner.record({'statusCode': 401})
+    assert AwsService().get_dynamodb_record('dedup', runner.key) is None
+    assert run_dedup({'name': 'a', 'message': 'b'}).claimed
+
+
+@mock_dynamodb
+def test_shared_claim_expiry(monkeypatch):
+    """
+    Test the claim of a submission that never recorded its outcome expires
+    """
+    create_dynamodb_counter_table('dedup')
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    monkeypatch.setenv('DEDUP_TABLE', 'dedup')
+    monkeypatch.setenv('DEDUP_CLAIM_SECONDS', '-1')
+
+    # The first invocation timed out without recording
+    assert run_dedup({'name': 'a', 'message': 'b'}).claimed
+    retry = run_dedup({'name': 'a', 'message': 'b'})
+    assert retry.claimed
+    assert retry.duplicate_response is None
+
+
+@mock_dynamodb
+def test_shared_errors_fail_open(monkeypatch):
+    """
+    Test DynamoDB errors process the submission as new
+    """
+    monkeypatch.setenv('DEDUP_ENABLE', 'True')
+    monkeypatch.setenv('DEDUP_TABLE', 'missing-table')
+
+    runner = run_dedup({'name': 'a', 'message': 'b'})
+    assert runner.duplicate_response is None
+    assert not runner.claimed
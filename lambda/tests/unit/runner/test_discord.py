@@ -165,7 +165,7 @@ def test_runner_enabled_and_configured_success(monkeypatch):
     utils.httpretty_register_discord_webhook_success()
 
     result = runner.run(request_provider, response_provider)
-    assert runner.fields == {'name': 'My Name', 'email': 'me@example.com'}
+    assert runner.values == {'name': 'My Name', 'email': 'me@example.com'}
     assert not runner.error_response
     assert result['status'] == 204
 
@@ -121,6 +121,39 @@ def test_runner_enabled_and_configured_success(monkeypatch):
     create_dynamodb_table('new-table')
 
     result = runner.run(request_provider, response_provider)
-    assert runner.fields == {'name': 'My Name', 'email': 'me@example.com'}
+    assert runner.values == {'name': 'My Name', 'email': 'me@example.com'}
     assert not runner.error_response
     assert result['ResponseMetadata']['HTTPStatusCode'] == 200
+
+    # Keys of uploaded attachments are stored with the fields
+    request_provider.attachments = [{'key': 'uploads/a', 'link': 'https://example.com/a'}]
+    runner.run(request_provider, response_provider)
+    assert runner.values['attachments'] == ['uploads/a']
+
+
+@mock_dynamodb
+def test_runner_reused(monkeypatch):
+    """
+    Test a runner reused across requests stores each request's own fields
+    """
+
+    monkeypatch.setenv('REQUIRED_FIELDS', 'name')
+    monkeypatch.setenv('DYNAMODB_ENABLE', 'True')
+    monkeypatch.setenv('DYNAMODB_TABLE', 'new-table')
+    runner = DynamodbRunner()
+    runner.configure()
+    create_dynamodb_table('new-table')
+
+    for name in ('First', 'Second'):
+        payload = {'version': '1.0', 'body': {'name': name}}
+        runner.run(RequestProvider(payload), ResponseProvider(payload))
+        assert runner.values == {'name': name}
+        assert runner.fields == {'name': ''}
+
+    # A failed request does not leave its error behind for the next one
+    payload = {'version': '1.0', 'body': {}}
+    runner.run(RequestProvider(payload), ResponseProvider(payload))
+    assert runner.error_response['statusCode'] == 500
+    payload = {'version': '1.0', 'body': {'name': 'Third'}}
+    runner.run(RequestProvider(payload), ResponseProvider(payload))
+    assert not runner.error_response
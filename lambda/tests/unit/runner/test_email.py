@@ -159,10 +159,18 @@ def test_runner_enabled_and_configured_success(monkeypatch):
 
     result = runner.run(request_provider, response_provider)
     assert not runner.error_response
-    assert runner.fields == {
+    assert runner.values == {
         'name': 'My Name',
         'email': 'me@example.com',
         'subject': 'Test subject',
         'message': 'This is a test message'
     }
     assert result['ResponseMetadata']['HTTPStatusCode'] == 200
+
+    # Links to uploaded attachments are available to templates
+    request_provider.attachments = [
+        {'key': 'uploads/a', 'link': 'https://example.com/a'},
+        {'key': 'uploads/b', 'link': 'https://example.com/b'},
+    ]
+    runner.prepare(request_provider, response_provider)
+    assert runner.values['attachments'] == 'https://example.com/a\nhttps://example.com/b'
@@ -3,6 +3,7 @@ Runner unit tests
 """
 
 import os
+import time
 import pytest
 import httpretty
 
@@ -10,6 +11,7 @@ from app_handler.provider.request import RequestProvider
 from app_handler.provider.response import ResponseProvider
 from app_handler.runner.hcaptcha import HcaptchaRunner
 import tests.unit.service.hcaptcha_utils as utils
+from tests.unit.service.http_utils import StandinServer
 
 
 def test_runner_not_enabled(monkeypatch):
@@ -169,3 +171,72 @@ def test_runner_enabled_and_configured_service_success_validation_success(monkey
     response = runner.run(request_provider, response_provider)
     assert not runner.error_response
     assert response['status'] == 200
+
+
+def test_runner_hedging_configured(monkeypatch):
+    """
+    Test hedging settings are read when hedging is enabled
+    """
+
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'True')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    monkeypatch.setenv('HCAPTCHA_HEDGE_ENABLE', 'True')
+    monkeypatch.setenv('HCAPTCHA_HEDGE_PERCENTILE', '99')
+    monkeypatch.setenv('HCAPTCHA_HEDGE_DELAY_MS', '250')
+    runner = HcaptchaRunner()
+    runner.configure()
+
+    assert runner.hedge_enable == True
+    assert runner.hedge_percentile == 99
+    assert runner.hedge_delay == 0.25
+
+
+def test_runner_cancel(monkeypatch):
+    """
+    Test a started validation is cancelled without waiting for a slow siteverify response
+    """
+
+    server = StandinServer(lambda index, body: utils.standin_siteverify_response(delay=5))
+    try:
+        monkeypatch.setenv('HCAPTCHA_ENABLE', 'True')
+        monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+        monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+        monkeypatch.setenv('HCAPTCHA_VERIFY_URL', server.url)
+        monkeypatch.setenv('HCAPTCHA_RESPONSE_FIELD', 'h-captcha-response')
+        runner = HcaptchaRunner()
+        runner.configure()
+
+        payload = {'version': '1.0', 'body': {'h-captcha-response': 'abc'}}
+        runner.start(RequestProvider(payload), ResponseProvider(payload))
+        # Cancel once the request is being sent rather than still queued
+        while not runner.future.running():
+            time.sleep(0.001)
+        start = time.perf_counter()
+        runner.cancel()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+
+    assert elapsed < 2
+    assert runner.future is None
+    # Nothing left to cancel
+    runner.cancel()
+
+
+def test_runner_service_unreachable(monkeypatch):
+    """
+    Test an unreachable siteverify endpoint returns a service error
+    """
+
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'True')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    monkeypatch.setenv('HCAPTCHA_VERIFY_URL', 'http://127.0.0.1:9')
+    monkeypatch.setenv('HCAPTCHA_RESPONSE_FIELD', 'h-captcha-response')
+    runner = HcaptchaRunner()
+    runner.configure()
+
+    payload = {'version': '1.0', 'body': {'h-captcha-response': 'abc'}}
+    runner.run(RequestProvider(payload), ResponseProvider(payload))
+    assert runner.error_response['statusCode'] == 500
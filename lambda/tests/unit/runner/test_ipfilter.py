@@ -0,0 +1,130 @@
+"""
+Runner unit tests
+"""
+
+import logging
+import pathlib
+import pytest
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import ipfilter
+from app_handler.runner.ipfilter import IpFilterRunner
+from app_handler.utils import ip_index
+from app_handler.utils.ip_index import build_index, parse_networks
+
+
+def run_ipfilter(source_ip):
+    """
+    Configure and run IP filter runner for a v2 request from a source IP
+    """
+    payload = {'version': '2.0', 'body': {}, 'requestContext': {'http': {'sourceIp': source_ip}}}
+    if source_ip is None:
+        payload = {'body': {}}
+    runner = IpFilterRunner()
+    runner.configure()
+    action = runner.run(RequestProvider(payload), ResponseProvider(payload))
+    return runner, action
+
+
+@pytest.fixture(name='index_path')
+def fixture_index_path(monkeypatch, tmp_path):
+    """
+    Enable IP filter with a test index
+    """
+    path = tmp_path / 'ip_index.bin'
+    path.write_bytes(build_index(parse_networks('203.0.113.0/24'), parse_networks('203.0.113.8/30')))
+    monkeypatch.setattr(ipfilter, 'INDEXES', {})
+    monkeypatch.setenv('IPFILTER_ENABLE', 'True')
+    monkeypatch.setenv('IPFILTER_INDEX_PATH', str(path))
+    return path
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    Running should not produce any errors
+    """
+    runner, action = run_ipfilter('203.0.113.1')
+    assert runner.enable == False
+    assert action is None
+    assert not runner.error_response
+
+
+def test_packaged_index(monkeypatch, tmp_path):
+    """
+    Test the index built from the packaged lists is loaded by default
+    """
+    lists = pathlib.Path(ipfilter.__file__).parents[2] / 'ip_lists'
+    path = tmp_path / 'ip_index.bin'
+    ip_index.main([
+        '--deny', str(lists / 'deny.txt'),
+        '--allow', str(lists / 'allow.txt'),
+        '--output', str(path),
+    ])
+    monkeypatch.setattr(ipfilter, 'DEFAULT_PATH', path)
+    monkeypatch.setattr(ipfilter, 'INDEXES', {})
+    monkeypatch.setenv('IPFILTER_ENABLE', 'True')
+    runner, action = run_ipfilter('203.0.113.1')
+    assert action == 'allow'
+    assert str(ipfilter.DEFAULT_PATH) in ipfilter.INDEXES
+    assert not runner.error_response
+
+
+def test_deny(index_path, caplog):
+    """
+    Test denied IPs are rejected and allowed or unlisted IPs pass.
+    The source IP is logged as a redactable field only.
+    """
+    with caplog.at_level(logging.INFO):
+        runner, action = run_ipfilter('203.0.113.1')
+    assert action == 'deny'
+    assert runner.error_response['statusCode'] == 403
+    record = caplog.records[-1]
+    assert record.sourceIp == '203.0.113.1'
+    assert '203.0.113.1' not in record.getMessage()
+
+    assert run_ipfilter('203.0.113.9')[1] == 'allow'
+    assert run_ipfilter('198.51.100.1')[1] == 'allow'
+    assert ipfilter.INDEXES[str(index_path)] is run_ipfilter('198.51.100.1')[0].index
+
+
+def test_default_deny(index_path, monkeypatch):
+    """
+    Test unlisted and unparseable IPs use the default action
+    """
+    monkeypatch.setenv('IPFILTER_DEFAULT_ACTION', 'Deny')
+    assert run_ipfilter('198.51.100.1')[1] == 'deny'
+    assert run_ipfilter('203.0.113.9')[1] == 'allow'
+    assert run_ipfilter('not-an-ip')[1] == 'deny'
+
+
+def test_no_remote_ip(index_path):
+    """
+    Test direct invocations without a source IP are not filtered
+    """
+    runner, action = run_ipfilter(None)
+    assert action is None
+    assert not runner.error_response
+
+
+def test_invalid_default_action(index_path, monkeypatch):
+    """
+    Test unknown default actions fail configuration
+    """
+    monkeypatch.setenv('IPFILTER_DEFAULT_ACTION', 'block')
+    with pytest.raises(ValueError):
+        IpFilterRunner().configure()
+
+
+def test_missing_index(monkeypatch, tmp_path):
+    """
+    Test a missing index file fails configuration
+    """
+    monkeypatch.setattr(ipfilter, 'INDEXES', {})
+    monkeypatch.setenv('IPFILTER_ENABLE', 'True')
+    monkeypatch.setenv('IPFILTER_INDEX_PATH', str(tmp_path / 'missing.bin'))
+    with pytest.raises(ValueError) as exception:
+        IpFilterRunner().configure()
+
+    assert 'missing.bin' in str(exception.value)
@@ -0,0 +1,178 @@
+"""
+Runner unit tests
+"""
+
+import time
+import pytest
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import prefilter
+from app_handler.runner.prefilter import PrefilterRunner
+from app_handler.utils.signing import sign
+
+
+def run_prefilter(body, headers=None):
+    """
+    Configure and run prefilter runner against a request body
+    """
+    payload = {'version': '1.0', 'body': body, 'headers': headers}
+    runner = PrefilterRunner()
+    runner.configure()
+    rule = runner.run(RequestProvider(payload), ResponseProvider(payload))
+    return runner, rule
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    Running should not produce any errors
+    """
+    runner, rule = run_prefilter({'website': 'spam'})
+    assert runner.enable == False
+    assert rule is None
+    assert not runner.error_response
+
+
+def test_runner_enabled_no_rules(monkeypatch):
+    """
+    Test enabled runner without rules lets submissions through
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    runner, rule = run_prefilter({'message': 'Hello https://example.com'})
+    assert rule is None
+    assert not runner.error_response
+    assert runner.keywords is None
+
+
+def test_honeypot(monkeypatch):
+    """
+    Test a filled in honeypot field is rejected
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_HONEYPOT_FIELD', 'website')
+    monkeypatch.setattr(prefilter, 'COUNTERS', prefilter.Counter())
+
+    runner, rule = run_prefilter({'website': 'http://spam.example', 'message': 'a'})
+    assert rule == 'honeypot'
+    assert runner.error_response['statusCode'] == 400
+
+    runner, rule = run_prefilter({'website': '', 'message': 'a'})
+    assert rule is None
+    assert prefilter.COUNTERS == {'honeypot': 1, 'passed': 1}
+
+
+def test_timestamp(monkeypatch):
+    """
+    Test missing, forged and too recent timestamps are rejected
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_TIMESTAMP_FIELD', 'rendered')
+    monkeypatch.setenv('PREFILTER_TIMESTAMP_SECRET', 'secret')
+    monkeypatch.setenv('PREFILTER_MIN_FILL_SECONDS', '5')
+
+    assert run_prefilter({})[1] == 'timestamp'
+    assert run_prefilter({'rendered': sign('other', str(time.time() - 60))})[1] == 'timestamp'
+    assert run_prefilter({'rendered': sign('secret', 'abc')})[1] == 'timestamp'
+    assert run_prefilter({'rendered': sign('secret', str(time.time()))})[1] == 'fill_time'
+    assert run_prefilter({'rendered': sign('secret', str(time.time() - 60))})[1] is None
+
+
+def test_timestamp_max_age(monkeypatch):
+    """
+    Test timestamps older than the maximum age are rejected, unless there is no maximum
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_TIMESTAMP_FIELD', 'rendered')
+    monkeypatch.setenv('PREFILTER_TIMESTAMP_SECRET', 'secret')
+    monkeypatch.setenv('PREFILTER_MAX_AGE_SECONDS', '3600')
+
+    assert run_prefilter({'rendered': sign('secret', str(time.time() - 3500))})[1] is None
+    assert run_prefilter({'rendered': sign('secret', str(time.time() - 3700))})[1] == 'expired'
+
+    monkeypatch.setenv('PREFILTER_MAX_AGE_SECONDS', '0')
+    assert run_prefilter({'rendered': sign('secret', str(time.time() - 10**6))})[1] is None
+
+
+def test_timestamp_missing_secret(monkeypatch):
+    """
+    Test a timestamp field without a secret fails configuration
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_TIMESTAMP_FIELD', 'rendered')
+    runner = PrefilterRunner()
+    with pytest.raises(ValueError) as exception:
+        runner.configure()
+
+    assert 'PREFILTER_TIMESTAMP_SECRET' in str(exception.value)
+
+
+def test_field_length(monkeypatch):
+    """
+    Test overly long field values are rejected
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_MAX_FIELD_LENGTH', '10')
+    assert run_prefilter({'message': 'a' * 11})[1] == 'field_length'
+    assert run_prefilter({'message': 'a' * 10, 'items': ['a' * 2, 3]})[1] is None
+
+
+def test_url_count(monkeypatch):
+    """
+    Test too many links across all fields are rejected
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_MAX_URLS', '1')
+    assert run_prefilter({'message': 'see https://a.example', 'name': 'www.b.example'})[1] == 'url_count'
+    assert run_prefilter({'message': 'see HTTP://a.example'})[1] is None
+
+
+def test_keywords(monkeypatch):
+    """
+    Test blocked keywords are matched case-insensitively
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_BLOCKED_KEYWORDS', 'casino, cheap pills,c++')
+    runner, rule = run_prefilter({'message': 'Best CASINO bonus'})
+    assert rule == 'keyword'
+    assert runner.keywords.pattern.startswith('cheap\\ pills|')
+    assert run_prefilter({'message': 'I write C++'})[1] == 'keyword'
+    assert run_prefilter({'message': 'Hello'})[1] is None
+
+
+def test_list_values(monkeypatch):
+    """
+    Test values in JSON arrays and nested objects are checked like any other field
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_MAX_FIELD_LENGTH', '10')
+    monkeypatch.setenv('PREFILTER_MAX_URLS', '1')
+    monkeypatch.setenv('PREFILTER_BLOCKED_KEYWORDS', 'casino')
+
+    assert run_prefilter({'items': ['a', ['a' * 11]]})[1] == 'field_length'
+    assert run_prefilter({'links': ['www.a.io', ['www.b.io']]})[1] == 'url_count'
+    assert run_prefilter({'tags': ['hello', {'topic': 'Casino'}]})[1] == 'keyword'
+    assert run_prefilter({'tags': ['hello', {'topic': 'games'}]})[1] is None
+
+
+def test_repeated_form_keys(monkeypatch):
+    """
+    Test every value of a repeated form key is checked
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_BLOCKED_KEYWORDS', 'casino')
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    assert run_prefilter('tag=hello&tag=casino', headers)[1] == 'keyword'
+    assert run_prefilter('tag=hello&tag=games', headers)[1] is None
+
+
+def test_non_dict_content(monkeypatch):
+    """
+    Test non dictionary content is ignored
+    """
+    monkeypatch.setenv('PREFILTER_ENABLE', 'True')
+    monkeypatch.setenv('PREFILTER_HONEYPOT_FIELD', 'website')
+    runner, rule = run_prefilter('website')
+    assert rule is None
+    assert not runner.error_response
@@ -0,0 +1,136 @@
+"""
+Runner unit tests
+"""
+
+import logging
+import os
+import pytest
+from moto import mock_dynamodb
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import ratelimit
+from app_handler.runner.ratelimit import RateLimitRunner
+from tests.unit.service.aws_utils import create_dynamodb_counter_table
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+
+def run_ratelimit(source_ip='203.0.113.1'):
+    """
+    Configure and run rate limit runner for a v1 request from a source IP
+    """
+    payload = {'version': '1.0', 'body': {}, 'requestContext': {'identity': {'sourceIp': source_ip}}}
+    if source_ip is None:
+        payload = {'body': {}}
+    runner = RateLimitRunner()
+    runner.configure()
+    result = runner.run(RequestProvider(payload), ResponseProvider(payload))
+    return runner, result
+
+
+@pytest.fixture(autouse=True)
+def fixture_buckets(monkeypatch):
+    """
+    Start each test with empty local buckets
+    """
+    monkeypatch.setattr(ratelimit, 'BUCKETS', {})
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    Running should not produce any errors
+    """
+    runner, result = run_ratelimit()
+    assert runner.enable == False
+    assert result is None
+    assert not runner.error_response
+
+
+def test_local_limit(monkeypatch, caplog):
+    """
+    Test the local bucket rejects requests once empty, per IP.
+    The source IP is logged as a redactable field only.
+    """
+    monkeypatch.setenv('RATELIMIT_ENABLE', 'True')
+    monkeypatch.setenv('RATELIMIT_RATE', '0')
+    monkeypatch.setenv('RATELIMIT_BURST', '2')
+
+    assert run_ratelimit()[1] is None
+    assert run_ratelimit()[1] is None
+    with caplog.at_level(logging.INFO):
+        runner, result = run_ratelimit()
+    assert result == 'local'
+    assert runner.error_response['statusCode'] == 429
+    assert caplog.records[-1].getMessage() == 'Local rate limit exceeded'
+    assert caplog.records[-1].sourceIp
+    assert run_ratelimit('203.0.113.2')[1] is None
+    assert run_ratelimit(None)[1] is None
+
+
+def test_settings_change(monkeypatch):
+    """
+    Test changed settings start new local buckets
+    """
+    monkeypatch.setenv('RATELIMIT_ENABLE', 'True')
+    first = run_ratelimit()[0].buckets
+    assert run_ratelimit()[0].buckets is first
+    monkeypatch.setenv('RATELIMIT_BURST', '10')
+    assert run_ratelimit()[0].buckets is not first
+    assert len(ratelimit.BUCKETS) == 1
+
+
+@mock_dynamodb
+def test_global_limit(monkeypatch):
+    """
+    Test the shared counter is only consulted once the local bucket runs low
+    """
+    create_dynamodb_counter_table('counters')
+    monkeypatch.setenv('RATELIMIT_ENABLE', 'True')
+    monkeypatch.setenv('RATELIMIT_RATE', '0')
+    monkeypatch.setenv('RATELIMIT_BURST', '10')
+    monkeypatch.setenv('RATELIMIT_TABLE', 'counters')
+    monkeypatch.setenv('RATELIMIT_REMOTE_THRESHOLD', '9')
+    monkeypatch.setenv('RATELIMIT_GLOBAL_LIMIT', '3')
+
+    calls = []
+    increment = ratelimit.AwsService.increment_dynamodb_counter
+
+    def counting_increment(self, *args):
+        calls.append(args)
+        return increment(self, *args)
+
+    monkeypatch.setattr(ratelimit.AwsService, 'increment_dynamodb_counter', counting_increment)
+
+    # First request leaves 9 tokens, so no remote check
+    assert run_ratelimit()[1] is None
+    assert not calls
+    # Simulate other containers having counted requests in the same window
+    for _ in range(2):
+        runner = RateLimitRunner()
+        runner.configure()
+        assert not runner.exceeds_global_limit('203.0.113.1')
+
+    calls.clear()
+    assert run_ratelimit()[1] is None
+    runner, result = run_ratelimit()
+    assert result == 'global'
+    assert runner.error_response['statusCode'] == 429
+    assert len(calls) == 2
+    assert calls[0][1].startswith('ratelimit#203.0.113.1#')
+
+
+@mock_dynamodb
+def test_global_limit_fails_open(monkeypatch):
+    """
+    Test errors from the shared counter let requests through
+    """
+    monkeypatch.setenv('RATELIMIT_ENABLE', 'True')
+    monkeypatch.setenv('RATELIMIT_TABLE', 'missing-table')
+    monkeypatch.setenv('RATELIMIT_REMOTE_THRESHOLD', '10')
+
+    runner, result = run_ratelimit()
+    assert result is None
+    assert not runner.error_response
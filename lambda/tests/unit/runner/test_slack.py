@@ -166,10 +166,15 @@ def test_runner_enabled_and_configured_success(monkeypatch):
     utils.httpretty_register_slack_webhook_success()
 
     result = runner.run(request_provider, response_provider)
-    assert runner.fields == {'name': 'My Name', 'email': 'me@example.com'}
+    assert runner.values == {'name': 'My Name', 'email': 'me@example.com'}
     assert not runner.error_response
     assert result['status'] == 200
 
+    # Links to uploaded attachments are available to templates
+    request_provider.attachments = [{'key': 'uploads/a', 'link': 'https://example.com/a'}]
+    runner.prepare(request_provider, response_provider)
+    assert runner.values['attachments'] == 'https://example.com/a'
+
 
 def test_runner_enabled_and_configured_bad_json(monkeypatch):
     """
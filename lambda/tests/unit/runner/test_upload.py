@@ -0,0 +1,293 @@
+"""
+Runner unit tests
+"""
+
+import json
+import os
+import time
+import uuid
+import pytest
+from moto import mock_s3
+
+from app_handler.provider.request import RequestProvider
+from app_handler.provider.response import ResponseProvider
+from app_handler.runner import upload
+from app_handler.runner.upload import UploadRunner
+from app_handler.service.aws import AwsService
+from app_handler.utils.signing import sign
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+KEY = 'uploads/' + 'a' * 32
+SECRET = 'ticket-secret'
+
+
+def ticket(age:float = 0) -> str:
+    """
+    Upload ticket for a new form session, signed age seconds ago
+    """
+    return sign(SECRET, f'{uuid.uuid4().hex}.{int(time.time() - age)}')
+
+
+def configure_upload(monkeypatch):
+    """
+    Enable and configure the upload runner
+    """
+    monkeypatch.setenv('UPLOAD_ENABLE', 'True')
+    monkeypatch.setenv('UPLOAD_BUCKET', 'attachments')
+    monkeypatch.setenv('UPLOAD_CONTENT_TYPES', 'image/png, application/pdf')
+    monkeypatch.setenv('UPLOAD_MAX_BYTES', '1024')
+    monkeypatch.setenv('UPLOAD_MAX_FILES', '2')
+    monkeypatch.setenv('UPLOAD_TICKET_SECRET', SECRET)
+    runner = UploadRunner()
+    runner.configure()
+    return runner
+
+
+def test_runner_not_enabled():
+    """
+    Test runner is not enabled.
+    No request is an upload request and submissions have no attachments
+    """
+
+    payload = {'version': '1.0', 'path': '/uploads', 'body': {'attachments': 'x'}}
+    request_provider = RequestProvider(payload)
+
+    runner = UploadRunner()
+    runner.configure()
+    assert runner.enable == False
+    assert not runner.is_upload_request(request_provider)
+
+    runner.attach(request_provider, ResponseProvider(payload))
+    assert not runner.error_response
+    assert request_provider.attachments is None
+
+
+def test_upload_request(monkeypatch):
+    """
+    Test upload requests are matched by path, for v1 and v2 requests
+    """
+    runner = configure_upload(monkeypatch)
+
+    assert runner.is_upload_request(RequestProvider({'path': '/prod/uploads/', 'body': {}}))
+    assert runner.is_upload_request(RequestProvider({'rawPath': '/uploads', 'body': {}}))
+    assert not runner.is_upload_request(RequestProvider({'rawPath': '/', 'body': {}}))
+    assert not runner.is_upload_request(RequestProvider({'body': {}}))
+
+
+@mock_s3
+def test_presign(monkeypatch):
+    """
+    Test a presigned POST is issued for allowed content types and sizes
+    """
+    runner = configure_upload(monkeypatch)
+
+    payload = {
+        'version': '2.0',
+        'rawPath': '/uploads',
+        'body': {'contentType': 'image/PNG', 'size': '1024'},
+    }
+    session = ticket()
+    response = runner.presign(RequestProvider(payload), ResponseProvider(payload), session)
+    assert response['statusCode'] == 200
+    assert not runner.error_response
+
+    body = json.loads(response['body'])
+    assert runner.key_pattern.fullmatch(body['key'])
+    assert body['url'] == 'https://attachments.s3.amazonaws.com/'
+    assert body['fields']['key'] == body['key']
+    assert body['fields']['Content-Type'] == 'image/PNG'
+    assert body['expiresIn'] == 300
+    assert body['ticket'] == session
+
+
+def test_presign_rejected(monkeypatch):
+    """
+    Test disallowed content types and sizes are rejected before presigning
+    """
+    runner = configure_upload(monkeypatch)
+
+    for content, status in [
+        ({'contentType': 'text/html', 'size': 10}, 400),
+        ({'size': 10}, 400),
+        ({'contentType': 'image/png', 'size': 1025}, 413),
+        ({'contentType': 'image/png', 'size': 0}, 413),
+        ({'contentType': 'image/png', 'size': 'large'}, 413),
+        ({'contentType': 'image/png'}, 413),
+    ]:
+        payload = {'path': '/uploads', 'body': content}
+        response = runner.presign(RequestProvider(payload), ResponseProvider(payload), ticket())
+        assert response['statusCode'] == status
+        assert runner.error_response == response
+
+    payload = {'path': '/uploads', 'body': 'text'}
+    response = runner.presign(RequestProvider(payload), ResponseProvider(payload), None)
+    assert response['statusCode'] == 401
+
+
+def test_presign_ticket(monkeypatch):
+    """
+    Test requests without a valid, recent ticket are rejected before presigning
+    """
+    runner = configure_upload(monkeypatch)
+    monkeypatch.setattr(AwsService, 'create_presigned_post', lambda *args: {'url': '', 'fields': {}})
+
+    now = int(time.time())
+    for body_ticket, status in [
+        (ticket(), 200),
+        (ticket(age=1799), 200),
+        (ticket(age=1801), 401),
+        (ticket(age=-1801), 401),
+        (sign('other', f'a.{now}'), 401),
+        (sign(SECRET, str(now)), 401),
+        (sign(SECRET, 'a.b'), 401),
+        (None, 401),
+    ]:
+        payload = {'path': '/uploads', 'body': {'contentType': 'image/png', 'size': 10}}
+        response = runner.presign(RequestProvider(payload), ResponseProvider(payload), body_ticket)
+        assert response['statusCode'] == status
+
+
+def test_ticket_uses(monkeypatch):
+    """
+    Test a ticket covers as many uploads as a submission may reference, counted in the
+    container or through the dedup table
+    """
+    runner = configure_upload(monkeypatch)
+    monkeypatch.setattr(AwsService, 'create_presigned_post', lambda *args: {'url': '', 'fields': {}})
+    payload = {'path': '/uploads', 'body': {'contentType': 'image/png', 'size': 10}}
+
+    session = ticket()
+    statuses = [
+        runner.presign(RequestProvider(payload), ResponseProvider(payload), session)['statusCode']
+        for _ in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+
+    # The least recently used nonces are forgotten
+    monkeypatch.setattr(upload, 'MAX_TICKETS', 1)
+    upload.count_ticket_use('other')
+    assert upload.count_ticket_use(session.split('.')[0]) == 1
+
+    counts = iter([1, 3, None])
+    keys = []
+    def increment(_self, table, key, expires):
+        keys.append((table, key, expires))
+        return next(counts)
+
+    monkeypatch.setenv('DEDUP_TABLE', 'dedup')
+    monkeypatch.setattr(AwsService, 'increment_dynamodb_counter', increment)
+    runner.configure()
+    statuses = [
+        runner.presign(RequestProvider(payload), ResponseProvider(payload), session)['statusCode']
+        for _ in range(3)
+    ]
+    assert statuses == [200, 429, 500]
+    nonce, issued, _ = session.split('.')
+    assert keys[0] == ('dedup', f'upload#ticket#{nonce}', int(issued) + 1800)
+
+
+def test_issue_ticket(monkeypatch):
+    """
+    Test issued tickets are signed, hold a new nonce each and are read back until expired
+    """
+    runner = configure_upload(monkeypatch)
+
+    first, second = runner.issue_ticket(now=1000), runner.issue_ticket(now=1000)
+    assert first != second
+    nonce, expires = runner.read_ticket(first, now=1000)
+    assert first.startswith(f'{nonce}.1000.')
+    assert expires == 2800
+    assert runner.read_ticket(first, now=2801) is None
+
+
+def test_configure_verification(monkeypatch):
+    """
+    Test uploads can only be enabled with a ticket secret, and hCaptcha can open sessions
+    """
+    runner = configure_upload(monkeypatch)
+    assert runner.ticket_secret == SECRET
+    assert not runner.hcaptcha_runner.enable
+
+    monkeypatch.setenv('HCAPTCHA_ENABLE', 'True')
+    monkeypatch.setenv('HCAPTCHA_SITEKEY', 'abc')
+    monkeypatch.setenv('HCAPTCHA_SECRET', '123')
+    runner.configure()
+    assert runner.hcaptcha_runner.enable
+
+    monkeypatch.setenv('UPLOAD_TICKET_SECRET', '')
+    with pytest.raises(ValueError):
+        runner.configure()
+
+
+def test_presign_error(monkeypatch):
+    """
+    Test presigning errors are caught
+    """
+    runner = configure_upload(monkeypatch)
+    monkeypatch.setattr(AwsService, 'create_presigned_post', lambda *args: None)
+
+    payload = {'path': '/uploads', 'body': {'contentType': 'image/png', 'size': 10}}
+    response = runner.presign(RequestProvider(payload), ResponseProvider(payload), ticket())
+    assert response['statusCode'] == 500
+
+
+@mock_s3
+def test_attach(monkeypatch):
+    """
+    Test referenced keys are resolved into links, from lists or comma separated strings
+    """
+    runner = configure_upload(monkeypatch)
+
+    for attachments in [[KEY, 'uploads/' + 'b' * 32], f'{KEY}, uploads/{"b" * 32}']:
+        payload = {'body': {'attachments': attachments}}
+        request_provider = RequestProvider(payload)
+        runner.attach(request_provider, ResponseProvider(payload))
+        assert not runner.error_response
+        assert [attachment['key'] for attachment in request_provider.attachments] == [
+            KEY, 'uploads/' + 'b' * 32
+        ]
+        assert request_provider.attachments[0]['link'].startswith(
+            f'https://attachments.s3.amazonaws.com/{KEY}?'
+        )
+
+    # Submissions without attachments have none
+    payload = {'body': {}}
+    request_provider = RequestProvider(payload)
+    runner.attach(request_provider, ResponseProvider(payload))
+    assert request_provider.attachments == []
+
+
+def test_attach_rejected(monkeypatch):
+    """
+    Test keys the runner could not have issued, or too many keys, are rejected
+    """
+    runner = configure_upload(monkeypatch)
+
+    for attachments in [
+        'config/' + 'a' * 32,
+        'uploads/../config',
+        [KEY, KEY, KEY],
+        [1],
+        {'key': KEY},
+    ]:
+        payload = {'body': {'attachments': attachments}}
+        request_provider = RequestProvider(payload)
+        runner.attach(request_provider, ResponseProvider(payload))
+        assert runner.error_response['statusCode'] == 400
+        assert request_provider.attachments is None
+
+
+def test_attach_error(monkeypatch):
+    """
+    Test presigning errors are caught
+    """
+    runner = configure_upload(monkeypatch)
+    monkeypatch.setattr(AwsService, 'create_presigned_url', lambda *args: None)
+
+    payload = {'body': {'attachments': [KEY]}}
+    request_provider = RequestProvider(payload)
+    runner.attach(request_provider, ResponseProvider(payload))
+    assert runner.error_response['statusCode'] == 500
+    assert request_provider.attachments is None
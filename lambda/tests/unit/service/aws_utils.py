@@ -39,6 +39,18 @@ def put_secretsmanager_secret(name='test', value=None, binary=None):
         ssm.create_secret(Name=name, SecretBinary=binary)
 
 
+def put_s3_object(bucket='test', key='test', body=''):
+    """
+    Create mocked S3 bucket and object to later fetch using moto
+    """
+    s3 = boto3.client('s3')
+    s3.create_bucket(
+        Bucket=bucket,
+        CreateBucketConfiguration={'LocationConstraint': 'eu-west-2'},
+    )
+    s3.put_object(Bucket=bucket, Key=key, Body=body.encode())
+
+
 def create_dynamodb_table(name='test'):
     """
     Create dynamodb table
@@ -73,3 +85,26 @@ def create_dynamodb_table(name='test'):
         },
         TableClass='STANDARD'
     )
+
+
+def create_dynamodb_counter_table(name='counters'):
+    """
+    Create dynamodb table keyed on id only, e.g. for counters
+    """
+    dynamodb = boto3.client("dynamodb")
+    dynamodb.create_table(
+        TableName=name,
+        AttributeDefinitions=[
+            {
+                'AttributeName': 'id',
+                'AttributeType': 'S'
+            },
+        ],
+        KeySchema=[
+            {
+                'AttributeName': 'id',
+                'KeyType': 'HASH'
+            },
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
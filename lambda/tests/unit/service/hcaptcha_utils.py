@@ -76,3 +76,15 @@ def httpretty_register_hcaptcha_siteverify_error():
         "https://hcaptcha.com/siteverify",
         status=429,
     )
+
+def standin_siteverify_response(status=200, delay=0, success=True, keep_alive=True):
+    """
+    Response tuple for a local stand-in siteverify server
+    """
+    body = {
+        'success': success,
+        'credit': False,
+        'hostname': 'dummy-key-pass',
+        'challenge_ts': '2021-12-30T12:21:36.000Z'
+    }
+    return status, json.dumps(body), delay, keep_alive
@@ -3,6 +3,9 @@ Utility functions and constants for unit tests and integration tests
 """
 
 import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import httpretty
 
 # -----------------------------------------------
@@ -29,3 +32,95 @@ def httpretty_register_http_success_json_response():
         status=200,
         body=json.dumps(body)
     )
+
+# -----------------------------------------------
+# Local stand-in server utils
+# -----------------------------------------------
+
+class StandinServer:
+    """
+    Local HTTP server running in a background thread.
+    For each request, respond(index, body) returns a tuple of
+    (status, response body, delay in seconds, keep alive).
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.lock = threading.Lock()
+        self.released = threading.Event()
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Delegates each request to the stand-in respond function
+            """
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, avoid Nagle delays on keep-alive
+            disable_nagle_algorithm = True
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """
+                Handle POST request
+                """
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                with standin.lock:
+                    index = len(standin.requests)
+                    standin.requests.append(body)
+
+                status, response_body, delay, keep_alive = standin.respond(index, body)
+                # Delay can be cut short by releasing the server
+                standin.released.wait(delay)
+
+                encoded = response_body.encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(encoded)))
+                    self.end_headers()
+                    self.wfile.write(encoded)
+                except OSError:
+                    # Client cancelled the request
+                    pass
+                self.close_connection = not keep_alive
+
+            def log_message(self, *args):
+                """
+                Silence request logging
+                """
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={'poll_interval': 0.01},
+            daemon=True,
+        )
+        self.thread.start()
+
+    @property
+    def url(self):
+        """
+        Base URL of the running server
+        """
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def settle(self, quiet=0.05):
+        """
+        Wait until no request has been recorded for quiet seconds, so requests already
+        sent, e.g. by a client that was then cancelled, are recorded before inspection
+        """
+        count = None
+        while count != len(self.requests):
+            count = len(self.requests)
+            time.sleep(quiet)
+
+    def close(self):
+        """
+        Release any delayed responses and stop the server
+        """
+        self.released.set()
+        self.server.shutdown()
+        self.server.server_close()
@@ -3,7 +3,10 @@ Pytest unit tests for aws client for calls to SES and SSM Parameter Store
 """
 
 import os
-from moto import mock_ssm, mock_ses, mock_secretsmanager, mock_dynamodb
+import boto3
+import botocore.exceptions
+from moto import mock_ssm, mock_ses, mock_secretsmanager, mock_dynamodb, mock_s3
+from app_handler.service import aws as aws_service
 from app_handler.service.aws import AwsService
 import tests.unit.service.aws_utils as utils
 
@@ -88,3 +91,132 @@ def test_putting_item():
 
     # Assert putting to missing table exception is caught
     assert not aws.put_dynamodb_item('non-existent-table', {})
+
+
+@mock_s3
+def test_getting_s3_object():
+    """
+    Check an S3 object is returned as a string
+    """
+
+    utils.put_s3_object('config', 'lists/blocklist.txt', 'casino\n')
+
+    aws = AwsService()
+    assert aws.get_s3_object('config', 'lists/blocklist.txt') == 'casino\n'
+
+    # Assert missing objects return nothing
+    assert aws.get_s3_object('config', 'missing.txt') is None
+
+
+@mock_s3
+def test_putting_s3_object():
+    """
+    Check bytes are stored as an S3 object
+    """
+
+    utils.put_s3_object('corpus', 'placeholder')
+
+    aws = AwsService()
+    assert aws.put_s3_object('corpus', 'events.ndjson.gz', b'abc')
+    assert aws.get_s3_object('corpus', 'events.ndjson.gz') == 'abc'
+
+    # Assert missing buckets exceptions are caught
+    assert not aws.put_s3_object('missing', 'events.ndjson.gz', b'abc')
+
+
+@mock_s3
+def test_presigning_s3_upload():
+    """
+    Check uploads are presigned for a fixed key, content type and size
+    """
+
+    aws = AwsService()
+    upload = aws.create_presigned_post('uploads', 'uploads/a.png', 'image/png', 1024, 300)
+    assert upload['url'] == 'https://uploads.s3.amazonaws.com/'
+    assert upload['fields']['key'] == 'uploads/a.png'
+    assert upload['fields']['Content-Type'] == 'image/png'
+    assert 'policy' in upload['fields']
+
+    link = aws.create_presigned_url('uploads', 'uploads/a.png', 60)
+    assert link.startswith('https://uploads.s3.amazonaws.com/uploads/a.png?')
+    assert 'Expires=' in link or 'X-Amz-Expires=60' in link
+
+
+@mock_s3
+def test_presigning_without_credentials(monkeypatch):
+    """
+    Check presigning errors are caught
+    """
+
+    def fail(*args, **kwargs):
+        raise botocore.exceptions.ClientError({'Error': {'Code': 'AccessDenied'}}, 'PostObject')
+
+    aws = AwsService()
+    monkeypatch.setattr(aws_service.get_client('s3'), 'generate_presigned_post', fail)
+    assert aws.create_presigned_post('uploads', 'uploads/a.png', 'image/png', 1024, 300) is None
+
+    monkeypatch.setattr(boto3.session.Session, 'get_credentials', lambda self: None)
+    assert aws.create_presigned_post('uploads', 'uploads/a.png', 'image/png', 1024, 300) is None
+
+    def fail_link(*args, **kwargs):
+        raise botocore.exceptions.NoCredentialsError()
+
+    monkeypatch.setattr(aws_service.get_client('s3'), 'generate_presigned_url', fail_link)
+    assert aws.create_presigned_url('uploads', 'uploads/a.png', 60) is None
+
+
+@mock_dynamodb
+def test_incrementing_counter():
+    """
+    Check counters are incremented atomically and keep their first expiry time
+    """
+
+    utils.create_dynamodb_counter_table('counters')
+
+    aws = AwsService()
+    assert aws.increment_dynamodb_counter('counters', 'a', 100) == 1
+    assert aws.increment_dynamodb_counter('counters', 'a', 200) == 2
+    assert aws.increment_dynamodb_counter('counters', 'b', 100) == 1
+
+    item = aws.dynamodb.Table('counters').get_item(Key={'id': 'a'})['Item']
+    assert item['expires'] == 100
+
+    # Assert incrementing in a missing table exception is caught
+    assert aws.increment_dynamodb_counter('non-existent-table', 'a', 100) is None
+
+
+@mock_dynamodb
+def test_dynamodb_records():
+    """
+    Check conditional puts, reads and deletes of records
+    """
+
+    utils.create_dynamodb_counter_table('records')
+
+    aws = AwsService()
+    assert aws.put_dynamodb_record('records', {'id': 'a', 'value': 1}, if_absent=True) is True
+    assert aws.put_dynamodb_record('records', {'id': 'a', 'value': 2}, if_absent=True) is False
+    assert aws.get_dynamodb_record('records', 'a')['value'] == 1
+    # Expired items not yet removed by TTL deletion count as absent
+    assert aws.put_dynamodb_record('records', {'id': 'b', 'expires': 1}, if_absent=True) is True
+    assert aws.put_dynamodb_record('records', {'id': 'b', 'value': 2}, if_absent=True) is True
+    assert aws.put_dynamodb_record('records', {'id': 'b', 'value': 3}, if_absent=True) is False
+    assert aws.put_dynamodb_record('records', {'id': 'a', 'value': 3}) is True
+    assert aws.get_dynamodb_record('records', 'a')['value'] == 3
+    assert aws.delete_dynamodb_record('records', 'a')
+    assert aws.get_dynamodb_record('records', 'a') is None
+
+    # Assert missing table exceptions are caught
+    assert aws.put_dynamodb_record('non-existent-table', {'id': 'a'}) is None
+    assert aws.get_dynamodb_record('non-existent-table', 'a') is None
+    assert aws.delete_dynamodb_record('non-existent-table', 'a') is None
+
+
+def test_clients_reused():
+    """
+    Check clients are created once and shared across service instances
+    """
+    first = AwsService()
+    second = AwsService()
+    assert first.ses is second.ses
+    assert first.dynamodb is second.dynamodb
@@ -2,10 +2,27 @@
 Pytest unit tests for hcaptcha client
 """
 
+import random
+import time
+from concurrent.futures import wait
 import pytest
 import httpretty
+from app_handler.service import hcaptcha
 from app_handler.service.hcaptcha import HcaptchaService
+from app_handler.service.http import get_latency_name
+from app_handler.utils.executor import submit
+from app_handler.utils.histogram import HISTOGRAMS
 import tests.unit.service.hcaptcha_utils as utils
+from tests.unit.service.http_utils import StandinServer
+
+
+@pytest.fixture(autouse=True)
+def fixture_hedge_budget(monkeypatch):
+    """
+    Start each test with a full hedging budget
+    """
+    monkeypatch.setitem(hcaptcha.HEDGE_BUDGET, 'tokens', hcaptcha.HEDGE_BURST)
+
 
 def test_missing_args():
     """
@@ -28,12 +45,12 @@ def test_service_error():
     utils.httpretty_register_hcaptcha_siteverify_error()
 
     # Initialise client
-    hcaptcha = HcaptchaService('abc', '123')
+    hcaptcha_service = HcaptchaService('abc', '123')
 
     # Call remote method (intercepted by httpretty) and except exception
 
-    response = hcaptcha.validate('abc', '123')
-    assert not hcaptcha.success
+    response = hcaptcha_service.validate('abc', '123')
+    assert not hcaptcha_service.success
     assert response['status'] == 429
 
 @httpretty.activate(allow_net_connect=False)
@@ -45,13 +62,13 @@ def test_validation_success():
     utils.httpretty_register_hcaptcha_siteverify_success()
 
     # Initialise client
-    hcaptcha = HcaptchaService('abc', '123')
+    hcaptcha_service = HcaptchaService('abc', '123')
 
     # Perform validation check
-    response = hcaptcha.validate('abc', '127.0.0.1')
-    errors = hcaptcha.error_codes
+    response = hcaptcha_service.validate('abc', '127.0.0.1')
+    errors = hcaptcha_service.error_codes
     assert response['status'] == 200
-    assert hcaptcha.success is True
+    assert hcaptcha_service.success is True
     assert len(errors) == 0
 
 @httpretty.activate(allow_net_connect=False)
@@ -64,11 +81,203 @@ def test_validation_failure():
     utils.httpretty_register_hcaptcha_siteverify_failure()
 
     # Initialise client
-    hcaptcha = HcaptchaService('abc', '123')
+    hcaptcha_service = HcaptchaService('abc', '123')
 
     # Perform validation check
-    response = hcaptcha.validate('abc', '127.0.0.1')
-    errors = hcaptcha.error_codes
+    response = hcaptcha_service.validate('abc', '127.0.0.1')
+    errors = hcaptcha_service.error_codes
     assert response['status'] == 200
-    assert hcaptcha.success is False
+    assert hcaptcha_service.success is False
     assert len(errors) > 0
+
+
+def test_hedged_slow_first_request():
+    """
+    Verify a slow first request is hedged and the fast second answer is used
+    """
+    HISTOGRAMS.clear()
+
+    def respond(index, _):
+        return utils.standin_siteverify_response(delay=5 if index == 0 else 0)
+
+    server = StandinServer(respond)
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 0.05)
+        start = time.perf_counter()
+        response = hcaptcha_service.validate('abc', '127.0.0.1')
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+
+    assert response['status'] == 200
+    assert hcaptcha_service.success is True
+    assert len(server.requests) == 2
+    assert elapsed < 2
+    # The cancelled first request is recorded as lasting at least until it was cancelled
+    histogram = HISTOGRAMS.recent(get_latency_name(server.url.split('/')[2]))
+    assert histogram.total == 2
+    assert histogram.percentile(100) >= 0.05
+
+
+def test_hedged_budget(monkeypatch):
+    """
+    Verify no hedged request is sent once the hedging budget is spent, each validation
+    earning a fraction of one
+    """
+    HISTOGRAMS.clear()
+    monkeypatch.setitem(hcaptcha.HEDGE_BUDGET, 'tokens', 0)
+
+    server = StandinServer(lambda index, body: utils.standin_siteverify_response(delay=0.2))
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 0.05)
+        response = hcaptcha_service.validate('abc')
+    finally:
+        server.close()
+
+    assert response['status'] == 200
+    assert len(server.requests) == 1
+    assert hcaptcha.HEDGE_BUDGET['tokens'] == hcaptcha.HEDGE_FRACTION
+
+    hcaptcha.HEDGE_BUDGET['tokens'] = hcaptcha.HEDGE_BURST
+    hcaptcha.earn_hedge()
+    assert hcaptcha.HEDGE_BUDGET['tokens'] == hcaptcha.HEDGE_BURST
+
+
+def test_hedged_fast_first_request():
+    """
+    Verify no hedged request is sent when the first answers within the delay
+    """
+    HISTOGRAMS.clear()
+
+    server = StandinServer(lambda index, body: utils.standin_siteverify_response())
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 1)
+        response = hcaptcha_service.validate('abc')
+    finally:
+        server.close()
+
+    assert response['status'] == 200
+    assert len(server.requests) == 1
+    assert HISTOGRAMS.recent(get_latency_name(server.url.split('/')[2])).total == 1
+
+
+def test_hedged_first_request_error():
+    """
+    Verify an error from the first request waits for the hedged request's valid answer
+    """
+    HISTOGRAMS.clear()
+
+    def respond(index, _):
+        if index == 0:
+            return 500, '', 0.2, True
+        return utils.standin_siteverify_response(delay=0.3)
+
+    server = StandinServer(respond)
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 0.05)
+        response = hcaptcha_service.validate('abc')
+    finally:
+        server.close()
+
+    assert response['status'] == 200
+    assert hcaptcha_service.success is True
+    assert len(server.requests) == 2
+
+
+def test_hedged_first_request_failure():
+    """
+    Verify a failed validation from the first request waits for the hedged request's success,
+    and is used when the hedged request fails too
+    """
+    HISTOGRAMS.clear()
+
+    for second_success in [True, False]:
+        def respond(index, _, second_success=second_success):
+            if index == 0:
+                return utils.standin_siteverify_response(delay=0.2, success=False)
+            return utils.standin_siteverify_response(delay=0.3, success=second_success)
+
+        server = StandinServer(respond)
+        try:
+            hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 0.05)
+            response = hcaptcha_service.validate('abc')
+        finally:
+            server.close()
+
+        assert response['status'] == 200
+        assert hcaptcha_service.success is second_success
+        assert len(server.requests) == 2
+
+
+def test_hedged_timeout(monkeypatch):
+    """
+    Verify hedged requests give up once the request timeout has passed
+    """
+    HISTOGRAMS.clear()
+    monkeypatch.setattr(hcaptcha, 'get_timeout', lambda host: 0.2)
+
+    server = StandinServer(lambda index, body: utils.standin_siteverify_response(delay=5))
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 95, 0.05)
+        start = time.perf_counter()
+        response = hcaptcha_service.validate('abc')
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+
+    assert response['status'] is None
+    assert not hcaptcha_service.success
+    assert elapsed < 2
+
+
+def test_hedged_busy_executor():
+    """
+    Verify validations running on every shared worker can still send hedged requests
+    """
+    HISTOGRAMS.clear()
+
+    def respond(index, _):
+        return utils.standin_siteverify_response(delay=0.3 if index < 4 else 0)
+
+    server = StandinServer(respond)
+    try:
+        services = [HcaptchaService('abc', '123', server.url, 95, 0.05) for _ in range(4)]
+        futures = [submit(service.validate, 'abc') for service in services]
+        done, _ = wait(futures, timeout=5)
+    finally:
+        server.close()
+
+    assert len(done) == 4
+    assert all(future.result()['status'] == 200 for future in futures)
+
+
+def test_hedged_random_delays():
+    """
+    Verify hedging against a stand-in with random delays learns its delay from the latency histogram
+    """
+    HISTOGRAMS.clear()
+    generator = random.Random(1)
+    slow = []
+
+    def respond(index, _):
+        # Mostly fast, occasionally very slow responses, never two slow in a row
+        if generator.random() < 0.1 and index - 1 not in slow:
+            slow.append(index)
+            return utils.standin_siteverify_response(delay=2)
+        return utils.standin_siteverify_response(delay=generator.uniform(0, 0.02))
+
+    server = StandinServer(respond)
+    try:
+        hcaptcha_service = HcaptchaService('abc', '123', server.url, 90, 0.05)
+        for _ in range(hcaptcha.HEDGE_MIN_SAMPLES + 10):
+            start = time.perf_counter()
+            response = hcaptcha_service.validate('abc')
+            assert response['status'] == 200
+            assert time.perf_counter() - start < 1.5
+    finally:
+        server.close()
+
+    assert slow
+    histogram = HISTOGRAMS.recent(get_latency_name(server.url.split('/')[2]))
+    assert histogram.total >= hcaptcha.HEDGE_MIN_SAMPLES
+    assert hcaptcha_service.get_hedge_delay() < 0.5
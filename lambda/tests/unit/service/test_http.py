@@ -4,7 +4,8 @@ Pytest unit tests for http client
 
 import httpretty
 import pytest
-from app_handler.service.http import HttpService
+from app_handler.service.http import HttpService, get_latency_name
+from app_handler.utils.histogram import HISTOGRAMS
 import tests.unit.service.http_utils as utils
 
 http = HttpService()
@@ -59,3 +60,41 @@ def test_http_unreachable():
 
     response = http.post_json('http://a', {'a':'b'})
     assert response['status'] is None
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_http_json_body():
+    """
+    Test JSON strings are compacted, bytes sent as they are and other encodings honoured
+    """
+    utils.httpretty_register_http_success_json_response()
+    http.post_json('https://example.com/json', '{"a": "é"}')
+    assert httpretty.last_request().body == '{"a":"é"}'.encode()
+    http.post_json('https://example.com/json', b'{"b": 1}')
+    assert httpretty.last_request().body == b'{"b": 1}'
+    http.post_json('https://example.com/json', {'a': 'é'}, 'latin-1')
+    assert httpretty.last_request().body == '{"a":"é"}'.encode('latin-1')
+
+
+def test_http_cancelled():
+    """
+    Test a request cancelled before it is sent is never sent
+    """
+
+    http_service = HttpService()
+    http_service.cancel()
+    response = http_service.post_urlencoded('http://127.0.0.1:9', {'a': 'b'})
+    assert response['status'] is None
+
+
+@httpretty.activate(allow_net_connect=False)
+def test_http_latency_recorded_once():
+    """
+    Test a completed request is recorded once, cancelling it afterwards adds no sample
+    """
+    HISTOGRAMS.clear()
+    utils.httpretty_register_http_success_json_response()
+    http_service = HttpService()
+    assert http_service.post_json('https://example.com/json', {'test': 'a'})['status'] == 200
+    http_service.cancel()
+    assert HISTOGRAMS.recent(get_latency_name('example.com')).total == 1
@@ -0,0 +1,234 @@
+"""
+Pytest unit tests for HTTP connection pool
+"""
+
+import http.client
+import json
+import socket
+
+import pytest
+from app_handler.service.http import (
+    DEFAULT_TIMEOUT,
+    TIMEOUT_MIN,
+    TIMEOUT_MIN_SAMPLES,
+    TIMEOUT_MULTIPLIER,
+    HttpService,
+    get_latency_name,
+    get_timeout,
+)
+from app_handler.service.http_pool import ConnectionPool, POOL, RESOLVED, create_connection
+from app_handler.utils.histogram import HISTOGRAMS
+from app_handler.utils.tracing import Trace
+from tests.unit.service.http_utils import StandinServer
+
+
+def test_acquire_release():
+    """
+    Test released connections are reused and excess connections are closed
+    """
+    pool = ConnectionPool(max_idle=1)
+    first, reused = pool.acquire('https', 'example.com')
+    assert not reused
+    second, _ = pool.acquire('http', 'example.com')
+
+    pool.release('https', 'example.com', first)
+    pool.release('https', 'example.com', second)
+
+    connection, reused = pool.acquire('https', 'example.com')
+    assert reused
+    assert connection is first
+
+    pool.release('https', 'example.com', connection)
+    pool.clear()
+    assert not pool.idle
+
+
+def test_keep_alive_reuse():
+    """
+    Test consecutive requests to the same host reuse a pooled connection
+    """
+    server = StandinServer(lambda index, body: (200, '{}', 0, True))
+    try:
+        HttpService().post_json(f'{server.url}/a', {})
+        http_service = HttpService()
+        response = http_service.post_json(f'{server.url}/b', {})
+    finally:
+        server.close()
+        POOL.clear()
+
+    assert response['status'] == 200
+    assert len(server.requests) == 2
+
+
+def test_stale_connection_retry():
+    """
+    Test a pooled connection closed by the server is retried on a new connection
+    """
+    server = StandinServer(lambda index, body: (200, '{"index": %d}' % index, 0, False))
+    try:
+        HttpService().post_json(server.url, {})
+        response = HttpService().post_json(server.url, {})
+    finally:
+        server.close()
+        POOL.clear()
+
+    assert response['status'] == 200
+    assert response['json'] == {'index': 1}
+
+
+def test_error_status():
+    """
+    Test error status codes are returned with their body
+    """
+    server = StandinServer(lambda index, body: (503, '{"error": "busy"}', 0, True))
+    try:
+        response = HttpService().post_urlencoded(server.url, {'a': 'b'})
+    finally:
+        server.close()
+        POOL.clear()
+
+    assert response['status'] == 503
+    assert response['json'] == {'error': 'busy'}
+
+
+def test_cancel_idle():
+    """
+    Test cancelling a service without an active connection is a no-op
+    """
+    http_service = HttpService()
+    http_service.cancel()
+    assert http_service.cancelled
+
+
+def test_cancel_closed_socket():
+    """
+    Test cancelling a connection whose socket is already closed is handled
+    """
+    closed = socket.socket()
+    closed.close()
+    http_service = HttpService()
+    http_service.connection = http.client.HTTPConnection('example.com')
+    http_service.connection.sock = closed
+    http_service.cancel()
+    assert http_service.cancelled
+
+
+def test_adaptive_timeout():
+    """
+    Test timeouts follow the host's recent latencies once enough are known
+    """
+    HISTOGRAMS.clear()
+    assert get_timeout('example.com') == DEFAULT_TIMEOUT
+
+    for _ in range(TIMEOUT_MIN_SAMPLES):
+        HISTOGRAMS.record(get_latency_name('example.com'), 0.5)
+    assert get_timeout('example.com') == 0.5 * TIMEOUT_MULTIPLIER
+
+    for _ in range(TIMEOUT_MIN_SAMPLES):
+        HISTOGRAMS.record(get_latency_name('fast.example.com'), 0.001)
+    assert get_timeout('fast.example.com') == TIMEOUT_MIN
+    HISTOGRAMS.clear()
+
+
+def test_reused_connection_timeout():
+    """
+    Test requests record host latency and reused connections take the current timeout
+    """
+    HISTOGRAMS.clear()
+    server = StandinServer(lambda index, body: (200, '{}', 0, True))
+    host = server.url.split('/')[2]
+    try:
+        HttpService().post_json(server.url, {})
+        connection, reused = POOL.acquire('http', host, 3)
+        assert reused
+        assert connection.sock.gettimeout() == 3
+        POOL.release('http', host, connection)
+    finally:
+        server.close()
+        POOL.clear()
+
+    assert HISTOGRAMS.recent(get_latency_name(host)).total == 1
+
+
+def test_traced_phases(monkeypatch, capsys):
+    """
+    Test HTTP spans split connect, DNS and TCP from server time and annotate reuse and retries
+    """
+    monkeypatch.setenv('TRACE_ENABLE', 'true')
+    server = StandinServer(lambda index, body: (200, '{}', 0, index != 1))
+    try:
+        with Trace('handler'):
+            HttpService().post_json(server.url, {})
+            HttpService().post_json(server.url, {})
+            HttpService().post_json(server.url, {})
+    finally:
+        server.close()
+        POOL.clear()
+
+    first, second, third = json.loads(capsys.readouterr().out)['trace']['children']
+    assert [child['name'] for child in first['children']] == [
+        'connect', 'send', 'first_byte', 'read'
+    ]
+    assert [child['name'] for child in first['children'][0]['children']] == ['dns', 'tcp']
+    assert first['annotations'] == {'host': server.url.split('/')[2], 'reused': False,
+                                    'retries': 0, 'status': 200}
+    assert second['annotations']['reused'] is True
+    # Second response closed the connection, so the third opens a new one
+    assert third['annotations']['reused'] is False
+
+
+def test_create_connection_fallback(monkeypatch):
+    """
+    Test each resolved address is tried until one connects
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+
+    def getaddrinfo(*_):
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', closed_port)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port)),
+        ]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    try:
+        with create_connection(('example.com', port), 1) as sock:
+            assert sock.getpeername()[1] == port
+
+        # Cached addresses are reused, then forgotten once none connect
+        assert ('example.com', port) in RESOLVED
+        monkeypatch.setattr(socket, 'getaddrinfo', lambda *args: getaddrinfo(*args)[:1])
+        RESOLVED[('example.com', port)] = (RESOLVED[('example.com', port)][0], getaddrinfo()[:1])
+        with pytest.raises(OSError):
+            create_connection(('example.com', port), 1)
+        assert ('example.com', port) not in RESOLVED
+    finally:
+        listener.close()
+        RESOLVED.clear()
+
+
+def test_preconnect():
+    """
+    Test preconnected connections are pooled and used by the first request
+    """
+    server = StandinServer(lambda index, body: (200, '{}', 0, True))
+    host = server.url.split('/')[2]
+    try:
+        assert POOL.preconnect('http', host, 1)
+        assert not POOL.preconnect('http', host, 1)
+        response = HttpService().post_json(f'{server.url}/a', {})
+        assert response['status'] == 200
+    finally:
+        server.close()
+        POOL.clear()
+
+    # Failed connections are closed rather than pooled
+    with pytest.raises(OSError):
+        POOL.preconnect('http', host, 1)
+    assert not POOL.idle
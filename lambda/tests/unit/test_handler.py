@@ -0,0 +1,71 @@
+"""
+Lambda handler unit tests
+"""
+
+import importlib
+import app
+from app import handler
+from app_handler.utils import coldstart
+
+SCHEDULED_EVENT = {
+    'version': '0',
+    'id': '53dc4d37-cffa-4f76-80c9-8b7d4a4d2eaa',
+    'detail-type': 'Scheduled Event',
+    'source': 'aws.events',
+    'account': '123456789012',
+    'time': '2015-10-08T16:53:06Z',
+    'region': 'eu-west-2',
+    'resources': ['arn:aws:events:eu-west-2:123456789012:rule/keep-warm'],
+    'detail': {},
+}
+
+
+def test_keep_warm(monkeypatch):
+    """
+    Test scheduled events are answered with init timings, flagging the first invocation
+    """
+    monkeypatch.setattr(coldstart, 'INVOCATIONS', 0)
+    response = handler(SCHEDULED_EVENT, None)
+    assert response['warm'] is True
+    assert response['coldStart'] is True
+    assert 'imports' in response['init']
+
+    assert handler(SCHEDULED_EVENT, None)['coldStart'] is False
+    assert coldstart.INVOCATIONS == 2
+
+
+def test_request():
+    """
+    Test other events are processed as submissions
+    """
+    assert handler('test', None) == {'message': 'Message received', 'statusCode': 200}
+    assert not coldstart.is_keep_warm({'source': 'aws.events', 'detail-type': 'Other'})
+
+
+def test_phase(monkeypatch):
+    """
+    Test init phases are timed in milliseconds
+    """
+    monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {})
+    with coldstart.phase('clients'):
+        pass
+    assert coldstart.INIT_TIMINGS['clients'] >= 0
+
+
+def test_prime(monkeypatch):
+    """
+    Test priming runs during init and again on keep-warm events when enabled
+    """
+    monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {})
+    monkeypatch.setenv('PRIME_ENABLE', 'true')
+    try:
+        importlib.reload(app)
+        assert 'config' in coldstart.INIT_TIMINGS
+
+        calls = []
+        monkeypatch.setattr(app, 'prime', lambda record=True: calls.append(record))
+        assert app.handler(SCHEDULED_EVENT, None)['warm'] is True
+        assert calls == [False]
+    finally:
+        monkeypatch.delenv('PRIME_ENABLE')
+        importlib.reload(app)
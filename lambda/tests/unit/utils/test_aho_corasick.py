@@ -0,0 +1,35 @@
+"""
+Aho-Corasick matcher unit tests
+"""
+
+from app_handler.utils.aho_corasick import AhoCorasick
+
+def test_empty_matcher():
+    """
+    Test a matcher without patterns never matches
+    """
+    matcher = AhoCorasick(['', ''])
+    assert matcher.size == 0
+    assert matcher.search('anything') is None
+
+
+def test_matches():
+    """
+    Test patterns are found anywhere in the text, case-insensitively
+    """
+    matcher = AhoCorasick(['he', 'she', 'his', 'hers', 'spam.example', 'she'])
+    assert matcher.size == 5
+    assert matcher.search('USHERS') == 'she'
+    assert matcher.search('ahis') == 'his'
+    assert matcher.search('visit http://SPAM.example/x') == 'spam.example'
+    assert matcher.search('hxs') is None
+
+
+def test_suffix_matches():
+    """
+    Test patterns that are suffixes of partially matched patterns are found
+    """
+    matcher = AhoCorasick(['abcd', 'bc'])
+    assert matcher.search('xabcx') == 'bc'
+    matcher = AhoCorasick(['aab', 'ab'])
+    assert matcher.search('aaab') == 'aab'
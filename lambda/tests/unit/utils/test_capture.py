@@ -0,0 +1,145 @@
+"""
+Event capture unit tests
+"""
+
+import base64
+import gzip
+import json
+import os
+import boto3
+from moto import mock_s3
+
+from app_handler.utils import capture
+from app_handler.utils.capture import SOURCE_IP, sanitise, scrub
+from tests.unit.service import aws_utils
+
+# Set boto/moto client default values
+os.environ['AWS_DEFAULT_REGION'] = 'eu-west-2'
+
+EVENT = {
+    'version': '2.0',
+    'headers': {'Content-Type': 'application/json', 'X-Forwarded-For': '203.0.113.9'},
+    'multiValueHeaders': {'content-type': ['application/json']},
+    'requestContext': {'http': {'method': 'POST', 'sourceIp': '203.0.113.9'}},
+    'body': '{"name": "My Name", "age": 42, "subscribed": true, "tags": ["a", "bc"]}',
+    'isBase64Encoded': False,
+}
+
+
+def read_records(path) -> list:
+    """
+    Records of a gzip compressed NDJSON corpus file
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_scrub():
+    """
+    Test values are replaced by placeholders keeping structure, types and sizes
+    """
+    assert scrub({'Name': 'abc', 'count': 3, 'ratio': 0.5, 'ok': True, 'none': None}) == {
+        'Name': 'xxx', 'count': 0, 'ratio': 0.0, 'ok': True, 'none': None,
+    }
+    assert scrub('secret') == 'xxxxxx'
+
+
+def test_sanitise_json():
+    """
+    Test JSON events keep their shape without any personal data
+    """
+    sanitised = sanitise(EVENT)
+    assert sanitised['version'] == '2.0'
+    assert sanitised['headers'] == {'Content-Type': 'application/json', 'X-Forwarded-For': 'x' * 11}
+    assert sanitised['multiValueHeaders'] == {'content-type': ['application/json']}
+    assert sanitised['requestContext'] == {'http': {'method': 'POST', 'sourceIp': SOURCE_IP}}
+    assert json.loads(sanitised['body']) == {
+        'name': 'xxxxxxx', 'age': 0, 'subscribed': True, 'tags': ['x', 'xx'],
+    }
+    assert 'My Name' not in json.dumps(sanitised)
+
+
+def test_sanitise_bodies():
+    """
+    Test form, base64, unknown and invalid bodies are scrubbed
+    """
+    form = {
+        'headers': {'content-type': 'application/x-www-form-urlencoded'},
+        'body': base64.b64encode(b'name=My+Name&empty=').decode(),
+        'isBase64Encoded': True,
+    }
+    assert base64.b64decode(sanitise(form)['body']) == b'name=xxxxxxx&empty='
+
+    assert sanitise({'headers': {'content-type': 'text/plain'}, 'body': 'hello'})['body'] == 'xxxxx'
+    invalid = {'headers': {'content-type': 'application/json'}, 'body': '{"a": '}
+    assert sanitise(invalid)['body'] == 'xxxxxx'
+    assert sanitise({'body': {'name': 'abc'}})['body'] == {'name': 'xxx'}
+    # Load balancer events with multi-value headers only
+    multi_value = {
+        'multiValueHeaders': {'Content-Type': ['application/json']},
+        'body': '{"a": "b"}',
+    }
+    assert json.loads(sanitise(multi_value)['body']) == {'a': 'x'}
+    assert sanitise('test') == 'xxxx'
+
+
+def test_disabled(monkeypatch, tmp_path):
+    """
+    Test nothing is captured by default or when not sampled
+    """
+    monkeypatch.setattr(capture, 'BUFFER', [])
+    monkeypatch.setenv('CAPTURE_DIR', str(tmp_path))
+    capture.capture(EVENT, {'statusCode': 200})
+
+    monkeypatch.setenv('CAPTURE_ENABLE', 'true')
+    monkeypatch.setenv('CAPTURE_SAMPLE_RATE', '0')
+    capture.capture(EVENT, {'statusCode': 200})
+    assert not capture.BUFFER
+    assert not list(tmp_path.iterdir())
+
+
+def test_capture_tmp(monkeypatch, tmp_path):
+    """
+    Test sampled events are written in batches, appending to the container's corpus file
+    """
+    monkeypatch.setattr(capture, 'BUFFER', [])
+    monkeypatch.setenv('CAPTURE_ENABLE', 'true')
+    monkeypatch.setenv('CAPTURE_SAMPLE_RATE', '1')
+    monkeypatch.setenv('CAPTURE_BATCH_SIZE', '2')
+    monkeypatch.setenv('CAPTURE_DIR', str(tmp_path))
+
+    capture.capture(EVENT, {'statusCode': 200})
+    assert not list(tmp_path.iterdir())
+    for _ in range(3):
+        capture.capture('test', None)
+
+    path = tmp_path / f'capture-{capture.CONTAINER_ID}.ndjson.gz'
+    records = read_records(path)
+    assert [record['status'] for record in records] == [200, None, None, None]
+    assert records[0]['event']['requestContext']['http']['sourceIp'] == SOURCE_IP
+
+    # Unwritable directories lose the batch without failing the request
+    monkeypatch.setenv('CAPTURE_DIR', str(tmp_path / 'missing'))
+    capture.capture(EVENT, {'statusCode': 200})
+    capture.capture(EVENT, {'statusCode': 200})
+    assert not capture.BUFFER
+
+
+@mock_s3
+def test_capture_s3(monkeypatch):
+    """
+    Test batches are stored as S3 objects under the configured prefix
+    """
+    monkeypatch.setattr(capture, 'BUFFER', [])
+    monkeypatch.setenv('CAPTURE_ENABLE', 'true')
+    monkeypatch.setenv('CAPTURE_SAMPLE_RATE', '1')
+    monkeypatch.setenv('CAPTURE_BATCH_SIZE', '1')
+    monkeypatch.setenv('CAPTURE_SINK', 's3')
+    monkeypatch.setenv('CAPTURE_S3_URI', 's3://corpus/events/')
+    aws_utils.put_s3_object('corpus', 'placeholder')
+
+    capture.capture(EVENT, {'statusCode': 200})
+
+    objects = boto3.client('s3').list_objects_v2(Bucket='corpus', Prefix='events/')['Contents']
+    assert len(objects) == 1
+    assert objects[0]['Key'].endswith('.ndjson.gz')
@@ -0,0 +1,31 @@
+"""
+JSON codec unit tests
+"""
+
+import pytest
+from app_handler.utils import codec
+
+
+def test_dumps():
+    """
+    Test compact UTF-8 output
+    """
+    encoded = '{"a":[1,2.5,null,true],"é":"ü"}'.encode()
+    assert codec.dumps({'a': [1, 2.5, None, True], 'é': 'ü'}) == encoded
+    assert codec.dumps({1: 'a'}) == b'{"1":"a"}'
+    with pytest.raises(TypeError):
+        codec.dumps({'set'})
+
+
+def test_loads():
+    """
+    Test documents are accepted from text or bytes
+    """
+    assert codec.loads('{"a": [1, "b"]}') == {'a': [1, 'b']}
+    assert codec.loads(b'{"a": "\\u00e9"}') == {'a': 'é'}
+    assert codec.loads('{"a": "line\nbreak"}', strict=False) == {'a': 'line\nbreak'}
+    assert codec.loads('[NaN, 18446744073709551616]')[1] == 2**64
+    with pytest.raises(codec.DecodeError):
+        codec.loads('{"a": "line\nbreak"}')
+    with pytest.raises(codec.DecodeError):
+        codec.loads(b'')
@@ -0,0 +1,38 @@
+"""
+URL encoded form decoder unit tests
+"""
+
+import pytest
+from app_handler.utils.form import decode_form
+
+def test_decode_form():
+    """
+    Test names and values are decoded once, keeping encoded separators
+    """
+    assert decode_form(b'a=1%262&b=x%3Dy&c=a+b%2Bc&d&&e=%C3%A9&f=%25') == {
+        'a': '1&2',
+        'b': 'x=y',
+        'c': 'a b+c',
+        'd': '',
+        'e': 'é',
+        'f': '%',
+    }
+    assert not decode_form(b'')
+
+
+def test_repeated_keys():
+    """
+    Test repeated keys collect their values in order
+    """
+    assert decode_form(b'tag=a&name=n&tag=b&tag=c') == {'tag': ['a', 'b', 'c'], 'name': 'n'}
+
+
+def test_errors():
+    """
+    Test forms with too many fields or invalid UTF-8 are rejected
+    """
+    assert decode_form(b'a=1&b=2&&', max_fields=2) == {'a': '1', 'b': '2'}
+    with pytest.raises(ValueError):
+        decode_form(b'a=1&b=2&c=3', max_fields=2)
+    with pytest.raises(ValueError):
+        decode_form(b'a=%FF')
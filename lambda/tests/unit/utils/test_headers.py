@@ -0,0 +1,56 @@
+"""
+Case-insensitive header view unit tests
+"""
+
+import pytest
+from app_handler.utils.headers import Headers
+
+def test_case_insensitive():
+    """
+    Test headers are found by any case of their name, keeping the case of values
+    """
+    original = {'Content-Type': 'multipart/form-data; boundary=AbC', 'idempotency-key': 'XyZ'}
+    headers = Headers(original)
+    assert headers['content-type'] == 'multipart/form-data; boundary=AbC'
+    assert headers['CONTENT-TYPE'] == 'multipart/form-data; boundary=AbC'
+    assert headers.get('Idempotency-Key') == 'XyZ'
+    assert headers.get('Missing') is None
+    assert 'content-type' in headers
+    assert 1 not in headers
+    # Nothing is copied
+    assert headers.headers is original
+    assert dict(headers) == original
+
+
+def test_multi_value_headers():
+    """
+    Test multi-value headers are read when there is no single value header,
+    and every value of a header is available
+    """
+    headers = Headers(
+        {'Accept': 'text/html'},
+        {'Accept': ['text/html'], 'X-Forwarded-For': ['203.0.113.7', '127.0.0.1'], 'Empty': []},
+    )
+    assert headers['accept'] == 'text/html'
+    assert headers['x-forwarded-for'] == '127.0.0.1'
+    assert headers.get_all('X-Forwarded-For') == ['203.0.113.7', '127.0.0.1']
+    assert headers.get_all('Accept') == ['text/html']
+    assert headers.get_all('Missing') == []
+    with pytest.raises(KeyError):
+        assert headers['Empty']
+    assert list(headers) == ['Accept', 'X-Forwarded-For', 'Empty']
+    assert len(headers) == 3
+
+    headers = Headers(None, {'Content-Type': ['application/json']})
+    assert headers.get_all('content-type') == ['application/json']
+    assert headers
+
+
+def test_empty():
+    """
+    Test missing or malformed headers are empty
+    """
+    for headers in [Headers(), Headers({}, {}), Headers('text', ['text'])]:
+        assert not headers
+        assert len(headers) == 0
+        assert headers.get('Content-Type') is None
@@ -0,0 +1,104 @@
+"""
+Latency histogram unit tests
+"""
+
+from app_handler.utils.histogram import (
+    WINDOW_SAMPLES,
+    WINDOW_SECONDS,
+    Histogram,
+    Histograms,
+    bucket_index,
+    bucket_upper,
+)
+
+
+def test_buckets():
+    """
+    Test bucket boundaries are contiguous with bounded relative error
+    """
+    previous = -1
+    for value in range(0, 1 << 16):
+        index = bucket_index(value)
+        assert index in (previous, previous + 1)
+        upper = bucket_upper(index)
+        assert value <= upper <= value * 1.02 + 1
+        previous = index
+
+
+def test_empty_histogram():
+    """
+    Test an empty histogram has no percentile
+    """
+    assert Histogram().percentile(50) is None
+
+
+def test_percentiles():
+    """
+    Test nearest-rank percentiles within bucket precision
+    """
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(value / 1000)
+
+    assert histogram.total == 1000
+    assert abs(histogram.percentile(50) - 0.5) <= 0.5 * 0.02
+    assert abs(histogram.percentile(99) - 0.99) <= 0.99 * 0.02
+    assert histogram.percentile(100) == 1
+    assert histogram.percentile(150) == 1
+    assert 0.001 <= histogram.percentile(0) <= 0.001 * 1.02
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 1000
+    assert snapshot['max'] == 1000
+    assert snapshot['p50'] <= snapshot['p90'] <= snapshot['p99'] <= snapshot['max']
+
+
+def test_flush():
+    """
+    Test flushing on invocation count or elapsed time reports samples since the last flush
+    """
+    histograms = Histograms()
+    histograms.record('stage.total', 0.1)
+    assert histograms.tick(2, 60, now=histograms.flushed) is None
+
+    flushed = histograms.tick(2, 60, now=histograms.flushed)
+    assert flushed['invocations'] == 2
+    assert flushed['histograms']['stage.total']['count'] == 1
+
+    histograms.record('stage.total', 0.3)
+    flushed = histograms.tick(100, 60, now=histograms.flushed + 61)
+    assert flushed['invocations'] == 1
+    assert flushed['histograms']['stage.total']['count'] == 1
+    # Flushing does not affect recent percentiles
+    assert histograms.recent('stage.total').total == 2
+
+    histograms.clear()
+    assert histograms.recent('stage.total').total == 0
+    assert histograms.tick(1, 60)['histograms'] == {}
+
+
+def test_windows():
+    """
+    Test recent percentiles follow windows rotated by time or sample count on record,
+    without any flush
+    """
+    histograms = Histograms()
+    histograms.record('http.a', 0.1, now=0)
+    histograms.record('http.a', 0.2, now=WINDOW_SECONDS - 1)
+    assert histograms.recent('http.a', now=WINDOW_SECONDS - 1).total == 2
+    assert histograms.recent('missing').total == 0
+
+    # The previous window still counts towards recent percentiles
+    histograms.record('http.a', 0.3, now=WINDOW_SECONDS)
+    assert histograms.recent('http.a', now=WINDOW_SECONDS).total == 3
+    assert histograms.recent('http.a', now=2 * WINDOW_SECONDS).total == 1
+    # Nothing is recent once both windows have passed
+    assert histograms.recent('http.a', now=5 * WINDOW_SECONDS).total == 0
+
+    # A busy name rotates on its sample count
+    for _ in range(WINDOW_SAMPLES * 2 + 1):
+        histograms.record('http.b', 0.5, now=0)
+    histograms.record('http.b', 0.001, now=0)
+    recent = histograms.recent('http.b', now=0)
+    assert recent.total == WINDOW_SAMPLES + 2
+    assert recent.percentile(0) < 0.01
@@ -0,0 +1,88 @@
+"""
+IP index unit tests
+"""
+
+import pytest
+
+from app_handler.utils.ip_index import IpIndex, build_index, main, parse_networks
+
+DENY = """
+# Cloud provider range
+10.0.0.0/8
+192.168.1.7/32  # single host
+2001:db8::/32
+"""
+
+ALLOW = """
+10.1.0.0/16
+"""
+
+
+def write_index(tmp_path, deny=DENY, allow=ALLOW):
+    """
+    Build an index file from deny and allow list text
+    """
+    path = tmp_path / 'ip_index.bin'
+    path.write_bytes(build_index(parse_networks(deny), parse_networks(allow)))
+    return IpIndex(str(path))
+
+
+def test_parse_networks():
+    """
+    Test CIDRs are parsed with comments and host bits ignored
+    """
+    networks = parse_networks('# comment\n\n10.0.0.1/8 # note\n::1\n')
+    assert [str(network) for network in networks] == ['10.0.0.0/8', '::1/128']
+
+
+def test_lookup(tmp_path):
+    """
+    Test longest prefix matches across IPv4 and IPv6
+    """
+    index = write_index(tmp_path)
+    assert index.lookup('10.2.3.4') == 'deny'
+    assert index.lookup('10.1.3.4') == 'allow'
+    assert index.lookup('192.168.1.7') == 'deny'
+    assert index.lookup('192.168.1.8') is None
+    assert index.lookup('11.0.0.1') is None
+    assert index.lookup('2001:db8::1') == 'deny'
+    assert index.lookup('2001:db9::1') is None
+    assert index.lookup('::ffff:10.2.3.4') == 'deny'
+
+
+def test_allow_precedence(tmp_path):
+    """
+    Test allow entries override deny entries with the same prefix, and everything matches /0
+    """
+    index = write_index(tmp_path, deny='0.0.0.0/0\n10.0.0.0/8', allow='10.0.0.0/8')
+    assert index.lookup('10.0.0.1') == 'allow'
+    assert index.lookup('8.8.8.8') == 'deny'
+
+
+def test_invalid_file(tmp_path):
+    """
+    Test files without the index header are rejected
+    """
+    path = tmp_path / 'invalid.bin'
+    path.write_bytes(b'\0' * 32)
+    with pytest.raises(ValueError):
+        IpIndex(str(path))
+
+
+def test_main(tmp_path):
+    """
+    Test building an index file from list files
+    """
+    deny = tmp_path / 'deny.txt'
+    deny.write_text(DENY, 'UTF-8')
+    allow = tmp_path / 'allow.txt'
+    allow.write_text(ALLOW, 'UTF-8')
+    output = tmp_path / 'out.bin'
+
+    main(['--deny', str(deny), '--allow', str(allow), '--output', str(output)])
+    index = IpIndex(str(output))
+    assert index.lookup('10.2.3.4') == 'deny'
+    assert index.lookup('10.1.3.4') == 'allow'
+    index.close()
+    with pytest.raises(ValueError):
+        index.lookup('10.2.3.4')
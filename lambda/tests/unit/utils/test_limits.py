@@ -0,0 +1,35 @@
+"""
+Body limits unit tests
+"""
+
+import pytest
+from app_handler.utils.limits import BodyLimits
+
+def test_too_large():
+    """
+    Test sizes are judged from the encoded length, allowing for base64 padding
+    """
+    limits = BodyLimits(max_bytes=8, max_decoded_bytes=4)
+    assert not limits.too_large('abcd', False)
+    assert limits.too_large('abcde', False)
+    assert limits.too_large('abcdefghi', True)
+    assert limits.too_large('abcdefgh', True)
+    assert not limits.too_large('abcdef==', True)
+    assert not limits.too_large(b'abcdef==', True)
+
+    # Limits are only set by name
+    with pytest.raises(TypeError):
+        BodyLimits(8, 4)  # pylint: disable=too-many-function-args
+
+
+def test_check_json():
+    """
+    Test object members are counted at every level and nesting depth is bounded
+    """
+    limits = BodyLimits(max_fields=3, max_depth=3)
+    limits.check_json({'a': 1, 'b': [{'c': 'x'}]})
+    limits.check_json('text')
+    with pytest.raises(ValueError):
+        limits.check_json({'a': 1, 'b': [{'c': 'x', 'd': 'y'}]})
+    with pytest.raises(ValueError):
+        limits.check_json([[[[]]]])
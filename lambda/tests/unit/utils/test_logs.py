@@ -0,0 +1,121 @@
+"""
+Structured logging unit tests
+"""
+
+import json
+import logging
+
+from app_handler.utils import logs
+from app_handler.utils.logs import REDACTED, JsonFormatter, RedactFilter, redact
+
+FIELDS = frozenset(['email', 'secret'])
+
+
+def make_record(msg, *args, **extra):
+    """
+    Build a log record as the logging module would
+    """
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_redact():
+    """
+    Test nested payload values are redacted by key, case-insensitively
+    """
+    payload = {'Email': 'a@b.c', 'items': [{'secret': 'x', 'keep': 1}], 'pair': ('a', {'email': 1})}
+    assert redact(payload, FIELDS) == {
+        'Email': REDACTED,
+        'items': [{'secret': REDACTED, 'keep': 1}],
+        'pair': ('a', {'email': REDACTED}),
+    }
+    # Originals are left untouched
+    assert payload['Email'] == 'a@b.c'
+
+
+def test_filter():
+    """
+    Test record message and arguments are redacted before rendering
+    """
+    record = make_record('Parsed %s', {'email': 'a@b.c', 'name': 'x'})
+    assert RedactFilter(FIELDS).filter(record)
+    assert record.getMessage() == "Parsed {'email': '[REDACTED]', 'name': 'x'}"
+
+    record = make_record({'secret': 'abc'})
+    RedactFilter(FIELDS).filter(record)
+    assert record.getMessage() == "{'secret': '[REDACTED]'}"
+
+
+def test_json_formatter(monkeypatch):
+    """
+    Test records are formatted as single line JSON with context and redacted extras
+    """
+    monkeypatch.setattr(logs, 'CONTEXT', {'requestId': 'abc'})
+    record = make_record('Line one\nline %s', 'two', payload={'email': 'a@b.c'}, Secret='x')
+    try:
+        raise ValueError('failed')
+    except ValueError:
+        record.exc_info = logging.sys.exc_info()
+
+    output = JsonFormatter(FIELDS).format(record)
+    assert '\n' not in output
+    document = json.loads(output)
+    assert document['message'] == 'Line one\nline two'
+    assert document['level'] == 'INFO'
+    assert document['requestId'] == 'abc'
+    assert document['payload'] == {'email': REDACTED}
+    assert document['Secret'] == REDACTED
+    assert 'ValueError: failed' in document['exception']
+
+
+def test_configure(monkeypatch):
+    """
+    Test handlers are installed, filtered and formatted without duplicating filters
+    """
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'handlers', [])
+    level = root.level
+    try:
+        logs.configure('DEBUG', 'json', 'email', 0.5)
+        logs.configure('DEBUG', 'json', 'email', 0.5)
+        assert len(root.handlers) == 1
+        handler = root.handlers[0]
+        assert len(handler.filters) == 1
+        assert isinstance(handler.formatter, JsonFormatter)
+        assert logs.EVENT_SAMPLE_RATE == 0.5
+
+        text_handler = logging.NullHandler()
+        root.handlers = [text_handler]
+        logs.configure('INFO', 'text')
+        assert text_handler.formatter is None
+        assert len(text_handler.filters) == 1
+    finally:
+        root.setLevel(level)
+        logs.EVENT_SAMPLE_RATE = 1.0
+
+
+def test_log_event(monkeypatch, caplog):
+    """
+    Test events are only captured at DEBUG level and within the sample rate
+    """
+    class Context:  # pylint: disable=too-few-public-methods
+        """
+        Lambda context stand-in
+        """
+        aws_request_id = 'req-1'
+
+    monkeypatch.setattr(logs, 'CONTEXT', {})
+    with caplog.at_level(logging.INFO):
+        logs.log_event({'body': 'x'}, Context())
+    assert not caplog.records
+    assert logs.CONTEXT['requestId'] == 'req-1'
+
+    with caplog.at_level(logging.DEBUG):
+        monkeypatch.setattr(logs, 'EVENT_SAMPLE_RATE', 0)
+        logs.log_event({'body': 'x'}, None)
+        assert not caplog.records
+
+        monkeypatch.setattr(logs, 'EVENT_SAMPLE_RATE', 1)
+        logs.log_event({'body': 'x'}, None)
+        assert len(caplog.records) == 1
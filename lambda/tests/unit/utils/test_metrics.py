@@ -0,0 +1,105 @@
+"""
+EMF metrics unit tests
+"""
+
+import json
+
+from app_handler.utils import coldstart
+from app_handler.utils.histogram import HISTOGRAMS
+from app_handler.utils.metrics import Metrics, NULL_TIMER
+
+
+def test_disabled(monkeypatch, capsys):
+    """
+    Test disabled metrics use the shared no-op timer and emit nothing
+    """
+    monkeypatch.delenv('METRICS_ENABLE', raising=False)
+    metrics = Metrics()
+    assert metrics.timer('parse') is NULL_TIMER
+    with metrics.timer('parse'):
+        pass
+    metrics.emit({'statusCode': 200})
+    assert not metrics.timings
+    assert capsys.readouterr().out == ''
+
+
+def test_timings_summed():
+    """
+    Test repeated stages accumulate elapsed time
+    """
+    metrics = Metrics(True)
+    with metrics.timer('hcaptcha'):
+        pass
+    first = metrics.timings['hcaptcha']
+    with metrics.timer('hcaptcha'):
+        pass
+    assert metrics.timings['hcaptcha'] >= first > 0
+
+
+def test_emit(monkeypatch, capsys):
+    """
+    Test a single EMF line with latencies, outcome counts and cold start flag
+    """
+    monkeypatch.setenv('METRICS_ENABLE', 'true')
+    monkeypatch.setenv('METRICS_NAMESPACE', 'Test')
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'contact')
+    monkeypatch.setattr(coldstart, 'INVOCATIONS', 1)
+    monkeypatch.setattr(coldstart, 'INIT_TIMINGS', {'imports': 120.5})
+
+    metrics = Metrics()
+    metrics.timings['total'] = 2500000
+    metrics.emit({'statusCode': 429})
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+
+    document = json.loads(lines[0])
+    definition = document['_aws']['CloudWatchMetrics'][0]
+    assert definition['Namespace'] == 'Test'
+    assert definition['Dimensions'] == [['FunctionName']]
+    assert {'Name': 'TotalLatency', 'Unit': 'Milliseconds'} in definition['Metrics']
+    assert document['FunctionName'] == 'contact'
+    assert document['TotalLatency'] == 2.5
+    assert document['StatusCode'] == 429
+    assert document['ColdStart'] == 1
+    assert document['Success'] == 0
+    assert document['ClientError'] == 1
+    assert document['ServerError'] == 0
+    assert document['InitImportsDuration'] == 120.5
+
+    # Only the first invocation in the container is a cold start
+    monkeypatch.setattr(coldstart, 'INVOCATIONS', 2)
+    document = Metrics().build({'statusCode': 500})
+    assert document['ColdStart'] == 0
+    assert 'InitImportsDuration' not in document
+
+
+def test_non_dict_response():
+    """
+    Test responses without a status code count as no outcome
+    """
+    document = Metrics(True).build(None)
+    assert document['StatusCode'] == 0
+    assert document['Success'] + document['ClientError'] + document['ServerError'] == 0
+
+
+def test_histograms(monkeypatch, capsys):
+    """
+    Test stage timings feed the shared histograms, flushed as a single line
+    """
+    monkeypatch.setenv('HISTOGRAM_ENABLE', 'true')
+    monkeypatch.setenv('HISTOGRAM_FLUSH_INVOCATIONS', '2')
+    monkeypatch.delenv('METRICS_ENABLE', raising=False)
+    HISTOGRAMS.clear()
+
+    for _ in range(2):
+        metrics = Metrics()
+        assert metrics.timer('total') is not NULL_TIMER
+        with metrics.timer('total'):
+            pass
+        metrics.emit({'statusCode': 200})
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    flushed = json.loads(lines[0])['latencyHistograms']
+    assert flushed['invocations'] == 2
+    assert flushed['histograms']['stage.total']['count'] == 2
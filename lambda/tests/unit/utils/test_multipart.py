@@ -0,0 +1,145 @@
+"""
+Multipart form parser unit tests
+"""
+
+import base64
+
+import pytest
+from app_handler.utils.limits import BodyLimits
+from app_handler.utils.multipart import MultipartParser, PartTooLarge, UploadedFile, body_chunks
+
+BOUNDARY = '----Boundary7MA4YWxk'
+
+
+def build_body(parts:list, boundary:str = BOUNDARY) -> bytes:
+    """
+    Multipart body of (headers, content) parts with a preamble and epilogue
+    """
+    body = b'preamble\r\n'
+    for headers, content in parts:
+        body += f'--{boundary}\r\n{headers}\r\n\r\n'.encode() + content + b'\r\n'
+    return body + f'--{boundary}--\r\nepilogue'.encode()
+
+
+def field(name:str, value:str) -> tuple:
+    """
+    Text part
+    """
+    return f'Content-Disposition: form-data; name="{name}"', value.encode()
+
+
+def upload(name:str, filename:str, content:bytes) -> tuple:
+    """
+    File part
+    """
+    headers = (
+        f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        'Content-Type: text/plain'
+    )
+    return headers, content
+
+
+def parse(body, limits:BodyLimits = None, size:int = 7, base64_encoded:bool = False):
+    """
+    Parse a body fed in chunks of size bytes
+    """
+    parser = MultipartParser(BOUNDARY, limits or BodyLimits())
+    parser.parse(body_chunks(body, base64_encoded, size))
+    return parser
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64 * 1024])
+def test_parse(size):
+    """
+    Test fields and files are parsed whatever the chunk boundaries
+    """
+    content = b'line\r\n--not the boundary\r\n' * 20
+    body = build_body([
+        field('name', 'First Last'),
+        field('topic', 'sales'),
+        field('topic', 'support'),
+        field('topic', 'other'),
+        field('empty', ''),
+        upload('attachment', 'notes.txt', content),
+        upload('attachment', 'émpty.txt', b''),
+    ])
+    parser = parse(body, size=size)
+    assert parser.fields == {
+        'name': 'First Last',
+        'topic': ['sales', 'support', 'other'],
+        'empty': '',
+    }
+
+    first, second = parser.files['attachment']
+    assert str(first) == 'notes.txt' and first.content_type == 'text/plain'
+    assert first.size == len(content) and first.read() == content
+    assert second.filename == 'émpty.txt' and second.read() == b''
+    parser.close()
+
+
+def test_encodings():
+    """
+    Test base64 bodies are decoded chunk by chunk, text and bytes bodies are read as they are
+    """
+    body = build_body([field('message', 'Hello'), upload('file', 'a.bin', bytes(range(256)))])
+    encoded = base64.b64encode(body).decode()
+    for parsed in (parse(encoded, base64_encoded=True), parse(body), parse(body.decode('latin-1'))):
+        assert parsed.fields == {'message': 'Hello'}
+
+    assert parse(encoded, base64_encoded=True).files['file'].read() == bytes(range(256))
+    with pytest.raises(ValueError):
+        parse(encoded[:-4] + '!!!!', base64_encoded=True, size=3)
+
+
+def test_spooling():
+    """
+    Test files beyond the spool threshold are moved to a temporary file
+    """
+    parser = parse(build_body([upload('file', 'a.txt', b'x' * 100)]), BodyLimits(spool_bytes=50))
+    uploaded = parser.files['file']
+    assert uploaded.file._rolled  # pylint: disable=protected-access
+    assert uploaded.read() == b'x' * 100
+    parser.close()
+
+
+def test_limits():
+    """
+    Test parts beyond their size limit, and bodies with too many parts, are rejected
+    """
+    limits = BodyLimits(max_fields=2, max_field_bytes=10, max_file_bytes=20)
+    parse(build_body([field('a', 'x' * 10), upload('b', 'b.txt', b'x' * 20)]), limits)
+
+    with pytest.raises(PartTooLarge):
+        parse(build_body([field('a', 'x' * 11)]), limits)
+    with pytest.raises(PartTooLarge):
+        parse(build_body([upload('b', 'b.txt', b'x' * 21)]), limits)
+    with pytest.raises(ValueError):
+        parse(build_body([field('a', ''), field('b', ''), field('c', '')]), limits)
+
+
+@pytest.mark.parametrize('body', [
+    build_body([('Content-Disposition: form-data', b'')]),
+    build_body([('Content-Disposition: attachment; name="a"', b'')]),
+    build_body([('Invalid header', b'')]),
+    build_body([(f'X-Padding: {"x" * 40000}', b'')]),
+    build_body([field('a', 'b')])[:-15],
+    build_body([field('a', 'b')]).replace(f'--{BOUNDARY}--'.encode(), f'--{BOUNDARY}xx'.encode()),
+    b'no delimiter',
+])
+def test_malformed(body):
+    """
+    Test malformed bodies are rejected
+    """
+    with pytest.raises(ValueError):
+        parse(body, size=4096)
+
+
+def test_uploaded_file():
+    """
+    Test uploaded files track their size
+    """
+    uploaded = UploadedFile('a.txt', 'text/plain', 10)
+    uploaded.write(b'abc')
+    uploaded.write(memoryview(b'def'))
+    assert uploaded.size == 6 and uploaded.read() == b'abcdef'
+    uploaded.close()
@@ -0,0 +1,119 @@
+"""
+Profiling hook unit tests
+"""
+
+import json
+import os
+import pstats
+import time
+
+from app_handler.utils import profiler
+from app_handler.utils.profiler import NULL_PROFILE, Profiler, is_signed_request, profile
+from app_handler.utils.signing import sign
+
+
+def signed_event(secret:str, timestamp:int) -> dict:
+    """
+    API event carrying a signed profiling header
+    """
+    return {'headers': {'X-Profile': sign(secret, str(timestamp))}}
+
+
+def test_disabled(monkeypatch):
+    """
+    Test invocations are not profiled by default
+    """
+    monkeypatch.delenv('PROFILE_ENABLE', raising=False)
+    monkeypatch.delenv('PROFILE_SECRET', raising=False)
+    assert profile({'headers': {}}) is NULL_PROFILE
+
+
+def test_sampled(monkeypatch):
+    """
+    Test the sample rate selects invocations to profile
+    """
+    monkeypatch.setenv('PROFILE_ENABLE', 'true')
+    monkeypatch.setenv('PROFILE_SAMPLE_RATE', '0')
+    assert profile('test') is NULL_PROFILE
+
+    monkeypatch.setenv('PROFILE_SAMPLE_RATE', '1')
+    assert isinstance(profile('test'), Profiler)
+
+
+def test_signed_header(monkeypatch):
+    """
+    Test a recent correctly signed header triggers profiling
+    """
+    monkeypatch.delenv('PROFILE_ENABLE', raising=False)
+    monkeypatch.setenv('PROFILE_SECRET', 'abc')
+    now = int(time.time())
+    assert isinstance(profile(signed_event('abc', now)), Profiler)
+    assert profile(signed_event('xyz', now)) is NULL_PROFILE
+
+    assert not is_signed_request(signed_event('abc', now - 301), 'abc', now)
+    assert not is_signed_request({'headers': {'X-Profile': sign('abc', 'now')}}, 'abc')
+    assert not is_signed_request({'headers': {'Other': 'a'}}, 'abc')
+    assert not is_signed_request({'headers': None}, 'abc')
+    assert not is_signed_request('test', 'abc')
+    multi_value = {'multiValueHeaders': {'X-Profile': [sign('abc', str(now))]}}
+    assert is_signed_request(multi_value, 'abc', now)
+
+
+def test_log_sink(monkeypatch, capsys):
+    """
+    Test a compact summary of functions and allocations is logged
+    """
+    monkeypatch.setenv('PROFILE_SINK', 'log')
+    monkeypatch.setenv('PROFILE_TOP', '5')
+    with Profiler() as active:
+        _ = [str(value) for value in range(10000)]
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    summary = json.loads(lines[0])['profile']
+    assert summary == active.summary
+    assert len(summary['functions']) <= 5
+    assert summary['allocations']
+    assert summary['peakMemoryKb'] > 0
+    assert not profiler.tracemalloc.is_tracing()
+
+
+def test_tmp_sink(monkeypatch, tmp_path, capsys):
+    """
+    Test full stats are written to a pstats file
+    """
+    monkeypatch.setenv('PROFILE_SINK', 'tmp')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    profiler.tracemalloc.start()
+    try:
+        with Profiler() as active:
+            sorted(range(1000), reverse=True)
+        # Tracing started elsewhere is left running
+        assert profiler.tracemalloc.is_tracing()
+    finally:
+        profiler.tracemalloc.stop()
+
+    capsys.readouterr()
+    assert 'functions' not in active.summary
+    assert os.path.dirname(active.summary['path']) == str(tmp_path)
+    assert pstats.Stats(active.summary['path']).total_calls > 0
+
+
+def test_tmp_sink_pruned(monkeypatch, tmp_path, capsys):
+    """
+    Test only the latest pstats files are kept
+    """
+    monkeypatch.setenv('PROFILE_SINK', 'tmp')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    monkeypatch.setenv('PROFILE_KEEP', '2')
+    (tmp_path / 'other.txt').write_text('kept')
+    paths = []
+    for _ in range(3):
+        with Profiler() as active:
+            sorted(range(1000), reverse=True)
+        paths.append(active.summary['path'])
+
+    capsys.readouterr()
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ['other.txt'] + [os.path.basename(path) for path in paths[1:]]
+    )
@@ -0,0 +1,24 @@
+"""
+Signing unit tests
+"""
+
+from app_handler.utils.signing import sign, verify
+
+def test_sign_verify():
+    """
+    Test signed values are verified and returned
+    """
+    signed = sign('secret', '1700000000')
+    assert signed.startswith('1700000000.')
+    assert verify('secret', signed) == '1700000000'
+
+
+def test_verify_invalid():
+    """
+    Test tampered, unsigned or non-string values are rejected
+    """
+    signed = sign('secret', '1700000000')
+    assert verify('other', signed) is None
+    assert verify('secret', '1700000001' + signed[10:]) is None
+    assert verify('secret', '1700000000') is None
+    assert verify('secret', None) is None
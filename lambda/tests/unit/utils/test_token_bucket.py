@@ -0,0 +1,33 @@
+"""
+Token bucket unit tests
+"""
+
+from app_handler.utils.token_bucket import TokenBuckets
+
+def test_burst_and_refill():
+    """
+    Test a burst is allowed, then tokens refill over time
+    """
+    buckets = TokenBuckets(rate=1, burst=2, max_entries=10)
+    assert buckets.take('a', now=0) == 1
+    assert buckets.take('a', now=0) == 0
+    assert buckets.take('a', now=0) < 0
+    assert buckets.take('a', now=0.5) < 0
+    assert buckets.take('a', now=1.5) == 0.5
+    # Refill is capped at the burst size
+    assert buckets.take('a', now=100) == 1
+    assert buckets.take('b') == 1
+
+
+def test_lru_eviction():
+    """
+    Test least recently used keys are evicted
+    """
+    buckets = TokenBuckets(rate=0, burst=1, max_entries=2)
+    buckets.take('a', now=0)
+    buckets.take('b', now=0)
+    buckets.take('a', now=0)
+    buckets.take('c', now=0)
+    assert list(buckets.buckets) == ['a', 'c']
+    # Evicted key starts with a full bucket again
+    assert buckets.take('b', now=0) == 0
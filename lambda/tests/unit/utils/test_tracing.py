@@ -0,0 +1,120 @@
+"""
+Tracer unit tests
+"""
+
+import json
+import socket
+
+import pytest
+
+from app_handler.utils import tracing
+from app_handler.utils.executor import submit
+from app_handler.utils.tracing import NULL_SPAN, Trace, span, traced
+
+
+def run_trace(monkeypatch, export='json'):
+    """
+    Record a small trace with nested, threaded and failed spans
+    """
+    monkeypatch.setenv('TRACE_ENABLE', 'true')
+    monkeypatch.setenv('TRACE_EXPORT', export)
+
+    @traced('decorated')
+    def work():
+        with span('inner', reused=True):
+            return 1
+
+    with Trace('handler') as root:
+        assert work() == 1
+        # Background work nests under the submitting span
+        assert submit(work).result() == 1
+        with pytest.raises(ValueError):
+            with span('failed'):
+                raise ValueError('failed')
+        root.annotate(status=200, detail={'a': 1})
+
+    return root
+
+
+def test_outside_trace(monkeypatch):
+    """
+    Test spans are the shared no-op span when no trace is active
+    """
+    monkeypatch.delenv('TRACE_ENABLE', raising=False)
+    assert span('http') is NULL_SPAN
+    with Trace('handler') as root:
+        assert root is NULL_SPAN
+        assert span('http') is NULL_SPAN
+        root.annotate(status=200)
+
+
+def test_json_export(monkeypatch, capsys):
+    """
+    Test the span tree is printed as a single JSON line
+    """
+    run_trace(monkeypatch)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+
+    tree = json.loads(lines[0])['trace']
+    assert tree['name'] == 'handler'
+    assert tree['annotations']['status'] == 200
+    assert [child['name'] for child in tree['children']] == ['decorated', 'decorated', 'failed']
+    assert tree['children'][0]['children'][0]['annotations'] == {'reused': True}
+    assert tree['children'][2]['error'] is True
+    assert 'error' not in tree
+    assert tree['durationMs'] >= tree['children'][0]['durationMs']
+    assert span('outside') is NULL_SPAN
+
+
+def test_xray_export(monkeypatch):
+    """
+    Test the trace is sent to the X-Ray daemon as a subsegment of the Lambda segment
+    """
+    daemon = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    daemon.bind(('127.0.0.1', 0))
+    daemon.settimeout(5)
+    monkeypatch.setenv('AWS_XRAY_DAEMON_ADDRESS', f'127.0.0.1:{daemon.getsockname()[1]}')
+    try:
+        monkeypatch.setenv('_X_AMZN_TRACE_ID', 'Root=1-abc-def;Parent=123;Sampled=1')
+        run_trace(monkeypatch, 'xray')
+        header, document = daemon.recv(65535).decode().split('\n')
+        assert json.loads(header) == {'format': 'json', 'version': 1}
+        segment = json.loads(document)
+        assert segment['type'] == 'subsegment'
+        assert segment['trace_id'] == '1-abc-def'
+        assert segment['parent_id'] == '123'
+        assert segment['annotations'] == {'status': 200, 'detail': "{'a': 1}"}
+        assert segment['end_time'] >= segment['start_time']
+        assert segment['subsegments'][2]['fault'] is True
+
+        # Outside Lambda a new trace is started
+        monkeypatch.delenv('_X_AMZN_TRACE_ID')
+        run_trace(monkeypatch, 'xray')
+        segment = json.loads(daemon.recv(65535).decode().split('\n')[1])
+        assert 'type' not in segment
+        assert segment['trace_id'].startswith('1-')
+    finally:
+        daemon.close()
+
+
+def test_unfinished_span():
+    """
+    Test spans still in flight are exported up to the current time
+    """
+    with tracing.Span('handler') as root:
+        with tracing.Span('http', root):
+            assert root.to_dict(root.start)['children'][0]['durationMs'] >= 0
+            assert root.to_segment(0, root.start)['subsegments'][0]['end_time'] >= 0
+
+
+def test_xray_export_errors(monkeypatch, caplog):
+    """
+    Test unresolvable or invalid daemon addresses are logged without failing the invocation
+    """
+    monkeypatch.delenv('_X_AMZN_TRACE_ID', raising=False)
+    for address in ['xray-daemon.invalid:2000', '127.0.0.1:port']:
+        monkeypatch.setenv('AWS_XRAY_DAEMON_ADDRESS', address)
+        caplog.clear()
+        run_trace(monkeypatch, 'xray')
+        assert 'Unable to export trace' in caplog.text
@@ -0,0 +1,10 @@
+#!/bin/bash
+# Runs benchmarks apart from validation, as timings vary on shared machines.
+# Regressions against the stored baseline are reported as warnings without failing.
+set -euo pipefail
+
+# Install dependencies, including development dependencies
+poetry install --no-root
+
+# Run benchmarks and write machine-readable results
+BENCHMARK_REPORT_ONLY=true BENCHMARK_OUTPUT=benchmark.json poetry run pytest -s tests/benchmark
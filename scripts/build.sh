@@ -6,6 +6,12 @@ set -euo pipefail
 # Install dependencies, excluding development dependencies
 poetry install --no-dev --no-root
 
+# Compile IP allow/deny lists into the packaged index
+poetry run python -m app_handler.utils.ip_index \
+  --deny ip_lists/deny.txt \
+  --allow ip_lists/allow.txt \
+  --output app_handler/data/ip_index.bin
+
 # Build distributable wheel
 poetry build -f wheel
 